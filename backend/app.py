@@ -1,4 +1,7 @@
-from flask import Flask, request, jsonify, send_from_directory
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
 from datetime import datetime
@@ -8,7 +11,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from models import (
-    CropStressModel, 
     get_stress_recommendation, 
     get_stress_label, 
     get_stress_color,
@@ -18,19 +20,40 @@ from models import (
 )
 from utils import (
     get_weather_data, 
+    recorded_weather,
     validate_report_data, 
     save_report_to_file,
     load_all_reports,
     get_crop_types,
     get_growth_stages,
     get_ollama_analysis,
-    analyze_observations
+    analyze_observations,
+    parse_batch_payload,
+    get_weather_cache_stats,
+    format_sse
+)
+from models_db import db, Report, RegisteredField, WEATHER_FIELDS, ensure_schema
+from report_queries import list_reports, parse_fields, parse_filters
+from report_stats import parse_group_by, parse_stats_filters, report_stats
+from report_ingest import CREATED, REPORTS_BULK_MAX, ingest_reports
+from report_export import EXPORT_FORMATS, check_format, export_reports, latest_update
+from llm_service import generate_analysis, get_llm_cache_stats, stream_analysis
+from prediction_cache import get_prediction_cache_stats
+from scenario import parse_scenario, scenario_response
+from field_forecasts import field_forecast, latest_run, register_fields, validate_field
+from report_jobs import AnalysisJobQueue, DONE, FAILED
+from http_client import get_http_metrics
+from model_registry import (
+    get_model, get_startup_timings, is_loaded, predict, predict_batch, record_phase, startup_phase, uses_sidecar
 )
-from models_db import db, Report
-from llm_service import get_ai_analysis, get_ollama_analysis
+import timing
+from timing import span
+
+record_phase('imports', time.perf_counter() - _import_started)
 
 app = Flask(__name__)
 CORS(app)
+timing.init_app(app)
 
 # Database configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
@@ -42,13 +65,56 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Initialize database
 db.init_app(app)
 
-with app.app_context():
+with startup_phase('db_init'), app.app_context():
     db.create_all()
+    ensure_schema()
+
+# Load the ML model once at import, so `gunicorn --preload` shares it with
+# every worker. Set MODEL_EAGER_LOAD=0 to defer it to the first prediction.
+# With an inference sidecar the workers only load it if they must fall back.
+if os.getenv('MODEL_EAGER_LOAD', '1') == '1' and not uses_sidecar():
+    print("Initializing ML model...")
+    get_model()
+
+# 'sync' runs the LLM inside submit_report; 'async' returns the report right
+# after the ML step and fills ai_analysis in from a background worker pool
+REPORT_LLM_MODE = os.getenv('REPORT_LLM_MODE', 'sync')
+SSE_TIMEOUT = int(os.getenv('SSE_TIMEOUT', '60'))
+
+def enrich_report(report_id, payload):
+    """Background job: run the LLM call for a report and store the result"""
+    ai_analysis = generate_analysis(payload['symptoms'], payload['crop_data'])
+    with app.app_context():
+        report = db.session.get(Report, report_id)
+        if report is not None:
+            report.ai_analysis = ai_analysis
+            db.session.commit()
+
+def mark_enrichment_failed(report_id, payload, error):
+    """Background job gave up: store the same fallback text the sync path uses"""
+    with app.app_context():
+        report = db.session.get(Report, report_id)
+        if report is not None:
+            report.ai_analysis = "AI analysis failed to generate."
+            db.session.commit()
 
-# Initialize ML model
-print("Initializing ML model...")
-ml_model = CropStressModel()
-ml_model.load_model('model.pkl')
+analysis_jobs = AnalysisJobQueue(handler=enrich_report, on_failure=mark_enrichment_failed)
+
+@app.before_request
+def start_analysis_workers():
+    # Started per process on first request, after gunicorn has forked
+    if REPORT_LLM_MODE == 'async':
+        analysis_jobs.start()
+
+def get_ai_status(report_id, ai_analysis):
+    """'pending', 'running', 'done', 'failed' or 'none' for a report's AI analysis"""
+    job = analysis_jobs.status(report_id)
+    if job is not None:
+        return job['status']
+    return DONE if ai_analysis else 'none'
+
+record_phase('total', time.perf_counter() - _import_started)
+print(f"Startup timings (ms): {get_startup_timings()}")
 
 # ============================================
 # API ENDPOINTS
@@ -57,7 +123,13 @@ ml_model.load_model('model.pkl')
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'ok', 'message': 'Backend is running'}), 200
+    return jsonify({
+        'status': 'ok',
+        'message': 'Backend is running',
+        'model_loaded': is_loaded(),
+        'inference': 'sidecar' if uses_sidecar() else 'in-process',
+        'startup_ms': get_startup_timings()
+    }), 200
 
 @app.route('/api/weather', methods=['GET'])
 def get_weather():
@@ -71,6 +143,27 @@ def get_weather():
     weather = get_weather_data(lat, lon)
     return jsonify(weather), 200
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters for the server-side caches"""
+    return jsonify({
+        'weather': get_weather_cache_stats(),
+        'llm': get_llm_cache_stats(),
+        # None with an inference sidecar: the cache lives there
+        'prediction': None if uses_sidecar() else get_prediction_cache_stats()
+    }), 200
+
+@app.route('/api/http/stats', methods=['GET'])
+def get_outbound_http_stats():
+    """Latency and error counters for outbound weather/LLM calls"""
+    return jsonify(get_http_metrics()), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request and stage latency histograms in Prometheus text format"""
+    body, content_type = timing.metrics_response()
+    return Response(body, content_type=content_type)
+
 @app.route('/api/predict', methods=['POST'])
 def predict_stress():
     """Predict crop stress based on weather and crop data"""
@@ -82,7 +175,7 @@ def predict_stress():
         return jsonify({'error': 'Missing required fields'}), 400
     
     try:
-        stress_level, confidence = ml_model.predict(
+        stress_level, confidence = predict(
             temperature=float(data['temperature']),
             humidity=float(data['humidity']),
             rainfall=float(data['rainfall']),
@@ -104,6 +197,79 @@ def predict_stress():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_stress_batch():
+    """Predict crop stress for many samples in one vectorized model call"""
+    try:
+        samples = parse_batch_payload(request.get_data(), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid batch payload', 'details': str(e)}), 400
+    
+    if not samples:
+        return jsonify({'predictions': [], 'count': 0}), 200
+    
+    required_fields = ['temperature', 'humidity', 'rainfall', 'wind_speed', 'crop_type', 'growth_stage']
+    errors = []
+    for i, sample in enumerate(samples):
+        if not isinstance(sample, dict) or not all(field in sample for field in required_fields):
+            errors.append(f"Row {i}: missing required fields")
+    if errors:
+        return jsonify({'error': 'Missing required fields', 'details': errors}), 400
+    
+    try:
+        columns = {
+            'temperature': [float(s['temperature']) for s in samples],
+            'humidity': [float(s['humidity']) for s in samples],
+            'rainfall': [float(s['rainfall']) for s in samples],
+            'wind_speed': [float(s['wind_speed']) for s in samples],
+            'crop_type': [str(s['crop_type']).lower() for s in samples],
+            'growth_stage': [str(s['growth_stage']).lower() for s in samples]
+        }
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': 'Invalid numeric field', 'details': str(e)}), 400
+    
+    try:
+        stress_levels, confidences = predict_batch(**columns)
+        
+        predictions = [
+            {
+                'stress_level': int(level),
+                'stress_label': get_stress_label(int(level)),
+                'confidence': round(float(conf), 2)
+            }
+            for level, conf in zip(stress_levels, confidences)
+        ]
+        
+        return jsonify({
+            'predictions': predictions,
+            'count': len(predictions),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/scenario', methods=['POST'])
+def predict_stress_scenario():
+    """What-if surface: stress over one or two swept variables, in one model call
+    
+    Body: {"base": {...as /api/predict...},
+           "sweep": [{"variable": "rainfall", "start": 0, "stop": 40, "steps": 81}],
+           "encoding": "base64" (default) or "json", "probabilities": false}
+    See scenario.py for the response layout.
+    """
+    try:
+        base, axes, encoding, include_probabilities = parse_scenario(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': 'Invalid scenario', 'details': str(e)}), 400
+    
+    try:
+        with span('predict'):
+            result = scenario_response(get_model(), base, axes, encoding, include_probabilities)
+        result['timestamp'] = datetime.now().isoformat()
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/reports', methods=['POST'])
 def submit_report():
     """Submit a crop stress report with observations and get detailed prediction"""
@@ -122,30 +288,34 @@ def submit_report():
         observations = data.get('notes', '')
         
         # Get weather data for the location
-        weather = get_weather_data(lat, lon)
+        with span('weather'):
+            weather = get_weather_data(lat, lon)
         
         # Make ML prediction
-        stress_level, confidence = ml_model.predict(
-            temperature=weather['temperature'],
-            humidity=weather['humidity'],
-            rainfall=weather['rainfall'],
-            wind_speed=weather['wind_speed'],
-            crop_type=crop_type,
-            growth_stage=growth_stage
-        )
+        with span('predict'):
+            stress_level, confidence = predict(
+                temperature=weather['temperature'],
+                humidity=weather['humidity'],
+                rainfall=weather['rainfall'],
+                wind_speed=weather['wind_speed'],
+                crop_type=crop_type,
+                growth_stage=growth_stage
+            )
         
         # Analyze observations for stress indicators
-        observed_symptoms = analyze_observations(observations)
+        with span('observations'):
+            observed_symptoms = analyze_observations(observations)
         
         # Generate detailed, observation-based advice
-        symptom_advice = generate_observation_based_advice(
-            crop_type=crop_type,
-            stress_level=stress_level,
-            observed_symptoms=observed_symptoms,
-            temperature=weather['temperature'],
-            humidity=weather['humidity'],
-            growth_stage=growth_stage
-        )
+        with span('advice'):
+            symptom_advice = generate_observation_based_advice(
+                crop_type=crop_type,
+                stress_level=stress_level,
+                observed_symptoms=observed_symptoms,
+                temperature=weather['temperature'],
+                humidity=weather['humidity'],
+                growth_stage=growth_stage
+            )
         
         # Prepare report with crop-specific insights
         recommendation = get_crop_care(stress_level, crop_type)
@@ -154,7 +324,6 @@ def submit_report():
         color = get_stress_color(stress_level)
         
         # Get AI analysis using configured LLM provider
-        llm_provider = os.getenv('LLM_PROVIDER', 'openai')
         ai_analysis = None
         symptom_text = ', '.join([s.get('symptom', '') for s in (symptom_advice.get('symptom_analysis', []) or [])])
         
@@ -168,16 +337,13 @@ def submit_report():
             'stress_level': stress_level
         }
 
-        try:
-            if llm_provider == 'openai':
-                ai_analysis = get_ai_analysis(symptom_text or observations, crop_data_for_llm)
-            elif llm_provider == 'ollama':
-                ai_analysis = get_ollama_analysis(symptom_text or observations, crop_data_for_llm)
-            else:
-                ai_analysis = "LLM analysis not configured."
-        except Exception as e:
-            print(f"LLM analysis failed (non-critical): {str(e)}")
-            ai_analysis = "AI analysis failed to generate."
+        if REPORT_LLM_MODE != 'async':
+            try:
+                with span('llm'):
+                    ai_analysis = generate_analysis(symptom_text or observations, crop_data_for_llm)
+            except Exception as e:
+                print(f"LLM analysis failed (non-critical): {str(e)}")
+                ai_analysis = "AI analysis failed to generate."
 
         
         # Save to database instead of JSON file
@@ -195,11 +361,13 @@ def submit_report():
             ml_based_recommendation=recommendation,
             location=data.get('location', ''),
             latitude=lat,
-            longitude=lon
+            longitude=lon,
+            **recorded_weather(weather)
         )
         
-        db.session.add(report_obj)
-        db.session.commit()
+        with span('db_commit'):
+            db.session.add(report_obj)
+            db.session.commit()
         
         result = report_obj.to_dict()
         result.update({
@@ -209,34 +377,287 @@ def submit_report():
             'timestamp': report_obj.created_at.isoformat()
         })
         
+        if REPORT_LLM_MODE == 'async':
+            analysis_jobs.enqueue(report_obj.id, {
+                'symptoms': symptom_text or observations,
+                'crop_data': crop_data_for_llm
+            })
+            result.update({
+                'ai_status': 'pending',
+                'ai_status_url': f"/api/reports/{report_obj.id}",
+                'ai_events_url': f"/api/reports/{report_obj.id}/events"
+            })
+        
         return jsonify(result), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/reports/bulk', methods=['POST'])
+def submit_reports_bulk():
+    """Submit many queued reports at once (JSON array or NDJSON)
+    
+    Rows are validated, scored and stored independently: the response lists
+    a status per row and is 207 when some rows were not created. AI analysis
+    comes from the LLM cache; in async mode the rest is queued, otherwise it
+    can be fetched later from /api/reports/<id>/analysis/stream.
+    """
+    try:
+        records = parse_batch_payload(request.get_data(), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid batch payload', 'details': str(e)}), 400
+    if not isinstance(records, list):
+        return jsonify({'error': 'Invalid batch payload', 'details': 'Expected a list of reports'}), 400
+    if len(records) > REPORTS_BULK_MAX:
+        return jsonify({'error': f"At most {REPORTS_BULK_MAX} reports per request"}), 413
+    
+    try:
+        results, pending = ingest_reports(records)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if REPORT_LLM_MODE == 'async':
+        for report_id, symptoms, crop_data in pending:
+            analysis_jobs.enqueue(report_id, {'symptoms': symptoms, 'crop_data': crop_data})
+    
+    created = sum(1 for r in results if r['status'] == CREATED)
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'created': created,
+        'failed': len(results) - created,
+        'timestamp': datetime.now().isoformat()
+    }), 201 if created == len(results) else 207
+
+@app.route('/api/fields', methods=['POST'])
+def register_field_locations():
+    """Register one field (JSON object) or many (JSON array) for forecast scoring"""
+    data = request.get_json(silent=True)
+    records = [data] if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Expected a field object or a list of fields'}), 400
+    if len(records) > REPORTS_BULK_MAX:
+        return jsonify({'error': f"At most {REPORTS_BULK_MAX} fields per request"}), 413
+    
+    errors = [f"Field {i}: {error}" for i, record in enumerate(records) for error in validate_field(record)]
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+    
+    try:
+        ids = register_fields(records)
+        return jsonify({'ids': ids, 'count': len(ids)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fields/<int:field_id>/forecast', methods=['GET'])
+def get_field_forecast(field_id):
+    """Predicted stress per forecast step, as stored by the last scoring run (score_forecasts.py)"""
+    field = db.session.get(RegisteredField, field_id)
+    if field is None:
+        return jsonify({'error': 'Field not found'}), 404
+    rows = field_forecast(field_id)
+    return jsonify({
+        'field': field.to_dict(),
+        'forecast': [row.to_dict() for row in rows],
+        'count': len(rows)
+    }), 200
+
+@app.route('/api/forecast/status', methods=['GET'])
+def get_forecast_status():
+    """Progress of the latest forecast scoring run"""
+    run = latest_run()
+    return jsonify({'run': run.to_dict() if run else None}), 200
+
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
-    """Get all submitted reports from database"""
+    """Get submitted reports from database, newest first
+    
+    Query parameters:
+      per_page  page size (default 100)
+      cursor    'next_cursor' from the previous page (keyset paging)
+      page      page number, for the older OFFSET paging
+      fields    comma-separated columns, or 'all'; default is the minimal list view
+      count     'false' skips computing the total
+      crop, stress, stage, since, until, days, bbox, lat/lon/radius_km
+                filters; see report_queries.parse_filters
+    """
     try:
-        # Get query parameters for pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 100, type=int)
+        fields = parse_fields(request.args.get('fields'))
+        result = list_reports(
+            fields=fields,
+            per_page=request.args.get('per_page', 100, type=int),
+            cursor=request.args.get('cursor'),
+            page=request.args.get('page', type=int),
+            with_total=request.args.get('count', 'true').lower() not in ('false', '0', 'no'),
+            filters=parse_filters(request.args)
+        )
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/stats', methods=['GET'])
+def get_report_stats():
+    """Report counts and mean confidence for dashboards, from the rollup table
+    
+    Query parameters:
+      by        comma-separated crop, stress, stage, day, cell (default crop)
+      crop, stress, stage, since, until, days, bbox
+                filters as for GET /api/reports, at day/cell resolution
+    """
+    try:
+        result = report_stats(
+            group_by=parse_group_by(request.args.get('by')),
+            filters=parse_stats_filters(request.args)
+        )
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/export', methods=['GET'])
+def export_reports_file():
+    """Stream the reports table for analytics, in constant memory
+    
+    Query parameters:
+      format    ndjson (default), csv or parquet (needs pyarrow)
+      since     ISO updated_at watermark: only rows created or changed after it
+      fields    comma-separated columns; default all
+    The X-Export-Until header is the `since` for the next incremental export.
+    """
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        check_format(fmt)
+        fields = parse_fields(request.args.get('fields') or 'all')
+        since = request.args.get('since')
+        try:
+            since = datetime.fromisoformat(since) if since else None
+        except ValueError:
+            raise ValueError("since must be an ISO datetime")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    until = latest_update(since)
+    return Response(
+        stream_with_context(export_reports(fmt, fields, since=since, until=until)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=reports.{fmt}',
+            'X-Export-Until': until.isoformat() if until else ''
+        }
+    )
+
+@app.route('/api/reports/<int:report_id>', methods=['GET'])
+def get_report(report_id):
+    """Get a single report; poll this for ai_status in async LLM mode"""
+    report = db.session.get(Report, report_id)
+    if report is None:
+        return jsonify({'error': 'Report not found'}), 404
+    
+    result = report.to_dict()
+    result['ai_status'] = get_ai_status(report.id, report.ai_analysis)
+    return jsonify(result), 200
+
+@app.route('/api/reports/<int:report_id>/events', methods=['GET'])
+def get_report_events(report_id):
+    """Server-sent events stream that fires once the report's AI analysis is ready"""
+    report = db.session.get(Report, report_id)
+    if report is None:
+        return jsonify({'error': 'Report not found'}), 404
+    initial_analysis = report.ai_analysis
+    
+    def stream():
+        deadline = time.monotonic() + SSE_TIMEOUT
+        last_sent = time.monotonic()
+        status = get_ai_status(report_id, initial_analysis)
+        yield format_sse('status', {'id': report_id, 'ai_status': status})
         
-        # Fetch reports from database
-        reports_query = Report.query.order_by(Report.created_at.desc())
-        total = reports_query.count()
+        while status not in (DONE, FAILED, 'none'):
+            if time.monotonic() >= deadline:
+                yield format_sse('timeout', {'id': report_id, 'ai_status': status})
+                return
+            if time.monotonic() - last_sent >= 15:
+                yield ': keepalive\n\n'
+                last_sent = time.monotonic()
+            # Wakes early when a job finishes in this process; other workers' jobs are seen on the next poll
+            analysis_jobs.wait(1.0)
+            status = get_ai_status(report_id, initial_analysis)
         
-        reports_page = reports_query.paginate(page=page, per_page=per_page)
-        reports = [r.to_dict() for r in reports_page.items]
+        db.session.expire_all()
+        report = db.session.get(Report, report_id)
+        yield format_sse('analysis', {'id': report_id, 'ai_status': status, 'ai_analysis': report.ai_analysis})
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def report_llm_inputs(report):
+    """Symptom text and crop data for re-running the LLM on a stored report"""
+    # Raw observation notes are not stored, so reports without symptoms get a generic prompt
+    symptom_text = ', '.join(report.observations or []) or 'no specific symptoms reported'
+    # The weather recorded with the report; only older reports without it fetch today's
+    weather = {name: getattr(report, name) for name in WEATHER_FIELDS}
+    if any(value is None for value in weather.values()):
+        weather = get_weather_data(report.latitude, report.longitude)
+    crop_data = {
+        'crop_type': report.crop_type,
+        'growth_stage': report.growth_stage,
+        'temperature': weather['temperature'],
+        'humidity': weather['humidity'],
+        'rainfall': weather['rainfall'],
+        'wind_speed': weather['wind_speed'],
+        'stress_level': report.stress_level
+    }
+    return symptom_text, crop_data
+
+@app.route('/api/reports/<int:report_id>/analysis/stream', methods=['GET'])
+def stream_report_analysis(report_id):
+    """Server-sent events stream relaying LLM tokens as they are generated
+    
+    Sends 'token' events while the provider generates, then an 'analysis'
+    event with the full text, which is also saved to the report. A report
+    that already has an analysis gets it right away unless ?refresh=1.
+    """
+    report = db.session.get(Report, report_id)
+    if report is None:
+        return jsonify({'error': 'Report not found'}), 404
+    refresh = request.args.get('refresh') == '1'
+    existing_analysis = report.ai_analysis
+    replay = bool(existing_analysis) and not refresh
+    # Replaying a stored analysis needs no prompt, and so no weather lookup
+    symptom_text, crop_data = (None, None) if replay else report_llm_inputs(report)
+    
+    def stream():
+        if replay:
+            yield format_sse('analysis', {'id': report_id, 'ai_status': DONE, 'ai_analysis': existing_analysis})
+            return
         
-        return jsonify({
-            'reports': reports,
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'pages': reports_page.pages
-        }), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        parts = []
+        try:
+            for text in stream_analysis(symptom_text, crop_data, use_cache=not refresh):
+                parts.append(text)
+                yield format_sse('token', {'text': text})
+        except Exception as e:
+            print(f"LLM stream for report {report_id} failed: {str(e)}")
+            yield format_sse('error', {'id': report_id, 'error': 'AI analysis failed to generate.'})
+            return
+        
+        ai_analysis = ''.join(parts).strip()
+        report = db.session.get(Report, report_id)
+        if report is not None and ai_analysis:
+            report.ai_analysis = ai_analysis
+            db.session.commit()
+        yield format_sse('analysis', {'id': report_id, 'ai_status': DONE, 'ai_analysis': ai_analysis})
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/metadata', methods=['GET'])
 def get_metadata():
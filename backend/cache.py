@@ -0,0 +1,173 @@
+"""Small TTL caches shared by the weather, LLM and prediction lookups
+
+MemoryCache is a per-process LRU. SQLiteCache stores JSON values in a
+SQLite file so every gunicorn worker on the host shares one cache. Both
+expose the same get/set/stats interface; use make_cache() to pick one
+from configuration.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Thread-safe, size-bounded LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size=1024, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value; evicts least recently used entries beyond max_size"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'memory',
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLiteCache:
+    """TTL + LRU cache in a SQLite file, shared by all processes on the host
+
+    Values must be JSON-serializable. Connections are opened lazily per
+    process, so the cache is safe to create before gunicorn forks.
+    """
+
+    def __init__(self, path, table='cache', max_size=10000, ttl=600):
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.ttl = ttl
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed ON {self.table} (accessed_at)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+            conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Store a value; evicts least recently used rows beyond max_size"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, payload, expires_at, now)
+            )
+            excess = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0] - self.max_size
+            if excess > 0:
+                conn.execute(
+                    f'DELETE FROM {self.table} WHERE key IN '
+                    f'(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)',
+                    (excess,)
+                )
+                self.evictions += excess
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute(f'DELETE FROM {self.table}')
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def stats(self):
+        """Hit/miss counters for this process; size is shared across processes"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'size': len(self),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def make_cache(backend, table, max_size, ttl, path=None):
+    """Build a MemoryCache or SQLiteCache from configuration values"""
+    if backend == 'sqlite':
+        return SQLiteCache(path or 'cache.db', table=table, max_size=max_size, ttl=ttl)
+    if backend == 'memory':
+        return MemoryCache(max_size=max_size, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,170 @@
+import numpy as np
+
+
+class CompiledGradientBoosting:
+    """Pure-NumPy evaluator for a fitted GradientBoostingClassifier
+
+    Every regression tree is flattened into shared node tables (feature,
+    threshold, left, value) and all trees are walked together, one level
+    per step, for a chunk of rows at a time. Nodes are renumbered so that
+    the right child always sits at left + 1, and leaves point at themselves
+    with an infinite threshold, so one step is two gathers and a compare.
+    """
+
+    # Rows per traversal step; keeps the (trees x rows) index arrays in cache
+    CHUNK_ROWS = 128
+
+    def __init__(self, feature, threshold, left, value, roots, init_raw,
+                 learning_rate, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots  # shape (n_stages, n_trees_per_stage)
+        self.init_raw = init_raw
+        self.learning_rate = float(learning_rate)
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export the trees of a fitted GradientBoostingClassifier"""
+        if not hasattr(model, 'estimators_'):
+            raise ValueError(f"Only a GradientBoostingClassifier can be compiled, not {type(model).__name__}")
+        if model.init not in (None, 'zero'):
+            raise ValueError("Only the default or 'zero' init estimator can be compiled")
+
+        n_stages, per_stage = model.estimators_.shape
+        features, thresholds, lefts, values = [], [], [], []
+        roots = np.empty((n_stages, per_stage), dtype=np.int32)
+        offset = 0
+        max_depth = 0
+
+        for stage in range(n_stages):
+            for k in range(per_stage):
+                tree = model.estimators_[stage, k].tree_
+                order, left = _sibling_order(tree.children_left, tree.children_right)
+                is_leaf = tree.children_left[order] == -1
+
+                features.append(np.where(is_leaf, 0, tree.feature[order]))
+                thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+                lefts.append(left + offset)
+                values.append(tree.value[order, 0, 0])
+
+                roots[stage, k] = offset
+                offset += len(order)
+                max_depth = max(max_depth, tree.max_depth)
+
+        # The default init estimator predicts the class prior, a constant row
+        n_features = model.n_features_in_
+        init_raw = model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=_float32_floor(np.concatenate(thresholds)),
+            left=np.concatenate(lefts).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=roots,
+            init_raw=np.asarray(init_raw, dtype=np.float64),
+            learning_rate=model.learning_rate,
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth
+        )
+
+    def to_arrays(self):
+        """Node tables and constants as a dict of arrays plus scalar metadata"""
+        arrays = {
+            'tree_feature': self.feature,
+            'tree_threshold': self.threshold,
+            'tree_left': self.left,
+            'tree_value': self.value,
+            'tree_roots': self.roots,
+            'init_raw': self.init_raw,
+            'classes': self.classes_
+        }
+        metadata = {'learning_rate': self.learning_rate, 'max_depth': self.max_depth}
+        return arrays, metadata
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata):
+        """Rebuild from the output of to_arrays(), e.g. memory-mapped from disk"""
+        return cls(
+            feature=arrays['tree_feature'],
+            threshold=arrays['tree_threshold'],
+            left=arrays['tree_left'],
+            value=arrays['tree_value'],
+            roots=arrays['tree_roots'],
+            init_raw=arrays['init_raw'],
+            learning_rate=metadata['learning_rate'],
+            classes=arrays['classes'],
+            max_depth=metadata['max_depth']
+        )
+
+    def decision_function(self, X):
+        """Raw scores, shape (n_samples, n_trees_per_stage)"""
+        # sklearn walks trees on float32 inputs; match it for exact splits
+        X = np.asarray(X, dtype=np.float32)
+        n_stages, per_stage = self.roots.shape
+        totals = np.empty((X.shape[0], per_stage), dtype=np.float64)
+        roots = self.roots.reshape(-1, 1)
+
+        for start in range(0, X.shape[0], self.CHUNK_ROWS):
+            chunk = X[start:start + self.CHUNK_ROWS]
+            n = chunk.shape[0]
+            # Column-major flat view: feature f of row r lives at f * n + r
+            flat = np.ascontiguousarray(chunk.T).ravel()
+            column_offsets = self.feature * n
+            rows = np.arange(n, dtype=np.int32)
+
+            nodes = np.repeat(roots, n, axis=1)
+            for _ in range(self.max_depth):
+                cells = column_offsets[nodes]
+                cells += rows
+                nodes = self.left[nodes] + (flat[cells] > self.threshold[nodes])
+
+            leaf_values = self.value[nodes].reshape(n_stages, per_stage, n)
+            totals[start:start + n] = leaf_values.sum(axis=0).T
+
+        return self.init_raw + self.learning_rate * totals
+
+    def predict_proba(self, X):
+        """Class probabilities in the order of classes_"""
+        raw = self.decision_function(X)
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _sibling_order(children_left, children_right):
+    """Breadth-first node order in which every right child follows its left sibling
+
+    Returns the old node ids in new order and, for each new node, the new id
+    of its left child (its own id for leaves).
+    """
+    order = [0]
+    left = []
+    i = 0
+    while i < len(order):
+        node = order[i]
+        if children_left[node] == -1:
+            left.append(i)
+        else:
+            left.append(len(order))
+            order.append(children_left[node])
+            order.append(children_right[node])
+        i += 1
+    return np.asarray(order, dtype=np.int64), np.asarray(left, dtype=np.int64)
+
+
+def _float32_floor(thresholds):
+    """Round thresholds down to float32 without changing any float32 comparison
+
+    For a float32 x, x <= t holds exactly when x <= the largest float32 not above t.
+    """
+    rounded = thresholds.astype(np.float32)
+    too_high = rounded.astype(np.float64) > thresholds
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
@@ -0,0 +1,214 @@
+"""Forecast-driven stress scoring for registered fields
+
+Farmers register fields (POST /api/fields) once. score_forecasts.py, run
+from cron or with --every, walks registered_fields in id order,
+FORECAST_CHUNK_FIELDS at a time, and for each chunk:
+- fetches the multi-day forecast once per weather grid cell
+  (WEATHER_CELL_DEG), for the cell's centre, in parallel, reusing cells
+  already fetched in this invocation;
+- scores every field x forecast step with a single predict_batch call
+  on the loaded model;
+- replaces those fields' rows in field_forecasts and advances the run's
+  cursor (last_field_id) and counters, in one transaction.
+
+A run that stops part-way (crash, deploy, --max-chunks) stays 'running',
+and the next invocation continues after its last committed chunk. Nothing
+is scored twice and nothing is skipped. GET /api/fields/<id>/forecast reads
+the stored rows, and GET /api/forecast/status reports the latest run's
+progress.
+
+Fields whose cell forecast can't be fetched keep their previous rows and
+count as fields_failed.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert
+
+from cache import MemoryCache
+from models_db import db, FieldForecast, ForecastRun, RegisteredField
+from model_registry import get_model
+from utils import fetch_forecast, grid_cell, grid_cell_center, validate_report_data
+
+FORECAST_CHUNK_FIELDS = int(os.getenv('FORECAST_CHUNK_FIELDS', '500'))  # fields per model call and commit
+FORECAST_FETCH_WORKERS = int(os.getenv('FORECAST_FETCH_WORKERS', '8'))
+FORECAST_CELL_CACHE_SIZE = int(os.getenv('FORECAST_CELL_CACHE_SIZE', '20000'))  # cell forecasts kept per run
+# OpenWeatherMap updates its forecast every 3 hours
+FORECAST_CELL_TTL = 3 * 3600
+
+RUNNING, DONE, FAILED = 'running', 'done', 'failed'
+
+
+def validate_field(record):
+    """Errors for one field registration (validate_report_data plus string types)"""
+    if not isinstance(record, dict):
+        return ["Each field must be a JSON object"]
+    is_valid, errors = validate_report_data(record)
+    if not is_valid:
+        return errors
+    if not isinstance(record['crop_type'], str) or not isinstance(record['growth_stage'], str):
+        return ["crop_type and growth_stage must be strings"]
+    return []
+
+
+def register_fields(records):
+    """Insert validated field dicts; returns their new ids in order"""
+    rows = [{
+        'name': record.get('name'),
+        'crop_type': record['crop_type'].lower(),
+        'growth_stage': record['growth_stage'].lower(),
+        'latitude': float(record['latitude']),
+        'longitude': float(record['longitude']),
+        'created_at': datetime.utcnow()
+    } for record in records]
+    ids = db.session.execute(insert(RegisteredField).returning(RegisteredField.id, sort_by_parameter_order=True),
+                             rows).scalars().all()
+    db.session.commit()
+    return ids
+
+
+def forecasts_by_cell(fields, cache):
+    """({weather grid cell: forecast steps, or None if the fetch failed}, cells fetched)"""
+    # Fetched for the cell centre, so a field's forecast doesn't depend on its chunk-mates
+    cells = {grid_cell(field.latitude, field.longitude) for field in fields}
+    forecasts, missing = {}, {}
+    for cell in cells:
+        steps = cache.get(cell)
+        if steps is None:
+            missing[cell] = grid_cell_center(cell)
+        else:
+            forecasts[cell] = steps
+
+    def fetch(point):
+        try:
+            return fetch_forecast(*point)
+        except Exception as e:
+            print(f"Forecast for {point[0]:.4f},{point[1]:.4f} failed: {e}")
+            return None
+
+    fetched = 0
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(FORECAST_FETCH_WORKERS, len(missing)))) as pool:
+            for cell, steps in zip(missing, pool.map(fetch, missing.values())):
+                forecasts[cell] = steps
+                if steps is not None:
+                    cache.set(cell, steps)
+                    fetched += 1
+    return forecasts, fetched
+
+
+def score_fields(fields, forecasts, run_id):
+    """(ids of fields scored, FieldForecast rows, number of fields without a forecast)"""
+    inputs = []
+    scored, failed = [], 0
+    for field in fields:
+        steps = forecasts.get(grid_cell(field.latitude, field.longitude))
+        if not steps:
+            failed += 1
+            continue
+        scored.append(field.id)
+        inputs.extend((field, step) for step in steps)
+    if not inputs:
+        return scored, [], failed
+
+    # Every field x step of the chunk in one model call. Straight to the model:
+    # per-row prediction cache keys would cost more than the scoring itself
+    stress_levels, confidences = get_model().predict_batch(
+        temperature=[step['temperature'] for _, step in inputs],
+        humidity=[step['humidity'] for _, step in inputs],
+        rainfall=[step['rainfall'] for _, step in inputs],
+        wind_speed=[step['wind_speed'] for _, step in inputs],
+        crop_type=[field.crop_type for field, _ in inputs],
+        growth_stage=[field.growth_stage for field, _ in inputs]
+    )
+    scored_at = datetime.utcnow()
+    rows = [
+        dict(step, field_id=field.id, stress_level=int(level), confidence=round(float(confidence), 2),
+             run_id=run_id, scored_at=scored_at)
+        for (field, step), level, confidence in zip(inputs, stress_levels, confidences)
+    ]
+    return scored, rows, failed
+
+
+def start_run(restart=False):
+    """The unfinished run to resume, or a new one"""
+    run = ForecastRun.query.filter_by(status=RUNNING).order_by(ForecastRun.id.desc()).first()
+    if run is not None and restart:
+        run.status = FAILED
+        run.error = 'Abandoned for a new run'
+        run.finished_at = datetime.utcnow()
+        run = None
+    if run is None:
+        run = ForecastRun(status=RUNNING, fields_total=db.session.query(func.count(RegisteredField.id)).scalar())
+        db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def run_forecast_job(restart=False, chunk_fields=None, max_chunks=None, log=print):
+    """Score registered fields from current forecasts, resuming an unfinished run; returns the run
+
+    With max_chunks the run stops after that many chunks and stays
+    resumable. Needs an app context.
+    """
+    chunk_fields = chunk_fields or FORECAST_CHUNK_FIELDS
+    run = start_run(restart)
+    cache = MemoryCache(max_size=FORECAST_CELL_CACHE_SIZE, ttl=FORECAST_CELL_TTL)
+    if run.fields_done:
+        log(f"Resuming forecast run {run.id} after field {run.last_field_id} "
+            f"({run.fields_done}/{run.fields_total} fields done)")
+    chunks = 0
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            fields = (RegisteredField.query
+                      .filter(RegisteredField.id > run.last_field_id)
+                      .order_by(RegisteredField.id)
+                      .limit(chunk_fields)
+                      .all())
+            if not fields:
+                run.status = DONE
+                run.finished_at = datetime.utcnow()
+                # Fields registered during the run are scored too
+                run.fields_total = max(run.fields_total, run.fields_done)
+                db.session.commit()
+                break
+
+            forecasts, fetched = forecasts_by_cell(fields, cache)
+            scored, rows, failed = score_fields(fields, forecasts, run.id)
+
+            # The rows and the cursor commit together: a resumed run starts after this chunk
+            if scored:
+                db.session.execute(delete(FieldForecast).where(FieldForecast.field_id.in_(scored)))
+            if rows:
+                db.session.execute(FieldForecast.__table__.insert(), rows)
+            run.last_field_id = fields[-1].id
+            run.fields_done += len(fields)
+            run.fields_failed += failed
+            run.cells_fetched += fetched
+            run.rows_written += len(rows)
+            db.session.commit()
+            chunks += 1
+            log(f"Forecast run {run.id}: {run.fields_done}/{run.fields_total} fields, "
+                f"{run.cells_fetched} cells fetched, {run.rows_written} rows, {run.fields_failed} without forecast")
+    except Exception as e:
+        db.session.rollback()
+        # Still 'running': the next invocation resumes after the last committed chunk
+        run.error = f"{type(e).__name__}: {e}"
+        db.session.commit()
+        raise
+    return run
+
+
+def latest_run():
+    """The most recent ForecastRun, or None"""
+    return ForecastRun.query.order_by(ForecastRun.id.desc()).first()
+
+
+def field_forecast(field_id):
+    """Stored forecast rows of a field, oldest step first"""
+    return (FieldForecast.query
+            .filter_by(field_id=field_id)
+            .order_by(FieldForecast.forecast_at)
+            .all())
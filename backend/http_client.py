@@ -0,0 +1,122 @@
+"""Shared outbound HTTP layer for the weather and LLM integrations
+
+All calls go through one requests.Session per process, so connections
+(and TLS sessions) stay alive between calls. The session is capped at
+HTTP_POOL_MAXSIZE connections per host, and failed connects and 5xx
+responses are retried with jittered exponential backoff. Every call is
+timed under a service name; get_http_metrics() returns the counters.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))  # distinct hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))  # connections per host
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.2'))  # seconds, doubled per retry
+HTTP_BACKOFF_JITTER = float(os.getenv('HTTP_BACKOFF_JITTER', '0.2'))  # up to this many extra seconds
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # Status/read retries only for idempotent calls; connect errors retry for any method
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=HTTP_BACKOFF,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """The process-wide pooled session (rebuilt after a fork)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def record_call(service, elapsed, ok=True):
+    """Add one call's latency (seconds) to the metrics of a service"""
+    elapsed_ms = elapsed * 1000
+    with _metrics_lock:
+        m = _metrics.get(service)
+        if m is None:
+            m = _metrics[service] = {
+                'calls': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            }
+        m['calls'] += 1
+        m['errors'] += 0 if ok else 1
+        m['total_ms'] += elapsed_ms
+        m['max_ms'] = max(m['max_ms'], elapsed_ms)
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound), len(LATENCY_BUCKETS_MS))
+        m['buckets'][bucket] += 1
+
+
+def request(service, method, url, **kwargs):
+    """Send a request through the pooled session and record its latency
+
+    Raises like requests does; non-2xx responses are returned, not raised.
+    """
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = get_session().request(method, url, **kwargs)
+        ok = response.status_code < 400
+        return response
+    finally:
+        record_call(service, time.perf_counter() - start, ok)
+
+
+def get_http_metrics():
+    """Per-service call counts, error counts and latency summary"""
+    with _metrics_lock:
+        result = {}
+        for service, m in _metrics.items():
+            result[service] = {
+                'calls': m['calls'],
+                'errors': m['errors'],
+                'mean_ms': round(m['total_ms'] / m['calls'], 2) if m['calls'] else 0.0,
+                'max_ms': round(m['max_ms'], 2),
+                'histogram_ms': {
+                    (f"le_{bound}" if i < len(LATENCY_BUCKETS_MS) else 'inf'): count
+                    for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), m['buckets']))
+                }
+            }
+        return result
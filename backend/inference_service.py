@@ -0,0 +1,216 @@
+"""Inference sidecar: one loaded model serving every gunicorn worker
+
+Run it next to the app and point the workers at it with INFERENCE_SOCKET
+(gunicorn.conf.py starts and stops it by itself when that is set):
+
+    INFERENCE_SOCKET=/tmp/b2g-inference.sock python inference_service.py
+
+Workers send newline-delimited JSON requests over the Unix socket, one
+per prediction call, with the predict_batch columns as lists. The
+sidecar queues them, and a single thread scores everything that arrived
+within INFERENCE_MAX_WAIT_US of the first request, up to
+INFERENCE_MAX_BATCH rows, as one predict_batch call. Each connection then
+gets back {"stress_levels": [...], "confidences": [...]}.
+
+InferenceClient is the worker side. model_registry.predict/predict_batch
+use it when INFERENCE_SOCKET is set and fall back to an in-process model
+when the sidecar can't be reached.
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+INFERENCE_SOCKET = os.getenv('INFERENCE_SOCKET', '')
+INFERENCE_MAX_BATCH = int(os.getenv('INFERENCE_MAX_BATCH', '64'))  # rows per model call
+INFERENCE_MAX_WAIT_US = int(os.getenv('INFERENCE_MAX_WAIT_US', '500'))  # how long a batch stays open
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '5'))  # seconds a worker waits for a reply
+
+COLUMNS = ('temperature', 'humidity', 'rainfall', 'wind_speed', 'crop_type', 'growth_stage')
+
+
+class MicroBatcher:
+    """Merge concurrent predict_batch calls into fewer, larger model calls"""
+
+    def __init__(self, predict_batch, max_batch=INFERENCE_MAX_BATCH, max_wait_us=INFERENCE_MAX_WAIT_US):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_us / 1e6
+        self.calls = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, columns):
+        """Score one request's columns; blocks until its batch has run"""
+        item = {'columns': columns, 'rows': len(columns['crop_type']), 'done': threading.Event()}
+        self._queue.put(item)
+        item['done'].wait()
+        if 'error' in item:
+            raise item['error']
+        return item['result']
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = batch[0]['rows']
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += item['rows']
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                columns = {name: [v for item in batch for v in item['columns'][name]] for name in COLUMNS}
+                levels, confidences = self.predict_batch(**columns)
+                start = 0
+                for item in batch:
+                    end = start + item['rows']
+                    item['result'] = (levels[start:end], confidences[start:end])
+                    start = end
+            except Exception as e:
+                for item in batch:
+                    item['error'] = e
+            self.calls += len(batch)
+            self.batches += 1
+            for item in batch:
+                item['done'].set()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                levels, confidences = self.server.batcher.submit({name: request[name] for name in COLUMNS})
+                reply = {'stress_levels': levels.tolist(), 'confidences': confidences.tolist()}
+            except Exception as e:
+                reply = {'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, batcher):
+        self.batcher = batcher
+        super().__init__(path, _Handler)
+
+
+class InferenceClient:
+    """Worker-side connection to the sidecar, one socket per thread"""
+
+    def __init__(self, path=INFERENCE_SOCKET, timeout=INFERENCE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    def predict_batch(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """Same contract as CropStressModel.predict_batch, scored by the sidecar"""
+        request = {
+            'temperature': [float(v) for v in temperature],
+            'humidity': [float(v) for v in humidity],
+            'rainfall': [float(v) for v in rainfall],
+            'wind_speed': [float(v) for v in wind_speed],
+            'crop_type': [str(v) for v in crop_type],
+            'growth_stage': [str(v) for v in growth_stage]
+        }
+        sock, reader = self._connection()
+        try:
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            line = reader.readline()
+        except OSError:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise ConnectionError("inference sidecar closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise RuntimeError(f"inference sidecar: {reply['error']}")
+        return np.asarray(reply['stress_levels'], dtype=int), np.asarray(reply['confidences'], dtype=float)
+
+
+def is_serving(path):
+    """Whether something accepts connections on the socket path"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(path, max_batch=INFERENCE_MAX_BATCH, max_wait_us=INFERENCE_MAX_WAIT_US):
+    from model_registry import get_model, predict_batch_in_process
+
+    if os.path.exists(path):
+        if is_serving(path):
+            raise SystemExit(f"An inference sidecar is already listening on {path}")
+        os.unlink(path)  # left over from a sidecar that died
+
+    get_model()
+    batcher = MicroBatcher(predict_batch_in_process, max_batch, max_wait_us)
+    server = InferenceServer(path, batcher)
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"Inference sidecar listening on {path} (max batch {max_batch}, max wait {max_wait_us} us)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+        print(f"Inference sidecar stopped: {batcher.calls} calls in {batcher.batches} model calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', default=INFERENCE_SOCKET or 'inference.sock')
+    parser.add_argument('--max-batch', type=int, default=INFERENCE_MAX_BATCH)
+    parser.add_argument('--max-wait-us', type=int, default=INFERENCE_MAX_WAIT_US)
+    args = parser.parse_args()
+    serve(args.socket, args.max_batch, args.max_wait_us)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,48 @@
+import json
 import os
-from openai import OpenAI
+import threading
+import time
 
-def get_ai_analysis(symptoms, crop_data):
-    """Get analysis from OpenAI instead of Ollama"""
-    
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    
+import http_client
+from cache import make_cache
+from utils import SYMPTOM_TYPES
+
+# Persistent answer cache keyed on the canonical report inputs
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'sqlite')  # 'sqlite', 'memory' or 'off'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'llm_cache.db')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '50000'))
+
+llm_cache = None
+if LLM_CACHE_BACKEND != 'off':
+    llm_cache = make_cache(
+        LLM_CACHE_BACKEND,
+        table='llm_cache',
+        max_size=LLM_CACHE_SIZE,
+        ttl=LLM_CACHE_TTL,
+        path=LLM_CACHE_PATH
+    )
+
+_openai_client = None
+_openai_lock = threading.Lock()
+
+def get_openai_client():
+    """Process-wide OpenAI client, so its connection pool is reused across reports"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                # Imported on first use: the SDK is slow to import and only needed for LLM_PROVIDER=openai
+                from openai import OpenAI
+                _openai_client = OpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    max_retries=http_client.HTTP_RETRIES,
+                    timeout=30
+                )
+    return _openai_client
+
+def build_openai_messages(symptoms, crop_data):
+    """Chat messages for the OpenAI analysis of a report"""
     prompt = f"""
     Analyze this crop stress situation and provide actionable recommendations:
     
@@ -21,31 +58,45 @@ def get_ai_analysis(symptoms, crop_data):
     
     Keep response concise and practical.
     """
+    return [
+        {"role": "system", "content": "You are an agricultural expert specialized in crop stress management."},
+        {"role": "user", "content": prompt}
+    ]
+
+def build_ollama_request(symptoms, crop_data, stream=False):
+    """JSON body for Ollama's /api/generate"""
+    prompt = f"Analyze: {crop_data['crop_type']} with {symptoms}"
+    return {"model": "mistral", "prompt": prompt, "stream": stream}
+
+def get_ai_analysis(symptoms, crop_data):
+    """Get analysis from OpenAI instead of Ollama"""
+    client = get_openai_client()
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an agricultural expert specialized in crop stress management."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=500
-    )
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_openai_messages(symptoms, crop_data),
+            temperature=0.7,
+            max_tokens=500
+        )
+        ok = True
+    finally:
+        http_client.record_call('openai', time.perf_counter() - start, ok)
     
     return response.choices[0].message.content
 
 def get_ollama_analysis(symptoms, crop_data):
     """Fallback to local Ollama if available"""
-    import requests
-    import json
-    
     ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434/api/generate')
     
     try:
-        prompt = f"Analyze: {crop_data['crop_type']} with {symptoms}"
-        response = requests.post(
+        response = http_client.request(
+            'ollama',
+            'POST',
             ollama_url,
-            json={"model": "mistral", "prompt": prompt, "stream": False},
+            json=build_ollama_request(symptoms, crop_data),
             timeout=10
         )
         if response.status_code == 200:
@@ -53,4 +104,148 @@ def get_ollama_analysis(symptoms, crop_data):
     except:
         pass
     
-    return None  # Fall back to default recommendations
\ No newline at end of file
+    return None  # Fall back to default recommendations
+
+def stream_ai_analysis(symptoms, crop_data):
+    """Yield OpenAI completion text as it is generated"""
+    client = get_openai_client()
+    
+    start = time.perf_counter()
+    ok = False
+    try:
+        chunks = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_openai_messages(symptoms, crop_data),
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        ok = True
+    finally:
+        http_client.record_call('openai', time.perf_counter() - start, ok)
+
+def stream_ollama_analysis(symptoms, crop_data):
+    """Yield Ollama tokens from its NDJSON stream as they arrive"""
+    ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434/api/generate')
+    
+    # timeout applies to the connect and to each read, not to the whole generation
+    response = http_client.request(
+        'ollama',
+        'POST',
+        ollama_url,
+        json=build_ollama_request(symptoms, crop_data, stream=True),
+        stream=True,
+        timeout=10
+    )
+    try:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+            if chunk.get('response'):
+                yield chunk['response']
+            if chunk.get('done'):
+                break
+    finally:
+        # Also runs when the client disconnects mid-stream, freeing the pooled connection
+        response.close()
+
+def weather_bucket(crop_data):
+    """Coarse weather band used in the cache key: 2°C, 10% RH, 2 mm, 2 m/s steps"""
+    return [
+        int(float(crop_data.get('temperature', 0)) // 2) * 2,
+        int(float(crop_data.get('humidity', 0)) // 10) * 10,
+        int(float(crop_data.get('rainfall', 0)) // 2) * 2,
+        int(float(crop_data.get('wind_speed', 0)) // 2) * 2
+    ]
+
+def canonical_symptoms(symptoms):
+    """Sorted symptom names for a symptom list, or a normalized form of free-text notes"""
+    if isinstance(symptoms, (list, tuple)):
+        names = [str(s).strip().lower() for s in symptoms]
+    else:
+        names = [part.strip().lower() for part in (symptoms or '').split(',') if part.strip()]
+    if all(name in SYMPTOM_TYPES for name in names):
+        return sorted(set(names))
+    # Free-text notes go into the prompt verbatim, so only identical notes may share an answer
+    return 'notes:' + ' '.join((symptoms or '').lower().split())
+
+def llm_cache_key(provider, symptoms, crop_data):
+    """Canonical cache key: provider, crop, stage, stress, symptoms and weather band"""
+    return json.dumps([
+        provider,
+        (crop_data.get('crop_type') or '').lower(),
+        (crop_data.get('growth_stage') or '').lower(),
+        int(crop_data.get('stress_level') or 0),
+        canonical_symptoms(symptoms),
+        weather_bucket(crop_data)
+    ])
+
+def get_llm_cache_stats():
+    """Hit/miss counters of the LLM answer cache, or None when disabled"""
+    return llm_cache.stats() if llm_cache is not None else None
+
+def cached_analysis(symptoms, crop_data, provider=None):
+    """The cached answer for these inputs, or None; never calls the provider"""
+    provider = provider or os.getenv('LLM_PROVIDER', 'openai')
+    if provider not in ('openai', 'ollama') or llm_cache is None:
+        return None
+    return llm_cache.get(llm_cache_key(provider, symptoms, crop_data))
+
+def generate_analysis(symptoms, crop_data, provider=None, use_cache=True):
+    """Run the configured LLM provider for a report; raises if the call fails"""
+    provider = provider or os.getenv('LLM_PROVIDER', 'openai')
+    if provider not in ('openai', 'ollama'):
+        return "LLM analysis not configured."
+    
+    cache_key = None
+    if use_cache and llm_cache is not None:
+        cache_key = llm_cache_key(provider, symptoms, crop_data)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    if provider == 'openai':
+        analysis = get_ai_analysis(symptoms, crop_data)
+    else:
+        analysis = get_ollama_analysis(symptoms, crop_data)
+    
+    # Empty answers (e.g. Ollama unavailable) are not worth remembering
+    if cache_key is not None and analysis:
+        llm_cache.set(cache_key, analysis)
+    return analysis
+
+def stream_analysis(symptoms, crop_data, provider=None, use_cache=True):
+    """Yield the analysis text in chunks as the provider generates it; raises if the call fails
+
+    A cached answer is yielded as a single chunk. A completed stream is
+    cached like generate_analysis does.
+    """
+    provider = provider or os.getenv('LLM_PROVIDER', 'openai')
+    if provider not in ('openai', 'ollama'):
+        yield "LLM analysis not configured."
+        return
+    
+    cache_key = None
+    if use_cache and llm_cache is not None:
+        cache_key = llm_cache_key(provider, symptoms, crop_data)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    chunks = stream_ai_analysis if provider == 'openai' else stream_ollama_analysis
+    parts = []
+    for text in chunks(symptoms, crop_data):
+        parts.append(text)
+        yield text
+    
+    analysis = ''.join(parts)
+    if cache_key is not None and analysis:
+        llm_cache.set(cache_key, analysis)
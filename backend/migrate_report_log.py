@@ -0,0 +1,129 @@
+"""Move reports from the file-mode NDJSON log into the Report table
+
+Kiosks that ran in file mode keep their reports in reports.ndjson (see
+report_log). This copies them into the database in chunks, updates the
+rollups and then compacts the migrated records out of the log:
+
+    python migrate_report_log.py --log reports.ndjson
+    python migrate_report_log.py --legacy reports.json   # old single-array file first
+
+Progress is checkpointed in <log>.migrated after every chunk, so an
+interrupted run resumes where it stopped instead of inserting twice.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+# Migration never predicts, so don't pay for loading the model
+os.environ.setdefault('MODEL_EAGER_LOAD', '0')
+
+from sqlalchemy import insert
+
+from app import app
+from models_db import db, Report, ROLLUP_SOURCE_FIELDS, WEATHER_FIELDS, count_in_rollups, geo_cell_for
+from report_log import REPORT_LOG_PATH, ReportLog
+
+REPORT_COLUMNS = set(Report.__table__.columns.keys()) - {'id', 'geo_cell'}
+
+
+def report_row(entry):
+    """Report column values for a log entry, or None if it has no crop_type"""
+    if not entry.get('crop_type'):
+        return None
+    row = {name: entry[name] for name in REPORT_COLUMNS if name in entry}
+    created = entry.get('created_at') or entry.get('timestamp')
+    try:
+        row['created_at'] = datetime.fromisoformat(created) if created else datetime.utcnow()
+    except (TypeError, ValueError):
+        row['created_at'] = datetime.utcnow()
+    row['updated_at'] = row['created_at']
+    for name in ('latitude', 'longitude', 'confidence', *WEATHER_FIELDS):
+        try:
+            row[name] = float(row[name]) if row.get(name) is not None else None
+        except (TypeError, ValueError):
+            row[name] = None
+    row['geo_cell'] = geo_cell_for(row['latitude'], row['longitude'])
+    # ORM bulk inserts need the same keys in every row
+    return {name: row.get(name) for name in REPORT_COLUMNS | {'geo_cell'}}
+
+
+def import_legacy(log, legacy_path):
+    """Append the reports of an old reports.json array to the log; returns the count"""
+    with open(legacy_path) as f:
+        reports = json.load(f)
+    for report in reports:
+        report = dict(report)
+        report.pop('id', None)  # the log assigns its own
+        log.append(report)
+    os.replace(legacy_path, legacy_path + '.imported')
+    return len(reports)
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, last_id):
+    with open(path + '.tmp', 'w') as f:
+        f.write(str(last_id))
+    os.replace(path + '.tmp', path)
+
+
+def migrate(log, chunk_size):
+    """Insert log records past the checkpoint; returns (inserted, skipped, last migrated id)"""
+    checkpoint_path = log.path + '.migrated'
+    last_id = read_checkpoint(checkpoint_path)
+    inserted = skipped = 0
+    chunk, chunk_last = [], last_id
+
+    def flush():
+        if chunk:
+            db.session.execute(insert(Report), chunk)
+            count_in_rollups(db.session.connection(), [{name: row[name] for name in ROLLUP_SOURCE_FIELDS} for row in chunk])
+        db.session.commit()
+        write_checkpoint(checkpoint_path, chunk_last)
+
+    with app.app_context():
+        for entry in log.iter_reports(after_id=last_id):
+            row = report_row(entry)
+            if row is None:
+                skipped += 1
+            else:
+                chunk.append(row)
+            chunk_last = entry['id']
+            if len(chunk) >= chunk_size:
+                flush()
+                inserted += len(chunk)
+                chunk = []
+        if chunk_last != last_id:
+            flush()
+            inserted += len(chunk)
+    return inserted, skipped, chunk_last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--log', default=REPORT_LOG_PATH, help="NDJSON report log")
+    parser.add_argument('--legacy', help="old reports.json array to append to the log first")
+    parser.add_argument('--chunk', type=int, default=1000, help="rows per INSERT/commit")
+    parser.add_argument('--keep', action='store_true', help="don't compact migrated records out of the log")
+    args = parser.parse_args()
+
+    log = ReportLog(args.log)
+    if args.legacy:
+        print(f"Imported {import_legacy(log, args.legacy)} reports from {args.legacy} into {args.log}")
+
+    inserted, skipped, last_id = migrate(log, max(1, args.chunk))
+    print(f"Migrated {inserted} reports into the database ({skipped} without crop_type skipped)")
+    if not args.keep:
+        print(f"Compacted {log.compact(last_id)} migrated records out of {args.log}")
+
+
+if __name__ == '__main__':
+    main()
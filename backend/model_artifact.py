@@ -0,0 +1,105 @@
+"""Versioned, pickle-free on-disk format for the crop stress model
+
+An artifact is a directory holding a small manifest.json plus one .npy
+file per array (tree tables, scaler mean/scale, encoder classes). Arrays
+are opened with np.load(mmap_mode='r'), so opening is just a few mmap
+calls and gunicorn workers share the same page-cache pages.
+
+Convert an existing pickle with:
+    python model_artifact.py model.pkl model_artifact
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import numpy as np
+
+ARTIFACT_FORMAT = 'b2g-crop-stress-model'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def write_artifact(path, arrays, metadata, artifact_format=ARTIFACT_FORMAT):
+    """Write arrays and metadata as an artifact directory, replacing any existing one"""
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_dir = os.path.join(parent, f".{os.path.basename(path)}.tmp.{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {
+        'format': artifact_format,
+        'version': ARTIFACT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'metadata': metadata,
+        'arrays': {}
+    }
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype == object:
+            array = array.astype(str)
+        file_name = f"{name}.npy"
+        np.save(os.path.join(tmp_dir, file_name), array, allow_pickle=False)
+        manifest['arrays'][name] = {
+            'file': file_name,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape)
+        }
+
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished directory into place; readers see the old or the new one
+    old_dir = None
+    if os.path.exists(path):
+        old_dir = f"{tmp_dir}.old"
+        os.replace(path, old_dir)
+    os.replace(tmp_dir, path)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_artifact(path, mmap=True, artifact_format=ARTIFACT_FORMAT):
+    """Open an artifact directory, returning (arrays, metadata)"""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != artifact_format:
+        raise ValueError(f"{path} is not a {artifact_format} artifact")
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported model artifact version {manifest.get('version')} (expected {ARTIFACT_VERSION})")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        array = np.load(
+            os.path.join(path, spec['file']),
+            mmap_mode='r' if mmap else None,
+            allow_pickle=False
+        )
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"Artifact array '{name}' does not match its manifest entry")
+        # Plain ndarray views over the mapping avoid np.memmap's per-slice overhead
+        arrays[name] = np.asarray(array)
+    return arrays, manifest['metadata']
+
+
+def convert_pickle(pickle_path, artifact_path):
+    """Convert a model.pkl written by CropStressModel.save_model into an artifact"""
+    from models import CropStressModel
+
+    if not os.path.isfile(pickle_path):
+        raise FileNotFoundError(pickle_path)
+    model = CropStressModel(autoload=False)
+    model.load_model(pickle_path)
+    model.save_artifact(artifact_path)
+    return model
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python model_artifact.py <model.pkl> <artifact_dir>")
+        sys.exit(1)
+    convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"Wrote model artifact to {sys.argv[2]}")
@@ -0,0 +1,198 @@
+"""Process-wide owner of the loaded CropStressModel
+
+The model is loaded (or trained, if no artifact exists) at most once per
+process, on the first call to get_model(). When gunicorn runs with
+--preload the master process makes that call while importing the app, so
+forked workers inherit the loaded model through copy-on-write instead of
+each loading their own. A file lock next to the artifact keeps concurrent
+workers from training the same missing model in parallel.
+
+With MODEL_RELOAD_INTERVAL set, get_model() also checks every that many
+seconds whether MODEL_PATH was replaced (train_model.py and
+model_artifact.py swap in new files atomically) and, if so, loads the new
+model in the calling request. Each worker reloads on its own, so the
+reloaded model is no longer shared copy-on-write.
+
+predict() and predict_batch() are what request handlers call. With
+INFERENCE_SOCKET set they go to the inference sidecar (see
+inference_service.py), which batches calls from every worker into one
+model; if it can't be reached they use this process's model instead and
+try the sidecar again INFERENCE_RETRY seconds later. Whichever process
+holds the model answers, through the prediction cache (prediction_cache.py)
+when PREDICT_CACHE_BACKEND enables it. Its keys include the model's
+version, so a reload invalidates it.
+
+With MODEL_LATTICE_PATH set, a precomputed stress lattice compiled from
+the same model (see stress_lattice.py) is attached after every load and
+answers in-bounds predictions by lookup. Replacing the lattice file also
+counts as a new model version.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, training may repeat
+    fcntl = None
+
+from inference_service import INFERENCE_SOCKET, InferenceClient
+from models import CropStressModel
+from prediction_cache import prediction_memo
+from stress_lattice import MODEL_LATTICE_PATH, attach_lattice
+
+MODEL_PATH = os.getenv('MODEL_PATH', 'model.pkl')
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '0'))  # seconds; 0 never reloads
+
+_model = None
+_next_reload_check = 0.0
+_lock = threading.Lock()
+INFERENCE_RETRY = float(os.getenv('INFERENCE_RETRY', '5'))  # seconds before retrying an unreachable sidecar
+
+_sidecar = InferenceClient(INFERENCE_SOCKET) if INFERENCE_SOCKET else None
+_sidecar_retry_at = 0.0
+_startup_timings = {}
+
+
+def record_phase(name, seconds):
+    """Record the wall time of a startup phase"""
+    _startup_timings[name] = round(seconds * 1000, 1)
+
+
+@contextmanager
+def startup_phase(name):
+    """Time the enclosed block as a startup phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def get_startup_timings():
+    """Startup phase timings recorded so far, in milliseconds"""
+    return dict(_startup_timings)
+
+
+def get_model():
+    """Return the shared CropStressModel, loading or training it on first use"""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = _load_or_train(MODEL_PATH)
+    elif MODEL_RELOAD_INTERVAL > 0 and time.monotonic() >= _next_reload_check:
+        _reload_if_replaced()
+    return _model
+
+
+def uses_sidecar():
+    """Whether predictions currently go to the inference sidecar"""
+    return _sidecar is not None and time.monotonic() >= _sidecar_retry_at
+
+
+def predict_batch(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+    """CropStressModel.predict_batch on the sidecar if there is one, else in process"""
+    global _sidecar_retry_at
+    if uses_sidecar():
+        try:
+            return _sidecar.predict_batch(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+        except Exception as e:
+            _sidecar_retry_at = time.monotonic() + INFERENCE_RETRY
+            print(f"Inference sidecar unavailable, predicting in process for {INFERENCE_RETRY:g} s: {e}")
+    return predict_batch_in_process(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+
+
+def predict_batch_in_process(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+    """predict_batch on this process's model, through the prediction cache if enabled"""
+    if prediction_memo is not None:
+        return prediction_memo.predict_batch(get_model(), temperature, humidity, rainfall, wind_speed,
+                                             crop_type, growth_stage)
+    return get_model().predict_batch(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+
+
+def predict(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+    """CropStressModel.predict for one sample, on the sidecar if there is one"""
+    if uses_sidecar():
+        levels, confidences = predict_batch([temperature], [humidity], [rainfall], [wind_speed],
+                                            [crop_type], [growth_stage])
+        return int(levels[0]), float(confidences[0])
+    if prediction_memo is not None:
+        return prediction_memo.predict(get_model(), temperature, humidity, rainfall, wind_speed,
+                                       crop_type, growth_stage)
+    return get_model().predict(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+
+
+def is_loaded():
+    """Whether the model has been loaded in this process"""
+    return _model is not None
+
+
+def _load_or_train(path):
+    model = CropStressModel(autoload=False)
+    with _artifact_lock(path):
+        # Another process may have trained it while we waited for the lock
+        phase = 'load_model' if os.path.exists(path) else 'train_model'
+        model.version = _version(path)
+        with startup_phase(phase):
+            model.load_model(path)
+            attach_lattice(model, path)
+        model.version = model.version or _version(path)
+    print(f"Model ready ({phase}: {_startup_timings[phase]} ms)")
+    return model
+
+
+def _file_stamp(path):
+    """'inode-mtime' of a model file or artifact directory; changes when it is swapped"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_ino}-{stat.st_mtime_ns}"
+
+
+def _version(path):
+    """Model version: the model file's stamp, plus the lattice's when one is configured"""
+    stamp = _file_stamp(path)
+    if stamp is not None and MODEL_LATTICE_PATH:
+        stamp = f"{stamp}+{_file_stamp(MODEL_LATTICE_PATH)}"
+    return stamp
+
+
+def _reload_if_replaced():
+    global _model, _next_reload_check
+    # One thread checks; the others keep serving the current model meanwhile
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _next_reload_check = time.monotonic() + MODEL_RELOAD_INTERVAL
+        stamp = _version(MODEL_PATH)
+        if stamp is None or stamp == _model.version:
+            return
+        start = time.perf_counter()
+        model = CropStressModel(autoload=False)
+        model.load_model(MODEL_PATH)
+        attach_lattice(model, MODEL_PATH)
+        model.version = stamp
+        _model = model
+        print(f"Reloaded model from {MODEL_PATH} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    except Exception as e:
+        # A bad artifact must not take the server down: keep the old model, retry next interval
+        print(f"Model reload failed, keeping the current model: {e}")
+    finally:
+        _lock.release()
+
+
+@contextmanager
+def _artifact_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,22 +1,60 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.model_selection import train_test_split
 import pickle
 import os
 
+from compiled_model import CompiledGradientBoosting
+from model_artifact import read_artifact, write_artifact
+
+# 'sklearn' or 'compiled' (pure-NumPy tree traversal, see compiled_model.py)
+MODEL_INFERENCE = os.getenv('MODEL_INFERENCE', 'sklearn')
+# Above this many rows sklearn's C tree walk is faster than the NumPy traversal
+COMPILED_MAX_BATCH = int(os.getenv('COMPILED_MAX_BATCH', '128'))
+
+# Hyperparameters of the serving GradientBoostingClassifier (also used by train_model.py)
+GRADIENT_BOOSTING_PARAMS = {
+    'n_estimators': 150,
+    'learning_rate': 0.03,
+    'max_depth': 6,
+    'subsample': 0.85,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'verbose': 0
+}
+
 class CropStressModel:
-    def __init__(self):
+    def __init__(self, autoload=True):
         self.model = None
+        self.crop_encoder = None
+        self.stage_encoder = None
+        self.scaler = None
+        self.feature_names = ['temperature', 'humidity', 'rainfall', 'wind_speed', 'crop_type_encoded', 'growth_stage_encoded']
+        self.compiled = None
+        # Identifies the loaded artifact (set by model_registry); part of prediction cache keys
+        self.version = None
+        # Precomputed StressLattice answering in-bounds inputs (see stress_lattice.py)
+        self.lattice = None
+        # Plain arrays behind the vectorized path; taken from the fitted
+        # encoders/scaler or memory-mapped straight from a model artifact
+        self.crop_classes = None
+        self.stage_classes = None
+        self.scaler_mean = None
+        self.scaler_scale = None
+        if autoload:
+            self.load_model()
+        
+    def train(self, data_path='training_data_expanded.csv', save_path='model.pkl'):
+        """Train the ML model on historical data"""
+        # Training-only dependencies; kept out of the serving import path for faster cold starts
+        import pandas as pd
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        
         self.crop_encoder = LabelEncoder()
         self.stage_encoder = LabelEncoder()
         self.scaler = StandardScaler()
-        self.feature_names = ['temperature', 'humidity', 'rainfall', 'wind_speed', 'crop_type_encoded', 'growth_stage_encoded']
-        self.load_model()
         
-    def train(self, data_path='training_data_expanded.csv'):
-        """Train the ML model on historical data"""
         print("Loading training data...")
         df = pd.read_csv(data_path)
         
@@ -36,17 +74,10 @@ class CropStressModel:
         
         # Train model with improved hyperparameters
         print("Training Gradient Boosting model...")
-        self.model = GradientBoostingClassifier(
-            n_estimators=150,
-            learning_rate=0.03,
-            max_depth=6,
-            subsample=0.85,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            verbose=0
-        )
+        self.model = GradientBoostingClassifier(**GRADIENT_BOOSTING_PARAMS)
         self.model.fit(X_train, y_train)
+        self.compiled = None
+        self._extract_preprocessing_arrays()
         
         # Evaluate
         train_score = self.model.score(X_train, y_train)
@@ -56,13 +87,19 @@ class CropStressModel:
         print(f"Trained on {len(df)} samples with {len(df['crop_type'].unique())} crops")
         
         # Save model
-        self.save_model('model.pkl')
+        self.save_model(save_path)
         
     def predict(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
         """Make a prediction for crop stress level"""
-        if self.model is None:
+        if self.model is None and self.compiled is None:
             raise ValueError("Model not trained. Call train() first.")
         
+        if self.compiled is not None or self.lattice is not None:
+            stress_levels, confidences = self.predict_batch(
+                [temperature], [humidity], [rainfall], [wind_speed], [crop_type], [growth_stage]
+            )
+            return int(stress_levels[0]), float(confidences[0])
+        
         try:
             crop_encoded = self.crop_encoder.transform([crop_type])[0]
             stage_encoded = self.stage_encoder.transform([growth_stage])[0]
@@ -81,7 +118,107 @@ class CropStressModel:
         confidence = float(probabilities[int(stress_level)])
         
         return int(stress_level), float(confidence)
-    
+
+    def predict_batch(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """Make predictions for many samples given as equal-length columns
+
+        Returns a tuple of (stress_levels, confidences) NumPy arrays.
+        """
+        if self.lattice is not None:
+            return self.lattice.predict_batch(self._predict_batch_model, temperature, humidity, rainfall,
+                                              wind_speed, crop_type, growth_stage)
+        return self._predict_batch_model(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+
+    def _predict_batch_model(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        # One predict_proba call; the class is its argmax
+        classes, probabilities = self.predict_proba_batch(temperature, humidity, rainfall, wind_speed,
+                                                          crop_type, growth_stage)
+        best = probabilities.argmax(axis=1)
+        stress_levels = classes[best].astype(int)
+        confidences = probabilities[np.arange(len(best)), best]
+
+        return stress_levels, confidences.astype(float)
+
+    def predict_proba_batch(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """Class probabilities from the model itself: (classes, (n, n_classes) array)"""
+        if self.model is None and self.compiled is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        features = self._build_feature_matrix(temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)
+
+        # Without an sklearn estimator (artifact load) the compiled path handles every size
+        if self.compiled is not None and (self.model is None or len(features) <= COMPILED_MAX_BATCH):
+            features_scaled = (features - self.scaler_mean) / self.scaler_scale
+            return self.compiled.classes_, self.compiled.predict_proba(features_scaled)
+        features_scaled = self.scaler.transform(features)
+        return self.model.classes_, self.model.predict_proba(features_scaled)
+
+    def _build_feature_matrix(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """Build the unscaled (n, 6) feature matrix from columnar inputs"""
+        crop_encoded, crop_known = self._encode_column(self.crop_classes, crop_type)
+        stage_encoded, stage_known = self._encode_column(self.stage_classes, growth_stage)
+
+        # Same fallback as predict(): an unknown crop or stage zeroes both
+        unknown = ~(crop_known & stage_known)
+        crop_encoded[unknown] = 0
+        stage_encoded[unknown] = 0
+
+        return np.column_stack([
+            np.asarray(temperature, dtype=float),
+            np.asarray(humidity, dtype=float),
+            np.asarray(rainfall, dtype=float),
+            np.asarray(wind_speed, dtype=float),
+            crop_encoded,
+            stage_encoded
+        ])
+
+    @staticmethod
+    def _encode_column(classes, values):
+        """Vectorized LabelEncoder.transform that flags unseen labels instead of raising"""
+        values = np.asarray(values, dtype=object)
+        positions = np.searchsorted(classes, values)
+        positions = np.clip(positions, 0, len(classes) - 1)
+        known = classes[positions] == values
+        return positions.astype(float), known
+
+    def _extract_preprocessing_arrays(self):
+        """Copy encoder classes and scaler statistics out of the sklearn objects"""
+        self.crop_classes = np.asarray(self.crop_encoder.classes_, dtype=object)
+        self.stage_classes = np.asarray(self.stage_encoder.classes_, dtype=object)
+        self.scaler_mean = np.asarray(self.scaler.mean_, dtype=float)
+        self.scaler_scale = np.asarray(self.scaler.scale_, dtype=float)
+
+    def compile(self):
+        """Switch inference to the pure-NumPy tree evaluator"""
+        self.compiled = CompiledGradientBoosting.from_sklearn(self.model)
+        return self.compiled
+
+    def save_artifact(self, path='model_artifact'):
+        """Save the model as a pickle-free artifact directory (see model_artifact.py)"""
+        compiled = self.compiled or CompiledGradientBoosting.from_sklearn(self.model)
+        arrays, metadata = compiled.to_arrays()
+        arrays.update({
+            'crop_classes': self.crop_classes.astype(str),
+            'stage_classes': self.stage_classes.astype(str),
+            'scaler_mean': self.scaler_mean,
+            'scaler_scale': self.scaler_scale
+        })
+        metadata['feature_names'] = self.feature_names
+        write_artifact(path, arrays, metadata)
+
+    def load_artifact(self, path='model_artifact'):
+        """Memory-map a model artifact; serving then needs neither pickle nor sklearn"""
+        arrays, metadata = read_artifact(path)
+        self.model = None
+        self.crop_encoder = None
+        self.stage_encoder = None
+        self.scaler = None
+        self.compiled = CompiledGradientBoosting.from_arrays(arrays, metadata)
+        self.crop_classes = arrays['crop_classes'].astype(object)
+        self.stage_classes = arrays['stage_classes'].astype(object)
+        self.scaler_mean = arrays['scaler_mean']
+        self.scaler_scale = arrays['scaler_scale']
+
     def save_model(self, path='model.pkl'):
         """Save trained model and encoders to disk"""
         data = {
@@ -90,22 +227,36 @@ class CropStressModel:
             'stage_encoder': self.stage_encoder,
             'scaler': self.scaler
         }
-        with open(path, 'wb') as f:
+        # Write then rename so concurrent loaders never see a partial file
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
             pickle.dump(data, f)
+        os.replace(tmp_path, path)
     
     def load_model(self, path='model.pkl'):
         """Load trained model and encoders from disk"""
+        if os.path.isdir(path):
+            self.load_artifact(path)
+            return
+        
         if not os.path.exists(path):
             print(f"Model not found. Training new model...")
-            self.train()
-            return
+            self.train(save_path=path)
+        else:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            self.model = data['model']
+            self.crop_encoder = data['crop_encoder']
+            self.stage_encoder = data['stage_encoder']
+            self.scaler = data['scaler']
+            self._extract_preprocessing_arrays()
         
-        with open(path, 'rb') as f:
-            data = pickle.load(f)
-        self.model = data['model']
-        self.crop_encoder = data['crop_encoder']
-        self.stage_encoder = data['stage_encoder']
-        self.scaler = data['scaler']
+        self.compiled = None
+        if MODEL_INFERENCE == 'compiled':
+            if hasattr(self.model, 'estimators_'):
+                self.compile()
+            else:
+                print(f"{type(self.model).__name__} can't be compiled; using sklearn inference")
 
 
 # Crop-specific care recommendations & yield optimization
@@ -232,99 +383,143 @@ def get_stress_color(stress_level):
         2: "#ef4444"   # Red
     }
     return colors.get(stress_level, "#6b7280")
-def generate_observation_based_advice(crop_type, stress_level, observed_symptoms, temperature, humidity, growth_stage):
-    """Generate detailed, symptom-specific advice for each observed issue"""
-    
-    # Symptom-specific remedies - universal treatments
-    symptom_remedies = {
-        'wilting': {
-            'cause': 'Inadequate soil moisture or root stress',
-            'immediate': '1. Water deeply (5-8cm) immediately to reach root zone. 2. Apply mulch (5cm) to reduce evaporation.',
-            'treatment': '3. Check soil moisture daily. 4. Prune affected leaves to reduce water demand.',
-            'urgent': stress_level == 2
-        },
-        'yellowing': {
-            'cause': 'Nitrogen deficiency, waterlogging, or nutrient lockout',
-            'immediate': '1. Apply nitrogen-rich fertilizer (urea or compost tea). 2. Check drainage - ensure no waterlogging.',
-            'treatment': '3. Apply foliar spray (Neem oil or compost extract). 4. Improve soil aeration by reducing compaction.',
-            'urgent': stress_level == 2
-        },
-        'spotting': {
-            'cause': 'Fungal or bacterial disease',
-            'immediate': '1. Remove and destroy affected leaves immediately. 2. Improve air circulation by pruning dense foliage.',
-            'treatment': '3. Apply sulfur or copper fungicide every 7 days. 4. Avoid overhead watering - water at soil level only.',
-            'urgent': stress_level == 2
-        },
-        'pests': {
-            'cause': 'Insect infestation',
-            'immediate': '1. Inspect both leaf surfaces for pest presence. 2. Spray with organic insecticide (neem oil, soap spray).',
-            'treatment': '3. Apply spinosad or pyrethrin if organic fails. 4. Release beneficial insects (ladybugs, parasitic wasps).',
-            'urgent': stress_level == 2
-        },
-        'disease': {
-            'cause': 'Fungal, bacterial, or viral infection',
-            'immediate': '1. Isolate affected plant if possible. 2. Remove all diseased parts (sanitize tools between cuts).',
-            'treatment': '3. Apply appropriate fungicide or bactericide. 4. Improve sanitation - clean leaves with 70% alcohol.',
-            'urgent': stress_level == 2
-        },
-        'dry': {
-            'cause': 'Severe dehydration or high transpiration',
-            'immediate': '1. Water deeply immediately (8-10cm). 2. Provide shade cloth (30-50%) to reduce heat stress.',
-            'treatment': '3. Mist leaves early morning to reduce heat. 4. Add organic matter to soil to improve water retention.',
-            'urgent': stress_level == 2
-        },
-        'stunting': {
-            'cause': 'Nutrient deficiency, disease, or environmental stress',
-            'immediate': '1. Apply balanced fertilizer (NPK 10-10-10). 2. Ensure proper lighting (6+ hours direct sun).',
-            'treatment': '3. Check for root diseases (musty smell = root rot). 4. Optimize temperature for growth stage.',
-            'urgent': stress_level == 2
-        }
+
+# Symptom-specific remedies - universal treatments
+SYMPTOM_REMEDIES = {
+    'wilting': {
+        'cause': 'Inadequate soil moisture or root stress',
+        'immediate': '1. Water deeply (5-8cm) immediately to reach root zone. 2. Apply mulch (5cm) to reduce evaporation.',
+        'treatment': '3. Check soil moisture daily. 4. Prune affected leaves to reduce water demand.'
+    },
+    'yellowing': {
+        'cause': 'Nitrogen deficiency, waterlogging, or nutrient lockout',
+        'immediate': '1. Apply nitrogen-rich fertilizer (urea or compost tea). 2. Check drainage - ensure no waterlogging.',
+        'treatment': '3. Apply foliar spray (Neem oil or compost extract). 4. Improve soil aeration by reducing compaction.'
+    },
+    'spotting': {
+        'cause': 'Fungal or bacterial disease',
+        'immediate': '1. Remove and destroy affected leaves immediately. 2. Improve air circulation by pruning dense foliage.',
+        'treatment': '3. Apply sulfur or copper fungicide every 7 days. 4. Avoid overhead watering - water at soil level only.'
+    },
+    'pests': {
+        'cause': 'Insect infestation',
+        'immediate': '1. Inspect both leaf surfaces for pest presence. 2. Spray with organic insecticide (neem oil, soap spray).',
+        'treatment': '3. Apply spinosad or pyrethrin if organic fails. 4. Release beneficial insects (ladybugs, parasitic wasps).'
+    },
+    'disease': {
+        'cause': 'Fungal, bacterial, or viral infection',
+        'immediate': '1. Isolate affected plant if possible. 2. Remove all diseased parts (sanitize tools between cuts).',
+        'treatment': '3. Apply appropriate fungicide or bactericide. 4. Improve sanitation - clean leaves with 70% alcohol.'
+    },
+    'dry': {
+        'cause': 'Severe dehydration or high transpiration',
+        'immediate': '1. Water deeply immediately (8-10cm). 2. Provide shade cloth (30-50%) to reduce heat stress.',
+        'treatment': '3. Mist leaves early morning to reduce heat. 4. Add organic matter to soil to improve water retention.'
+    },
+    'stunting': {
+        'cause': 'Nutrient deficiency, disease, or environmental stress',
+        'immediate': '1. Apply balanced fertilizer (NPK 10-10-10). 2. Ensure proper lighting (6+ hours direct sun).',
+        'treatment': '3. Check for root diseases (musty smell = root rot). 4. Optimize temperature for growth stage.'
     }
+}
+
+# Crop-specific adjustment factors
+CROP_SPECIFIC_FACTORS = {
+    'tomato': {'watering': 'drip irrigation', 'sensitivity': 'high to disease'},
+    'lettuce': {'watering': 'frequent, light', 'sensitivity': 'bolts if hot'},
+    'cucumber': {'watering': 'consistent moisture', 'sensitivity': 'powdery mildew'},
+    'basil': {'watering': 'let topsoil dry', 'sensitivity': 'spider mites'},
+    'mint': {'watering': 'moist not wet', 'sensitivity': 'root rot'},
+    'pepper': {'watering': 'consistent', 'sensitivity': 'blossom drop'},
+    'carrot': {'watering': 'moderate', 'sensitivity': 'root splitting'},
+}
+
+# Bit of each symptom class in a symptom-set mask (7 classes -> 128 sets)
+SYMPTOM_BITS = {symptom: 1 << i for i, symptom in enumerate(SYMPTOM_REMEDIES)}
+
+def _symptom_entries(stress_level, symptoms):
+    """symptom_analysis entries and action_priority for symptoms in the given order"""
+    analysis = []
+    priority = []
+    for symptom in symptoms:
+        remedy = SYMPTOM_REMEDIES.get(symptom)
+        if remedy:
+            analysis.append({
+                'symptom': symptom,
+                'cause': remedy['cause'],
+                'immediate_actions': remedy['immediate'],
+                'follow_up': remedy['treatment'],
+                'is_urgent': stress_level == 2
+            })
+            if stress_level == 2:
+                priority.append(symptom)
+    return tuple(analysis), tuple(priority)
+
+def _assessment_templates(stress_level, crop_key):
+    """combined_assessment builders (no symptoms, with symptoms) for a stress level and crop"""
+    label = get_stress_label(stress_level).lower()
+    care = get_crop_care(stress_level, crop_key or '')
+    watering_method = CROP_SPECIFIC_FACTORS.get(crop_key, {}).get('watering', 'regular watering')
+    urgency_text = "URGENT ACTION NEEDED!" if stress_level == 2 else "Monitoring recommended" if stress_level == 1 else "Preventive care suggested"
     
-    # Crop-specific adjustment factors
-    crop_specific_factors = {
-        'tomato': {'watering': 'drip irrigation', 'sensitivity': 'high to disease'},
-        'lettuce': {'watering': 'frequent, light', 'sensitivity': 'bolts if hot'},
-        'cucumber': {'watering': 'consistent moisture', 'sensitivity': 'powdery mildew'},
-        'basil': {'watering': 'let topsoil dry', 'sensitivity': 'spider mites'},
-        'mint': {'watering': 'moist not wet', 'sensitivity': 'root rot'},
-        'pepper': {'watering': 'consistent', 'sensitivity': 'blossom drop'},
-        'carrot': {'watering': 'moderate', 'sensitivity': 'root splitting'},
-    }
+    # f-strings over closed-over constants: no template parsing per call
+    def without_symptoms(crop_type, temperature, humidity):
+        return f"Your {crop_type} shows {label} based on current conditions (Temp: {temperature}°C, Humidity: {humidity}%). {care}"
     
-    # Build personalized response
-    advice_dict = {
-        'observed_symptoms': observed_symptoms,
-        'symptom_analysis': [],
-        'combined_assessment': '',
-        'action_priority': []
-    }
+    def with_symptoms(crop_type, growth_stage, count, temperature, humidity):
+        return f"{urgency_text} - Your {crop_type} ({growth_stage}) has {count} observed issue(s). Current conditions (Temp: {temperature}°C, Humidity: {humidity}%) combined with reported symptoms suggest {label}. Recommended approach: Use {watering_method} and closely monitor over next 48 hours."
+    
+    return without_symptoms, with_symptoms
+
+# Static advice compiled once: per (stress level, symptom mask) entries and
+# per (stress level, crop) templates; a request only looks these up and fills
+# in crop name, stage, symptom count and the two weather numbers
+ADVICE_TABLE = {
+    (level, mask): _symptom_entries(level, [s for s, bit in SYMPTOM_BITS.items() if mask & bit])
+    for level in (0, 1, 2)
+    for mask in range(1 << len(SYMPTOM_BITS))
+}
+ASSESSMENT_TEMPLATES = {
+    (level, crop_key): _assessment_templates(level, crop_key)
+    for level in (0, 1, 2)
+    for crop_key in list(CROP_CARE) + [None]
+}
+
+def generate_observation_based_advice(crop_type, stress_level, observed_symptoms, temperature, humidity, growth_stage):
+    """Generate detailed, symptom-specific advice for each observed issue"""
+    crop_key = crop_type.lower()
+    if crop_key not in CROP_CARE:
+        crop_key = None
+    templates = ASSESSMENT_TEMPLATES.get((stress_level, crop_key)) or _assessment_templates(stress_level, crop_key)
     
     if not observed_symptoms:
         # No specific symptoms - use ML prediction only
-        advice_dict['combined_assessment'] = f"Your {crop_type} shows {get_stress_label(stress_level).lower()} based on current conditions (Temp: {temperature}°C, Humidity: {humidity}%). {get_crop_care(stress_level, crop_type)}"
-        return advice_dict
+        return {
+            'observed_symptoms': observed_symptoms,
+            'symptom_analysis': [],
+            'combined_assessment': templates[0](crop_type, temperature, humidity),
+            'action_priority': []
+        }
     
-    # Process each observed symptom
+    # Symptom lists from analyze_observations are unique and in SYMPTOM_BITS order,
+    # so they map onto a bitmask; anything else is processed one symptom at a time
+    mask = previous = 0
     for symptom in observed_symptoms:
-        remedy = symptom_remedies.get(symptom, {})
-        if remedy:
-            advice_dict['symptom_analysis'].append({
-                'symptom': symptom,
-                'cause': remedy.get('cause', 'Unknown cause'),
-                'immediate_actions': remedy.get('immediate', ''),
-                'follow_up': remedy.get('treatment', ''),
-                'is_urgent': remedy.get('urgent', False)
-            })
-            if remedy.get('urgent'):
-                advice_dict['action_priority'].append(symptom)
+        bit = SYMPTOM_BITS.get(symptom, 0)
+        if bit <= previous:
+            mask = None
+            break
+        mask |= bit
+        previous = bit
     
-    # Combined assessment
-    urgency_text = "URGENT ACTION NEEDED!" if stress_level == 2 and observed_symptoms else "Monitoring recommended" if stress_level == 1 else "Preventive care suggested"
+    entries = ADVICE_TABLE.get((stress_level, mask)) if mask is not None else None
+    if entries is None:
+        entries = _symptom_entries(stress_level, observed_symptoms)
+    analysis, priority = entries
     
-    crop_factor = crop_specific_factors.get(crop_type.lower(), {})
-    watering_method = crop_factor.get('watering', 'regular watering')
-    
-    advice_dict['combined_assessment'] = f"{urgency_text} - Your {crop_type} ({growth_stage}) has {len(observed_symptoms)} observed issue(s). Current conditions (Temp: {temperature}°C, Humidity: {humidity}%) combined with reported symptoms suggest {get_stress_label(stress_level).lower()}. Recommended approach: Use {watering_method} and closely monitor over next 48 hours."
-    
-    return advice_dict
\ No newline at end of file
+    return {
+        'observed_symptoms': observed_symptoms,
+        'symptom_analysis': [dict(entry) for entry in analysis],
+        'combined_assessment': templates[1](crop_type, growth_stage, len(observed_symptoms), temperature, humidity),
+        'action_priority': list(priority)
+    }
@@ -1,13 +1,45 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, event, func, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 import json
+import math
 
 db = SQLAlchemy()
 
+# Spatial grid for Report.geo_cell: fixed, since stored values depend on it
+GEO_CELL_DEG = 0.1
+GEO_CELL_COLS = int(round(360 / GEO_CELL_DEG))
+GEO_CELL_ROWS = int(round(180 / GEO_CELL_DEG))
+
+
+def geo_cell_for(lat, lon):
+    """Integer id of the GEO_CELL_DEG grid cell holding a point (row-major from -90, -180)"""
+    if lat is None or lon is None:
+        return None
+    row = min(max(math.floor((lat + 90) / GEO_CELL_DEG), 0), GEO_CELL_ROWS - 1)
+    col = min(max(math.floor((lon + 180) / GEO_CELL_DEG), 0), GEO_CELL_COLS - 1)
+    return row * GEO_CELL_COLS + col
+
+
+def geo_cell_center(cell):
+    """(lat, lon) of the centre of a geo_cell_for cell"""
+    row, col = divmod(cell, GEO_CELL_COLS)
+    return (row + 0.5) * GEO_CELL_DEG - 90, (col + 0.5) * GEO_CELL_DEG - 180
+
 
 class Report(db.Model):
     """Database model for storing crop stress reports"""
     __tablename__ = 'reports'
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        db.Index('ix_reports_created_at_id', 'created_at', 'id'),
+        # Filtered listings, newest first ("severe cotton, last 7 days", "this area")
+        db.Index('ix_reports_crop_stress_created', 'crop_type', 'stress_level', 'created_at', 'id'),
+        db.Index('ix_reports_cell_created', 'geo_cell', 'created_at', 'id'),
+        # Incremental exports: updated_at > watermark, in order
+        db.Index('ix_reports_updated_at_id', 'updated_at', 'id'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -20,6 +52,12 @@ class Report(db.Model):
     stress_level = db.Column(db.Integer)  # 0=healthy, 1=moderate, 2=severe
     confidence = db.Column(db.Float)  # 0-100 confidence percentage
     
+    # Model inputs at submission time, so reports can later serve as training data
+    temperature = db.Column(db.Float)
+    humidity = db.Column(db.Float)
+    rainfall = db.Column(db.Float)
+    wind_speed = db.Column(db.Float)
+    
     # Detailed Analysis Data
     observations = db.Column(db.JSON)  # List of observed symptoms
     symptom_analysis = db.Column(db.JSON)  # Detailed analysis per symptom
@@ -35,6 +73,7 @@ class Report(db.Model):
     location = db.Column(db.String(200))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer)  # geo_cell_for(latitude, longitude), kept in sync on save
     
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -64,11 +103,331 @@ class Report(db.Model):
     
     def to_dict_minimal(self):
         """Minimal response for list endpoints"""
+        return {field: serialize_field(getattr(self, field)) for field in MINIMAL_FIELDS}
+
+
+# Columns a client may request with ?fields=, in to_dict order
+REPORT_FIELDS = (
+    'id', 'crop_type', 'growth_stage', 'stress_level', 'confidence', 'observations',
+    'symptom_analysis', 'recommendations', 'combined_assessment', 'action_priority',
+    'ai_analysis', 'ml_based_recommendation', 'location', 'latitude', 'longitude',
+    'created_at', 'updated_at'
+)
+# Weather the model saw for a report; NULL for reports stored before they were recorded
+WEATHER_FIELDS = ('temperature', 'humidity', 'rainfall', 'wind_speed')
+# Small scalar columns only: enough for the list and the map, none of the JSON or LLM text
+MINIMAL_FIELDS = (
+    'id', 'crop_type', 'growth_stage', 'stress_level', 'confidence', 'location',
+    'latitude', 'longitude', 'created_at'
+)
+
+
+class RollupCounts:
+    """Counters shared by the rollup tables"""
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)  # reports with a confidence
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class ReportRollup(RollupCounts, db.Model):
+    """Report counts per day, crop, stage and stress level, kept up to date on insert
+
+    Unknown stage or stress level are stored as '' / -1 so they stay part
+    of the primary key.
+    """
+    __tablename__ = 'report_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    crop_type = db.Column(db.String(100), primary_key=True)
+    growth_stage = db.Column(db.String(100), primary_key=True)
+    stress_level = db.Column(db.Integer, primary_key=True)
+
+
+class ReportCellRollup(RollupCounts, db.Model):
+    """Report counts per day, geo_cell, crop and stress level (reports with a location only)"""
+    __tablename__ = 'report_cell_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    geo_cell = db.Column(db.Integer, primary_key=True)
+    crop_type = db.Column(db.String(100), primary_key=True)
+    stress_level = db.Column(db.Integer, primary_key=True)
+
+
+ROLLUP_MODELS = (ReportRollup, ReportCellRollup)
+UNKNOWN_STAGE = ''
+UNKNOWN_LEVEL = -1
+
+
+class RegisteredField(db.Model):
+    """A farm field whose forecast stress is scored ahead of time (see field_forecasts.py)"""
+    __tablename__ = 'registered_fields'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200))
+    crop_type = db.Column(db.String(100), nullable=False)
+    growth_stage = db.Column(db.String(100), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
         return {
             'id': self.id,
+            'name': self.name,
             'crop_type': self.crop_type,
+            'growth_stage': self.growth_stage,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'created_at': serialize_field(self.created_at)
+        }
+
+
+class FieldForecast(db.Model):
+    """Predicted stress of a registered field at one forecast step, replaced by each scoring run"""
+    __tablename__ = 'field_forecasts'
+    
+    field_id = db.Column(db.Integer, db.ForeignKey('registered_fields.id', ondelete='CASCADE'), primary_key=True)
+    forecast_at = db.Column(db.DateTime, primary_key=True)  # UTC start of the forecast step
+    temperature = db.Column(db.Float)
+    humidity = db.Column(db.Float)
+    rainfall = db.Column(db.Float)  # mm per hour, averaged over the forecast step
+    wind_speed = db.Column(db.Float)
+    stress_level = db.Column(db.Integer)
+    confidence = db.Column(db.Float)
+    run_id = db.Column(db.Integer)
+    scored_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'forecast_at': serialize_field(self.forecast_at),
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'rainfall': self.rainfall,
+            'wind_speed': self.wind_speed,
             'stress_level': self.stress_level,
             'confidence': self.confidence,
-            'location': self.location,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'run_id': self.run_id,
+            'scored_at': serialize_field(self.scored_at)
         }
+
+
+class ForecastRun(db.Model):
+    """Progress of one forecast scoring run; fields are done in id order up to last_field_id"""
+    __tablename__ = 'forecast_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # running, done or failed
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    last_field_id = db.Column(db.Integer, nullable=False, default=0)
+    fields_total = db.Column(db.Integer, nullable=False, default=0)
+    fields_done = db.Column(db.Integer, nullable=False, default=0)
+    fields_failed = db.Column(db.Integer, nullable=False, default=0)  # no forecast for their cell
+    cells_fetched = db.Column(db.Integer, nullable=False, default=0)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'started_at': serialize_field(self.started_at),
+            'updated_at': serialize_field(self.updated_at),
+            'finished_at': serialize_field(self.finished_at),
+            'fields_total': self.fields_total,
+            'fields_done': self.fields_done,
+            'fields_failed': self.fields_failed,
+            'cells_fetched': self.cells_fetched,
+            'rows_written': self.rows_written,
+            'progress': round(self.fields_done / self.fields_total, 4) if self.fields_total else 1.0,
+            'error': self.error
+        }
+
+
+def serialize_field(value):
+    """JSON-ready form of a column value"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@event.listens_for(Report, 'before_insert')
+@event.listens_for(Report, 'before_update')
+def _set_geo_cell(mapper, connection, report):
+    report.geo_cell = geo_cell_for(report.latitude, report.longitude)
+
+
+def _rollup_key(model):
+    return [column.name for column in model.__table__.primary_key.columns]
+
+
+# Report columns the rollups are computed from
+ROLLUP_SOURCE_FIELDS = ('created_at', 'crop_type', 'growth_stage', 'stress_level', 'geo_cell', 'confidence')
+
+
+def _rollup_row(model, report):
+    values = {
+        'day': (report['created_at'] or datetime.utcnow()).date(),
+        'crop_type': report['crop_type'],
+        'growth_stage': report['growth_stage'] if report['growth_stage'] is not None else UNKNOWN_STAGE,
+        'stress_level': report['stress_level'] if report['stress_level'] is not None else UNKNOWN_LEVEL,
+        'geo_cell': report['geo_cell']
+    }
+    row = {name: values[name] for name in _rollup_key(model)}
+    row.update(
+        report_count=1,
+        confidence_count=1 if report['confidence'] is not None else 0,
+        confidence_sum=report['confidence'] or 0.0
+    )
+    return row
+
+
+def add_to_rollups(connection, model, rows):
+    """Add count deltas (dicts of the model's key columns and counters) in the caller's transaction"""
+    table = model.__table__
+    counters = ('report_count', 'confidence_count', 'confidence_sum')
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    if dialect is not None:
+        insert = dialect.insert(table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=_rollup_key(model),
+            set_={name: table.c[name] + insert.excluded[name] for name in counters}
+        ), rows)
+        return
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(*[table.c[name] == row[name] for name in _rollup_key(model)])
+            .values({name: table.c[name] + row[name] for name in counters})
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+
+def count_in_rollups(connection, reports):
+    """Add new reports (dicts with ROLLUP_SOURCE_FIELDS) to the rollups in the caller's transaction
+
+    Reports sharing a rollup row are summed first, so a batch costs one
+    upsert per row touched.
+    """
+    for model in ROLLUP_MODELS:
+        key = _rollup_key(model)
+        deltas = {}
+        for report in reports:
+            if 'geo_cell' in key and report['geo_cell'] is None:
+                continue
+            row = _rollup_row(model, report)
+            row_key = tuple(row[name] for name in key)
+            if row_key in deltas:
+                for name in ('report_count', 'confidence_count', 'confidence_sum'):
+                    deltas[row_key][name] += row[name]
+            else:
+                deltas[row_key] = row
+        if deltas:
+            add_to_rollups(connection, model, list(deltas.values()))
+
+
+@event.listens_for(Report, 'after_insert')
+def _count_in_rollups(mapper, connection, report):
+    # Same transaction as the report, so the rollups commit (or roll back) with it
+    count_in_rollups(connection, [{name: getattr(report, name) for name in ROLLUP_SOURCE_FIELDS}])
+
+
+def rebuild_rollups():
+    """Recompute the rollup tables from reports, one GROUP BY each
+
+    Needed after rows were written around the ORM (bulk SQL, deletes, edits
+    to crop or stress). Returns the number of rollup rows per table.
+    """
+    reports = Report.__table__
+    sources = {
+        'day': func.date(reports.c.created_at),
+        'crop_type': reports.c.crop_type,
+        'growth_stage': func.coalesce(reports.c.growth_stage, UNKNOWN_STAGE),
+        'stress_level': func.coalesce(reports.c.stress_level, UNKNOWN_LEVEL),
+        'geo_cell': reports.c.geo_cell
+    }
+    sizes = {}
+    with db.engine.begin() as conn:
+        for model in ROLLUP_MODELS:
+            table, key = model.__table__, _rollup_key(model)
+            keys = [sources[name] for name in key]
+            grouped = select(
+                *keys,
+                func.count(),
+                func.count(reports.c.confidence),
+                func.coalesce(func.sum(reports.c.confidence), 0.0)
+            ).group_by(*keys)
+            if 'geo_cell' in key:
+                grouped = grouped.where(reports.c.geo_cell.isnot(None))
+            conn.execute(table.delete())
+            conn.execute(table.insert().from_select(
+                key + ['report_count', 'confidence_count', 'confidence_sum'], grouped
+            ))
+            sizes[table.name] = conn.execute(select(func.count()).select_from(table)).scalar()
+    return sizes
+
+
+def _add_column(name, sql_type):
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE reports ADD COLUMN {name} {sql_type}'))
+    except Exception:
+        # Another worker may have added it first
+        if name not in {column['name'] for column in inspect(db.engine).get_columns('reports')}:
+            raise
+
+
+def ensure_schema(batch_size=5000):
+    """Bring a reports table created by an older version up to date
+
+    create_all skips existing tables, so add the geo_cell column (and fill
+    it in) and the weather columns, fill new rollup tables and add any
+    declared index the table is missing. On SQLite, also
+    collect planner statistics if there are none yet. Without them SQLite
+    walks the created_at index for spatial queries instead of using geo_cell.
+    Postgres keeps its own statistics up to date.
+    """
+    changed = False
+    columns = {column['name'] for column in inspect(db.engine).get_columns('reports')}
+    for name in WEATHER_FIELDS:
+        if name not in columns:
+            _add_column(name, 'FLOAT')
+    if 'geo_cell' not in columns:
+        changed = True
+        _add_column('geo_cell', 'INTEGER')
+        table = Report.__table__
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.latitude, table.c.longitude)
+                .where(table.c.geo_cell.is_(None), table.c.latitude.isnot(None), table.c.longitude.isnot(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values(geo_cell=bindparam('cell')),
+                [{'row_id': row.id, 'cell': geo_cell_for(row.latitude, row.longitude)} for row in rows]
+            )
+            db.session.commit()
+    # The rollup tables are new to databases that already have reports: fill it once
+    missing_rollups = (db.session.query(ReportRollup.day).first() is None
+                       and db.session.query(Report.id).first() is not None)
+    db.session.rollback()  # end the read before rebuild_rollups writes on its own connection
+    if missing_rollups:
+        rebuild_rollups()
+    
+    existing = {index['name'] for index in inspect(db.engine).get_indexes('reports')}
+    for index in Report.__table__.indexes:
+        if index.name not in existing:
+            index.create(bind=db.engine, checkfirst=True)
+            changed = True
+    
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.begin() as conn:
+            has_stats = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )).first() is not None and conn.execute(text(
+                "SELECT 1 FROM sqlite_stat1 WHERE tbl = 'reports'"
+            )).first() is not None
+            if changed or not has_stats:
+                conn.execute(text('ANALYZE reports'))
@@ -0,0 +1,118 @@
+"""Memoized predictions on quantized inputs
+
+Model inputs repeat a lot once rounded: 13 crops, 7 stages and weather
+that is the same for every farm in a district. The cache is off unless
+PREDICT_CACHE_BACKEND is set, because rounding changes some answers. With
+it on, inputs are rounded to PREDICT_CACHE_PRECISION steps (by default
+temperature and humidity to 0.5, rainfall and wind speed to 0.1) before
+predicting, and the result is stored under those rounded inputs, so a hit
+returns exactly what a miss would have computed.
+
+Keys include the version of the loaded model (the artifact's inode and
+mtime, see model_registry), so a retrained model never sees entries from
+the one before it; those age out of the LRU.
+"""
+
+import os
+
+import numpy as np
+
+from cache import make_cache
+
+PREDICT_CACHE_BACKEND = os.getenv('PREDICT_CACHE_BACKEND', 'off')  # 'memory', 'sqlite' or 'off' (opt-in: lossy)
+PREDICT_CACHE_PATH = os.getenv('PREDICT_CACHE_PATH', 'predict_cache.db')
+PREDICT_CACHE_SIZE = int(os.getenv('PREDICT_CACHE_SIZE', '65536'))
+PREDICT_CACHE_TTL = int(os.getenv('PREDICT_CACHE_TTL', str(24 * 3600)))  # seconds
+# Rounding step per numeric input; 0 keeps it exact
+PREDICT_CACHE_PRECISION = os.getenv('PREDICT_CACHE_PRECISION',
+                                    'temperature=0.5,humidity=0.5,rainfall=0.1,wind_speed=0.1')
+
+NUMERIC_INPUTS = ('temperature', 'humidity', 'rainfall', 'wind_speed')
+
+
+def parse_precision(spec):
+    """'temperature=0.5,humidity=1' -> rounding step per numeric input (missing ones 0)"""
+    steps = dict.fromkeys(NUMERIC_INPUTS, 0.0)
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, value = part.partition('=')
+        if name.strip() not in steps:
+            raise ValueError(f"Unknown input in PREDICT_CACHE_PRECISION: {name.strip()!r}")
+        steps[name.strip()] = float(value)
+    return steps
+
+
+def quantize(value, step):
+    """value rounded to a multiple of step, as a clean float"""
+    value = float(value)
+    if not step:
+        return value
+    # The second round drops float noise like 30.500000000000004 from the key
+    return round(round(value / step) * step, 10)
+
+
+class PredictionMemo:
+    """predict/predict_batch through a cache keyed on (model version, quantized inputs)"""
+
+    def __init__(self, cache, precision):
+        self.cache = cache
+        self.steps = [precision[name] for name in NUMERIC_INPUTS]
+
+    def _quantized(self, temperature, humidity, rainfall, wind_speed):
+        return [quantize(v, step) for v, step in zip((temperature, humidity, rainfall, wind_speed), self.steps)]
+
+    @staticmethod
+    def _key(version, numbers, crop_type, growth_stage):
+        return f"{version}|{crop_type}|{growth_stage}|" + '|'.join(repr(n) for n in numbers)
+
+    def predict(self, model, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        numbers = self._quantized(temperature, humidity, rainfall, wind_speed)
+        key = self._key(model.version, numbers, crop_type, growth_stage)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached[0], cached[1]
+        stress_level, confidence = model.predict(*numbers, crop_type, growth_stage)
+        self.cache.set(key, [stress_level, confidence])
+        return stress_level, confidence
+
+    def predict_batch(self, model, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        rows = [self._quantized(*values) for values in zip(temperature, humidity, rainfall, wind_speed)]
+        keys = [self._key(model.version, numbers, crop, stage)
+                for numbers, crop, stage in zip(rows, crop_type, growth_stage)]
+        levels = np.empty(len(keys), dtype=int)
+        confidences = np.empty(len(keys), dtype=float)
+
+        misses = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                levels[i], confidences[i] = cached
+        if misses:
+            columns = list(zip(*(rows[i] for i in misses)))
+            miss_levels, miss_confidences = model.predict_batch(
+                *columns, [crop_type[i] for i in misses], [growth_stage[i] for i in misses]
+            )
+            for i, level, confidence in zip(misses, miss_levels, miss_confidences):
+                levels[i], confidences[i] = level, confidence
+                self.cache.set(keys[i], [int(level), float(confidence)])
+        return levels, confidences
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['precision'] = dict(zip(NUMERIC_INPUTS, self.steps))
+        return stats
+
+
+prediction_memo = None
+if PREDICT_CACHE_BACKEND != 'off':
+    prediction_memo = PredictionMemo(
+        make_cache(PREDICT_CACHE_BACKEND, table='predict_cache', max_size=PREDICT_CACHE_SIZE,
+                   ttl=PREDICT_CACHE_TTL, path=PREDICT_CACHE_PATH),
+        parse_precision(PREDICT_CACHE_PRECISION)
+    )
+
+
+def get_prediction_cache_stats():
+    """Hit/miss counters of the prediction cache, or None when disabled"""
+    return prediction_memo.stats() if prediction_memo is not None else None
@@ -0,0 +1,180 @@
+"""Streaming export of the reports table as NDJSON, CSV or Parquet
+
+Rows are read with yield_per (a server-side cursor on Postgres) and
+encoded one batch at a time, so memory stays flat however big the table
+is. Output is ordered by (updated_at, id). Each export covers updated_at
+in (since, until], where until is the newest updated_at when the export
+starts, but at least EXPORT_SAFETY_LAG seconds in the past. updated_at is
+stamped before its transaction commits, so a row stamped just before an
+export starts can still become visible after the export has read past
+it. The lag keeps such rows above until, and the next run, with since
+set to this until, picks them up. A full export (no since) also includes
+rows without updated_at.
+ix_reports_updated_at_id serves the range.
+
+Parquet needs pyarrow (optional). Each batch becomes one row group, and
+the bytes are handed on as soon as pyarrow writes them.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+
+from models_db import db, Report, REPORT_FIELDS, serialize_field
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export unavailable
+    pa = None
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '5000'))
+# Longer than any report-writing transaction takes from stamping updated_at to commit
+EXPORT_SAFETY_LAG = float(os.getenv('EXPORT_SAFETY_LAG', '60'))  # seconds
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# Columns stored as JSON, exported as JSON text in CSV and Parquet
+JSON_FIELDS = ('observations', 'symptom_analysis', 'recommendations', 'action_priority')
+
+
+def check_format(fmt):
+    """Raise ValueError for an unknown format or Parquet without pyarrow"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == 'parquet' and pa is None:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+
+
+def latest_update(since=None):
+    """The `until` of an export started now: newest updated_at, at most EXPORT_SAFETY_LAG ago
+
+    Never earlier than since, so the watermark does not move backwards.
+    """
+    newest = db.session.query(func.max(Report.updated_at)).scalar()
+    if newest is None:
+        return since
+    until = min(newest, datetime.utcnow() - timedelta(seconds=EXPORT_SAFETY_LAG))
+    return max(until, since) if since is not None else until
+
+
+def iter_batches(fields=REPORT_FIELDS, since=None, until=None, batch_size=None):
+    """Lists of row dicts (raw column values) with since < updated_at <= until, in (updated_at, id) order"""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    query = db.session.query(*[getattr(Report, name) for name in fields])
+    if since is not None:
+        query = query.filter(Report.updated_at > since)
+    if until is not None:
+        upper = Report.updated_at <= until
+        query = query.filter(upper if since is not None else or_(upper, Report.updated_at.is_(None)))
+    query = query.order_by(Report.updated_at, Report.id).execution_options(yield_per=batch_size)
+    batch = []
+    for row in query:
+        batch.append(dict(zip(fields, row)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _text_value(name, value):
+    if name in JSON_FIELDS and value is not None:
+        return json.dumps(value)
+    return serialize_field(value)
+
+
+def encode_ndjson(batches, fields):
+    for batch in batches:
+        yield ''.join(
+            json.dumps({name: serialize_field(row[name]) for name in fields}) + '\n'
+            for row in batch
+        ).encode('utf-8')
+
+
+def encode_csv(batches, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(['' if row[name] is None else _text_value(name, row[name]) for name in fields])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def parquet_schema(fields):
+    """pyarrow schema for Report columns"""
+    def arrow_type(name):
+        if name in JSON_FIELDS:
+            return pa.string()
+        python_type = Report.__table__.c[name].type.python_type
+        if python_type is int:
+            return pa.int64()
+        if python_type is float:
+            return pa.float64()
+        if python_type.__name__ == 'datetime':
+            return pa.timestamp('us')
+        return pa.string()
+    return pa.schema([(name, arrow_type(name)) for name in fields])
+
+
+class _Drain:
+    """Write-only file object whose bytes are collected between batches"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def encode_parquet(batches, fields):
+    schema = parquet_schema(fields)
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in batches:
+            columns = {
+                name: [json.dumps(row[name]) if row[name] is not None else None for row in batch]
+                if name in JSON_FIELDS else [row[name] for row in batch]
+                for name in fields
+            }
+            writer.write_table(pa.table(columns, schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {'ndjson': encode_ndjson, 'csv': encode_csv, 'parquet': encode_parquet}
+
+
+def export_reports(fmt, fields=REPORT_FIELDS, since=None, until=None, batch_size=None):
+    """Yield the encoded export of rows with since < updated_at <= until as byte chunks"""
+    check_format(fmt)
+    fields = tuple(fields)
+    yield from ENCODERS[fmt](iter_batches(fields, since, until, batch_size), fields)
@@ -0,0 +1,183 @@
+"""Bulk report ingestion for POST /api/reports/bulk
+
+The field app queues reports while offline and uploads them all at once
+when it gets signal again. Instead of running submit_report once per
+report, a batch is processed in stages:
+- every row is validated with validate_report_data;
+- weather is fetched once per weather grid cell, in parallel;
+- all rows are scored with a single predict_batch call;
+- repeated notes are matched once (analyze_observations_batch);
+- rows are inserted in chunks with a bulk INSERT ... RETURNING, in the
+  same transaction as their rollup counts, each chunk stamped with its own
+  created_at/updated_at so exports see chunks in commit order.
+
+Each chunk commits on its own, so a database error only fails the rows of
+that chunk. Every input row gets a status in the response. No LLM call is
+made inline: cached answers are stored, and the caller decides what to do
+with the rest.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models import get_crop_care, get_stress_label, generate_observation_based_advice
+from models_db import db, Report, ROLLUP_SOURCE_FIELDS, count_in_rollups, geo_cell_for
+from llm_service import cached_analysis
+from model_registry import predict_batch
+from utils import analyze_observations_batch, get_weather_data, grid_cell, recorded_weather, validate_report_data
+
+REPORTS_BULK_MAX = int(os.getenv('REPORTS_BULK_MAX', '1000'))  # rows per request
+REPORTS_BULK_CHUNK = int(os.getenv('REPORTS_BULK_CHUNK', '200'))  # rows per INSERT/commit
+WEATHER_FETCH_WORKERS = int(os.getenv('WEATHER_FETCH_WORKERS', '8'))
+
+CREATED, INVALID, FAILED = 'created', 'invalid', 'failed'
+
+
+def validate_bulk_row(record):
+    """validate_report_data plus the type checks submit_report gets from .lower(); returns errors"""
+    if not isinstance(record, dict):
+        return ["Each report must be a JSON object"]
+    is_valid, errors = validate_report_data(record)
+    if not is_valid:
+        return errors
+    if not isinstance(record['crop_type'], str) or not isinstance(record['growth_stage'], str):
+        return ["crop_type and growth_stage must be strings"]
+    if not isinstance(record.get('notes') or '', str):
+        return ["notes must be a string"]
+    return []
+
+
+def weather_by_cell(points):
+    """{weather grid cell: weather} for (lat, lon) points, one lookup per cell"""
+    cells = {}
+    for lat, lon in points:
+        cells.setdefault(grid_cell(lat, lon), (lat, lon))
+    if not cells:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(WEATHER_FETCH_WORKERS, len(cells)))) as pool:
+        weathers = pool.map(lambda point: get_weather_data(*point), cells.values())
+        return dict(zip(cells, weathers))
+
+
+def _build_rows(records):
+    """Score validated records; returns (row dicts for Report, LLM inputs) in input order"""
+    points = [(float(r['latitude']), float(r['longitude'])) for r in records]
+    weather = weather_by_cell(points)
+    weathers = [weather[grid_cell(lat, lon)] for lat, lon in points]
+    crop_types = [r['crop_type'].lower() for r in records]
+    growth_stages = [r['growth_stage'].lower() for r in records]
+    notes = [r.get('notes') or '' for r in records]
+
+    stress_levels, confidences = predict_batch(
+        temperature=[w['temperature'] for w in weathers],
+        humidity=[w['humidity'] for w in weathers],
+        rainfall=[w['rainfall'] for w in weathers],
+        wind_speed=[w['wind_speed'] for w in weathers],
+        crop_type=crop_types,
+        growth_stage=growth_stages
+    )
+    observed = analyze_observations_batch(notes)
+
+    rows, llm_inputs = [], []
+    for i, record in enumerate(records):
+        lat, lon = points[i]
+        w, crop_type, growth_stage = weathers[i], crop_types[i], growth_stages[i]
+        stress_level = int(stress_levels[i])
+        symptom_advice = generate_observation_based_advice(
+            crop_type=crop_type,
+            stress_level=stress_level,
+            observed_symptoms=observed[i],
+            temperature=w['temperature'],
+            humidity=w['humidity'],
+            growth_stage=growth_stage
+        )
+        recommendation = get_crop_care(stress_level, crop_type)
+        symptom_text = ', '.join([s.get('symptom', '') for s in (symptom_advice.get('symptom_analysis', []) or [])])
+        crop_data = {
+            'crop_type': crop_type,
+            'growth_stage': growth_stage,
+            'temperature': w['temperature'],
+            'humidity': w['humidity'],
+            'rainfall': w['rainfall'],
+            'wind_speed': w['wind_speed'],
+            'stress_level': stress_level
+        }
+        llm_inputs.append((symptom_text or notes[i], crop_data))
+        rows.append({
+            'crop_type': crop_type,
+            'growth_stage': growth_stage,
+            'stress_level': stress_level,
+            'confidence': round(float(confidences[i]), 2),
+            'observations': observed[i],
+            'symptom_analysis': symptom_advice.get('symptom_analysis', []),
+            'recommendations': recommendation,
+            'combined_assessment': symptom_advice.get('combined_assessment', ''),
+            'action_priority': symptom_advice.get('action_priority', []),
+            'ai_analysis': cached_analysis(symptom_text or notes[i], crop_data),
+            'ml_based_recommendation': recommendation,
+            'location': record.get('location', ''),
+            'latitude': lat,
+            'longitude': lon,
+            'geo_cell': geo_cell_for(lat, lon),
+            **recorded_weather(w)
+        })
+    return rows, llm_inputs
+
+
+def ingest_reports(records, chunk_size=None):
+    """Validate, score and insert a batch of report dicts
+
+    Returns (results, pending). results has one dict per input row, in
+    order, with 'index' and 'status' ('created', 'invalid' or 'failed')
+    plus the new id and prediction or the errors. pending lists
+    (report_id, symptoms, crop_data) for created reports that have no
+    cached AI analysis.
+    """
+    chunk_size = max(1, chunk_size or REPORTS_BULK_CHUNK)
+    results = [None] * len(records)
+    valid = []
+    for i, record in enumerate(records):
+        errors = validate_bulk_row(record)
+        if errors:
+            results[i] = {'index': i, 'status': INVALID, 'errors': errors}
+        else:
+            valid.append(i)
+    if not valid:
+        return results, []
+
+    rows, llm_inputs = _build_rows([records[i] for i in valid])
+    pending = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        now = datetime.utcnow()
+        for row in chunk:
+            row['created_at'] = row['updated_at'] = now
+        try:
+            ids = db.session.execute(
+                insert(Report).returning(Report.id, sort_by_parameter_order=True), chunk
+            ).scalars().all()
+            count_in_rollups(db.session.connection(), [{name: row[name] for name in ROLLUP_SOURCE_FIELDS} for row in chunk])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Bulk insert of {len(chunk)} reports failed: {str(e)}")
+            for offset in range(len(chunk)):
+                i = valid[start + offset]
+                results[i] = {'index': i, 'status': FAILED, 'errors': [str(e)]}
+            continue
+        for offset, (report_id, row) in enumerate(zip(ids, chunk)):
+            i = valid[start + offset]
+            results[i] = {
+                'index': i,
+                'status': CREATED,
+                'id': report_id,
+                'stress_level': row['stress_level'],
+                'stress_label': get_stress_label(row['stress_level']),
+                'confidence': row['confidence']
+            }
+            if row['ai_analysis'] is None:
+                pending.append((report_id, *llm_inputs[start + offset]))
+    return results, pending
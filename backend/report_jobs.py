@@ -0,0 +1,183 @@
+"""Background LLM enrichment of submitted reports
+
+In async mode submit_report commits the Report without ai_analysis and
+enqueues a job here. Jobs are rows in a small SQLite table (so they
+survive restarts and are visible to every gunicorn worker) and their ids
+travel through an in-process queue.Queue to a pool of worker threads.
+A worker claims the row atomically, runs the LLM call, writes
+Report.ai_analysis and marks the job done.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', 'jobs.db')
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', '2'))
+# A 'running' job not updated for this long is assumed orphaned by a dead worker
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '120'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class AnalysisJobQueue:
+    """SQLite-backed job table drained by a pool of worker threads"""
+
+    def __init__(self, handler, on_failure=None, path=JOBS_DB_PATH, workers=LLM_WORKERS):
+        # handler(report_id, payload) does the work; on_failure(report_id, payload, error)
+        # runs once a job has used up its attempts
+        self.handler = handler
+        self.on_failure = on_failure
+        self.path = path
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._local = threading.local()
+
+    # -- storage --------------------------------------------------------
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'report_id INTEGER NOT NULL, '
+                'status TEXT NOT NULL, '
+                'payload TEXT NOT NULL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'error TEXT, '
+                'created_at REAL NOT NULL, '
+                'updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_analysis_jobs_report ON analysis_jobs (report_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_analysis_jobs_status ON analysis_jobs (status)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, report_id, payload):
+        """Persist a job for a report and hand it to the worker pool"""
+        self._ensure_started()
+        now = time.time()
+        cursor = self._db().execute(
+            'INSERT INTO analysis_jobs (report_id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (report_id, PENDING, json.dumps(payload), now, now)
+        )
+        self._queue.put(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def status(self, report_id):
+        """Latest job state for a report as a dict, or None if it never had one"""
+        if not os.path.exists(self.path):
+            return None
+        row = self._db().execute(
+            'SELECT id, status, attempts, error, created_at, updated_at FROM analysis_jobs '
+            'WHERE report_id = ? ORDER BY id DESC LIMIT 1',
+            (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'status': row[1],
+            'attempts': row[2],
+            'error': row[3],
+            'created_at': row[4],
+            'updated_at': row[5]
+        }
+
+    def wait(self, timeout):
+        """Block until any job in this process changes state, or timeout"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    # -- workers --------------------------------------------------------
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so start them lazily in each process
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'llm-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+        self._recover()
+
+    def start(self):
+        """Start the worker pool and pick up jobs left over from a previous run"""
+        self._ensure_started()
+
+    def _recover(self):
+        conn = self._db()
+        conn.execute(
+            'UPDATE analysis_jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?',
+            (PENDING, time.time(), RUNNING, time.time() - JOB_LEASE_SECONDS)
+        )
+        for (job_id,) in conn.execute('SELECT id FROM analysis_jobs WHERE status = ? ORDER BY id', (PENDING,)):
+            self._queue.put(job_id)
+
+    def _claim(self, job_id):
+        conn = self._db()
+        claimed = conn.execute(
+            'UPDATE analysis_jobs SET status = ?, attempts = attempts + 1, updated_at = ? '
+            'WHERE id = ? AND status = ?',
+            (RUNNING, time.time(), job_id, PENDING)
+        ).rowcount
+        if not claimed:
+            return None  # another worker or process got it first
+        return conn.execute(
+            'SELECT report_id, payload, attempts FROM analysis_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+
+    def _finish(self, job_id, status, error=None):
+        self._db().execute(
+            'UPDATE analysis_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+            (status, error, time.time(), job_id)
+        )
+        with self._changed:
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                claimed = self._claim(job_id)
+                if claimed is None:
+                    continue
+                report_id, payload, attempts = claimed
+                payload = json.loads(payload)
+                try:
+                    self.handler(report_id, payload)
+                    self._finish(job_id, DONE)
+                except Exception as e:
+                    print(f"LLM job {job_id} for report {report_id} failed: {str(e)}")
+                    if attempts < JOB_MAX_ATTEMPTS:
+                        self._finish(job_id, PENDING, str(e))
+                        self._queue.put(job_id)
+                    else:
+                        if self.on_failure is not None:
+                            self.on_failure(report_id, payload, e)
+                        self._finish(job_id, FAILED, str(e))
+            except Exception as e:
+                print(f"LLM worker error on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
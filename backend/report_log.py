@@ -0,0 +1,197 @@
+"""Append-only NDJSON report store for the file mode used by offline kiosks
+
+Each report is one JSON line in the log (default reports.ndjson). A
+sidecar index (<log>.idx) holds the id of the first record as an 8-byte
+header, then the 8-byte byte offset of each record in id order. Writes
+append one line and one offset, so they cost the same however long the log
+gets. Reads by id are one seek into each file, and iteration streams the
+log line by line.
+
+Writers take an exclusive flock on <log>.lock, so ids stay unique across
+gunicorn workers. On Windows only threads of one process are serialized.
+Before each append the writer brings the index up to the end of the log:
+lines written by a process that died before updating the index are added,
+and a torn last line is cut off. compact() drops records that have been
+migrated into the database. It rewrites both files and swaps them in
+atomically, and record ids keep their values.
+"""
+
+import json
+import os
+import struct
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+REPORT_LOG_PATH = os.getenv('REPORT_LOG_PATH', 'reports.ndjson')
+
+_OFFSET = struct.Struct('<Q')
+_thread_lock = threading.Lock()
+
+
+class ReportLog:
+    """One NDJSON log file plus its offset index"""
+
+    def __init__(self, path=REPORT_LOG_PATH):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.lock_path = path + '.lock'
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        with _thread_lock if exclusive else nullcontext():
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _create_files(self):
+        for path in (self.path, self.index_path):
+            open(path, 'ab').close()
+
+    def _read_header(self, index):
+        index.seek(0)
+        header = index.read(_OFFSET.size)
+        return _OFFSET.unpack(header)[0] if len(header) == _OFFSET.size else None
+
+    def _last_record_end(self, log, index, first_id, count):
+        """Byte offset just past the last indexed record, or None if the index doesn't match the log"""
+        index.seek(_OFFSET.size + (count - 1) * _OFFSET.size)
+        last = _OFFSET.unpack(index.read(_OFFSET.size))[0]
+        log.seek(last)
+        line = log.readline()
+        try:
+            if line.endswith(b'\n') and json.loads(line).get('id') == first_id + count - 1:
+                return last + len(line)
+        except ValueError:
+            pass
+        return None
+
+    def _sync_index(self, log, index):
+        """Index every complete line past the last indexed record; returns the next id"""
+        first_id = self._read_header(index) or 1
+        index.seek(0, os.SEEK_END)
+        count = max(0, (index.tell() - _OFFSET.size) // _OFFSET.size)
+        end = self._last_record_end(log, index, first_id, count) if count else 0
+        if end is None:
+            # Left behind by a crash during compact(): rebuild from the log
+            count, end = 0, 0
+        index.truncate(_OFFSET.size + count * _OFFSET.size)  # also drops a torn offset
+        index.seek(0)
+        index.write(_OFFSET.pack(first_id))
+
+        log.seek(end)
+        index.seek(0, os.SEEK_END)
+        while True:
+            line = log.readline()
+            if not line.endswith(b'\n'):
+                break
+            if count == 0:
+                # Ids continue from the first record on file
+                first_id = json.loads(line).get('id', first_id)
+                index.seek(0)
+                index.write(_OFFSET.pack(first_id))
+                index.seek(0, os.SEEK_END)
+            index.write(_OFFSET.pack(end))
+            end += len(line)
+            count += 1
+        # A line without its newline is a write that never finished
+        log.truncate(end)
+        return first_id + count
+
+    def append(self, report_data):
+        """Assign the next id and a timestamp, append the report; returns the stored dict"""
+        with self._locked():
+            self._create_files()
+            with open(self.path, 'r+b') as log, open(self.index_path, 'r+b') as index:
+                report = dict(report_data)
+                report['id'] = self._sync_index(log, index)
+                report.setdefault('timestamp', datetime.now().isoformat())
+                log.seek(0, os.SEEK_END)
+                offset = log.tell()
+                log.write(json.dumps(report, separators=(',', ':')).encode('utf-8') + b'\n')
+                log.flush()
+                index.seek(0, os.SEEK_END)
+                index.write(_OFFSET.pack(offset))
+        return report
+
+    def get(self, report_id):
+        """The report with this id, or None"""
+        if not os.path.exists(self.index_path):
+            return None
+        with self._locked(exclusive=False):
+            with open(self.index_path, 'rb') as index:
+                first_id = self._read_header(index)
+                if first_id is None or report_id < first_id:
+                    return None
+                index.seek(_OFFSET.size + (report_id - first_id) * _OFFSET.size)
+                entry = index.read(_OFFSET.size)
+            if len(entry) < _OFFSET.size:
+                return None
+            with open(self.path, 'rb') as log:
+                log.seek(_OFFSET.unpack(entry)[0])
+                return json.loads(log.readline())
+
+    def __iter__(self):
+        return self.iter_reports()
+
+    def iter_reports(self, after_id=0):
+        """Stream reports with id > after_id in id order"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as log:
+            # An open handle keeps reading the old file if compact() swaps it out
+            for line in log:
+                if not line.endswith(b'\n'):
+                    break
+                report = json.loads(line)
+                if report.get('id', 0) > after_id:
+                    yield report
+
+    def __len__(self):
+        if not os.path.exists(self.index_path):
+            return 0
+        return max(0, (os.path.getsize(self.index_path) - _OFFSET.size) // _OFFSET.size)
+
+    def compact(self, through_id):
+        """Drop records with id <= through_id; returns how many were dropped"""
+        if not os.path.exists(self.path):
+            return 0
+        with self._locked():
+            self._create_files()
+            with open(self.path, 'r+b') as log, open(self.index_path, 'r+b') as index:
+                next_id = self._sync_index(log, index)
+                first_id = self._read_header(index)
+                keep_from = min(max(first_id, through_id + 1), next_id)
+                if keep_from == first_id:
+                    return 0
+                if keep_from < next_id:
+                    index.seek(_OFFSET.size + (keep_from - first_id) * _OFFSET.size)
+                    start = _OFFSET.unpack(index.read(_OFFSET.size))[0]
+                else:
+                    log.seek(0, os.SEEK_END)
+                    start = log.tell()
+                log.seek(start)
+                with open(self.path + '.tmp', 'wb') as new_log, open(self.index_path + '.tmp', 'wb') as new_index:
+                    new_index.write(_OFFSET.pack(keep_from))
+                    position = 0
+                    for line in log:
+                        new_index.write(_OFFSET.pack(position))
+                        new_log.write(line)
+                        position += len(line)
+            # A crash between the two leaves a new index over the old log; the
+            # next writer finds they disagree and rebuilds the index
+            os.replace(self.index_path + '.tmp', self.index_path)
+            os.replace(self.path + '.tmp', self.path)
+            return keep_from - first_id
+
@@ -0,0 +1,296 @@
+"""Listing queries for GET /api/reports
+
+Pages are fetched by keyset (a cursor holding the last row's created_at
+and id) rather than OFFSET, so every page is a range scan on
+ix_reports_created_at_id however deep the client has paged. Only the
+requested columns are loaded, and the total count is optional.
+
+Filters on crop, stress level and stage map onto the composite indexes
+declared on Report. Bounding boxes (and the bounding box of a radius) are
+narrowed through the integer geo_cell column: a box covers a few grid
+rows, and within a row the cells are a contiguous id range, so the
+condition is a handful of BETWEENs on ix_reports_cell_created. That works
+the same on SQLite and Postgres. The exact distance check of a radius
+query runs in Python on the candidates. On SQLite a spatial page is
+ordered by +created_at: otherwise, with the page size as a bound LIMIT,
+the planner walks ix_reports_created_at_id through the whole table
+instead of the geo_cell ranges.
+"""
+
+import base64
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, literal_column, or_, tuple_
+
+from models_db import db, Report, REPORT_FIELDS, MINIMAL_FIELDS, GEO_CELL_COLS, geo_cell_for, serialize_field
+
+REPORTS_MAX_PER_PAGE = int(os.getenv('REPORTS_MAX_PER_PAGE', '1000'))
+# Boxes spanning more grid rows than this are filtered on lat/lon alone
+MAX_CELL_ROWS = 64
+EARTH_RADIUS_KM = 6371.0
+
+
+def parse_fields(value):
+    """Columns for a ?fields= value: default MINIMAL_FIELDS, 'all' for every column; raises ValueError"""
+    if not value:
+        return MINIMAL_FIELDS
+    if value == 'all':
+        return REPORT_FIELDS
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in REPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Keep the client's order, drop repeats
+    return tuple(dict.fromkeys(fields))
+
+
+def _parse_time(value, name, end=False):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    # A bare date as the upper bound means "through the end of that day"
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _parse_floats(value, name, count):
+    try:
+        numbers = [float(v) for v in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    return numbers
+
+
+def parse_filters(args):
+    """Filter dict from request args; raises ValueError on malformed values
+
+    crop, stress (e.g. '2' or '1,2'), stage, since/until (ISO date or
+    datetime, until inclusive for dates) or days, bbox (west,south,east,north)
+    and lat/lon/radius_km.
+    """
+    filters = {}
+    if args.get('crop'):
+        filters['crop_type'] = args['crop']
+    if args.get('stage'):
+        filters['growth_stage'] = args['stage']
+    if args.get('stress'):
+        try:
+            levels = sorted({int(v) for v in args['stress'].split(',')})
+        except ValueError:
+            raise ValueError("stress must be 0, 1 or 2 (comma-separated for several)")
+        if any(level not in (0, 1, 2) for level in levels):
+            raise ValueError("stress must be 0, 1 or 2 (comma-separated for several)")
+        filters['stress_level'] = levels
+
+    if args.get('days'):
+        try:
+            filters['since'] = datetime.utcnow() - timedelta(days=float(args['days']))
+        except ValueError:
+            raise ValueError("days must be a number")
+    if args.get('since'):
+        filters['since'] = _parse_time(args['since'], 'since')
+    if args.get('until'):
+        filters['until'] = _parse_time(args['until'], 'until', end=True)
+
+    if args.get('bbox'):
+        west, south, east, north = _parse_floats(args['bbox'], 'bbox', 4)
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise ValueError("bbox must be west,south,east,north with south <= north")
+        if west > east:
+            raise ValueError("bbox crossing the antimeridian is not supported")
+        filters['bbox'] = (west, south, east, north)
+
+    if any(args.get(k) for k in ('lat', 'lon', 'radius_km')):
+        try:
+            lat, lon, radius_km = float(args['lat']), float(args['lon']), float(args['radius_km'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("radius search needs numeric lat, lon and radius_km")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius_km <= 0:
+            raise ValueError("Invalid lat/lon or radius_km")
+        filters['center'] = (lat, lon, radius_km)
+    return filters
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat, lon, radius_km):
+    """(west, south, east, north) enclosing a circle; clipped at the poles and the antimeridian"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    if south == -90.0 or north == 90.0:
+        return -180.0, south, 180.0, north
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    return max(-180.0, lon - dlon), south, min(180.0, lon + dlon), north
+
+
+def cell_ranges(west, south, east, north):
+    """(first, last) geo_cell id range of each grid row a box touches"""
+    first_row, first_col = divmod(geo_cell_for(south, west), GEO_CELL_COLS)
+    last_row, last_col = divmod(geo_cell_for(north, east), GEO_CELL_COLS)
+    return [
+        (row * GEO_CELL_COLS + first_col, row * GEO_CELL_COLS + last_col)
+        for row in range(first_row, last_row + 1)
+    ]
+
+
+def cell_condition(column, ranges):
+    """OR of BETWEENs on a geo_cell column"""
+    # Cell ids are our own integers, inlined so the planner can see how narrow
+    # the ranges are (with bound parameters SQLite prefers the created_at index).
+    # A bound LIMIT still tips it towards that index; see _newest_first
+    return or_(*[
+        column.between(literal_column(str(first)), literal_column(str(last)))
+        for first, last in ranges
+    ])
+
+
+def _uses_cell_index(filters):
+    """Whether apply_filters narrows the query through geo_cell ranges"""
+    boxes = ([filters['bbox']] if 'bbox' in filters else []) + \
+            ([radius_bbox(*filters['center'])] if 'center' in filters else [])
+    return any(len(cell_ranges(*box)) <= MAX_CELL_ROWS for box in boxes)
+
+
+def _newest_first(filters):
+    """ORDER BY of a listing: created_at, id descending"""
+    created_at = Report.created_at
+    if _uses_cell_index(filters) and db.engine.dialect.name == 'sqlite':
+        # Unary + is a no-op on the value but keeps ix_reports_created_at_id from serving the ORDER BY
+        created_at = literal_column(f'+{Report.__tablename__}.created_at')
+    return created_at.desc(), Report.id.desc()
+
+
+def _bbox_condition(west, south, east, north):
+    condition = and_(
+        Report.latitude.between(south, north),
+        Report.longitude.between(west, east)
+    )
+    ranges = cell_ranges(west, south, east, north)
+    if len(ranges) > MAX_CELL_ROWS:
+        return condition
+    return and_(cell_condition(Report.geo_cell, ranges), condition)
+
+
+def apply_filters(query, filters):
+    """Add the SQL conditions of a parse_filters dict to a query"""
+    if 'crop_type' in filters:
+        query = query.filter(Report.crop_type == filters['crop_type'])
+    if 'stress_level' in filters:
+        levels = filters['stress_level']
+        query = query.filter(Report.stress_level == levels[0] if len(levels) == 1 else Report.stress_level.in_(levels))
+    if 'growth_stage' in filters:
+        query = query.filter(Report.growth_stage == filters['growth_stage'])
+    if 'since' in filters:
+        query = query.filter(Report.created_at >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(Report.created_at < filters['until'])
+    if 'bbox' in filters:
+        query = query.filter(_bbox_condition(*filters['bbox']))
+    if 'center' in filters:
+        query = query.filter(_bbox_condition(*radius_bbox(*filters['center'])))
+    return query
+
+
+def _within_radius(filters):
+    """Row predicate for the exact radius check, or None without a radius filter"""
+    if 'center' not in filters:
+        return None
+    lat, lon, radius_km = filters['center']
+    return lambda row: haversine_km(lat, lon, row.latitude, row.longitude) <= radius_km
+
+
+def encode_cursor(created_at, report_id):
+    """Opaque cursor pointing just past a row in (created_at, id) DESC order"""
+    raw = json.dumps([created_at.isoformat(), report_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from encode_cursor output; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, report_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(report_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _after(created_at, report_id):
+    return tuple_(Report.created_at, Report.id) < tuple_(created_at, report_id)
+
+
+def list_reports(fields=MINIMAL_FIELDS, per_page=100, cursor=None, page=None, with_total=True, filters=None):
+    """One page of reports, newest first, as dicts of the requested fields
+
+    Pass cursor (from a previous 'next_cursor') for keyset paging, or page
+    for the old OFFSET paging. filters is a parse_filters dict. Returns a
+    dict with 'reports', 'per_page', 'total' (None when with_total is
+    False) and 'next_cursor' or 'page'/'pages'.
+    """
+    filters = filters or {}
+    within = _within_radius(filters)
+    if within is not None and page is not None:
+        raise ValueError("Radius searches page by cursor, not page")
+    per_page = max(1, min(per_page, REPORTS_MAX_PER_PAGE))
+    # The cursor needs created_at and id (and the radius check lat/lon) even when not requested
+    extra = ('created_at', 'id') + (('latitude', 'longitude') if within else ())
+    columns = tuple(dict.fromkeys(fields + extra))
+    query = apply_filters(
+        db.session.query(*[getattr(Report, name) for name in columns]),
+        filters
+    ).order_by(*_newest_first(filters))
+
+    total = None
+    if with_total:
+        if within is None:
+            total = apply_filters(db.session.query(func.count(Report.id)), filters).scalar()
+        else:
+            candidates = apply_filters(db.session.query(Report.latitude, Report.longitude), filters)
+            total = sum(1 for row in candidates.yield_per(5000) if within(row))
+
+    if page is not None:
+        page = max(1, page)
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
+    else:
+        after = decode_cursor(cursor) if cursor else None
+        if within is None:
+            rows = (query.filter(_after(*after)) if after else query).limit(per_page + 1).all()
+        else:
+            # Keep reading candidate chunks until the radius check leaves a full page
+            rows = []
+            chunk = max(per_page * 4, 200)
+            while len(rows) <= per_page:
+                candidates = (query.filter(_after(*after)) if after else query).limit(chunk).all()
+                rows.extend(row for row in candidates if within(row))
+                if len(candidates) < chunk:
+                    break
+                after = (candidates[-1].created_at, candidates[-1].id)
+
+    has_more = page is None and len(rows) > per_page
+    rows = rows[:per_page]
+    result = {
+        'reports': [{name: serialize_field(getattr(row, name)) for name in fields} for row in rows],
+        'per_page': per_page,
+        'total': total
+    }
+    if page is not None:
+        result['page'] = page
+        result['pages'] = -(-total // per_page) if total is not None else None
+    else:
+        last = rows[-1] if rows else None
+        result['next_cursor'] = encode_cursor(last.created_at, last.id) if has_more else None
+    return result
@@ -0,0 +1,145 @@
+"""Dashboard aggregates for GET /api/reports/stats
+
+Counts and mean confidence are computed with GROUP BY on the rollup
+tables, not on reports. Each submitted report adds to one row of each
+rollup in its own transaction, so a dashboard query reads at most one row
+per combination seen so far. It does not get slower as reports accumulate.
+report_rollups (day, crop, stage, stress) serves everything except grid
+cells. report_cell_rollups (day, geo_cell, crop, stress) serves cell
+groupings and bbox filters, which therefore cannot be combined with stage.
+
+Filters are those of GET /api/reports, at rollup resolution: since/until
+match whole days and bbox matches whole 0.1° cells. A radius filter is
+rejected because the rollups cannot check exact distances.
+"""
+
+from sqlalchemy import and_, func
+
+from models_db import db, ReportRollup, ReportCellRollup, GEO_CELL_COLS, UNKNOWN_STAGE, UNKNOWN_LEVEL, geo_cell_center
+from report_queries import MAX_CELL_ROWS, cell_condition, cell_ranges, parse_filters
+
+# ?by= name -> rollup column name
+STATS_DIMENSIONS = {
+    'crop': 'crop_type',
+    'stress': 'stress_level',
+    'stage': 'growth_stage',
+    'day': 'day',
+    'cell': 'geo_cell',
+}
+
+
+def parse_group_by(value):
+    """Dimensions for a ?by= value such as 'crop' or 'day,stress'; raises ValueError"""
+    dimensions = [d.strip() for d in (value or 'crop').split(',') if d.strip()]
+    unknown = [d for d in dimensions if d not in STATS_DIMENSIONS]
+    if unknown or not dimensions:
+        raise ValueError(f"by must be one or more of: {', '.join(STATS_DIMENSIONS)}")
+    return tuple(dict.fromkeys(dimensions))
+
+
+def parse_stats_filters(args):
+    """parse_filters for the stats endpoint; raises ValueError"""
+    filters = parse_filters(args)
+    if 'center' in filters:
+        raise ValueError("Radius filters are not supported for stats; use bbox")
+    return filters
+
+
+def rollup_for(group_by, filters):
+    """The rollup model able to answer a query; raises ValueError if neither can"""
+    if 'cell' not in group_by and 'bbox' not in filters:
+        return ReportRollup
+    if 'stage' in group_by or 'growth_stage' in filters:
+        raise ValueError("stage cannot be combined with cell or bbox")
+    return ReportCellRollup
+
+
+def _cell_filter(column, bbox):
+    """geo_cell condition matching the whole cells a bbox touches"""
+    ranges = cell_ranges(*bbox)
+    if len(ranges) <= MAX_CELL_ROWS:
+        return cell_condition(column, ranges)
+    # Too many grid rows for an OR of ranges: the span of cell ids, then the column within the row
+    (first, first_last), (_, last) = ranges[0], ranges[-1]
+    return and_(column.between(first, last),
+                (column % GEO_CELL_COLS).between(first % GEO_CELL_COLS, first_last % GEO_CELL_COLS))
+
+
+def _apply_rollup_filters(query, model, filters):
+    if 'crop_type' in filters:
+        query = query.filter(model.crop_type == filters['crop_type'])
+    if 'stress_level' in filters:
+        query = query.filter(model.stress_level.in_(filters['stress_level']))
+    if 'growth_stage' in filters:
+        query = query.filter(model.growth_stage == filters['growth_stage'])
+    if 'since' in filters:
+        query = query.filter(model.day >= filters['since'].date())
+    if 'until' in filters:
+        until = filters['until']
+        # until is exclusive: a bare date has already been moved to the next midnight
+        if until.time() == until.min.time():
+            query = query.filter(model.day < until.date())
+        else:
+            query = query.filter(model.day <= until.date())
+    if 'bbox' in filters:
+        query = query.filter(_cell_filter(model.geo_cell, filters['bbox']))
+    return query
+
+
+def _group_fields(dimension, value):
+    if dimension == 'crop':
+        return {'crop_type': value}
+    if dimension == 'stage':
+        return {'growth_stage': None if value == UNKNOWN_STAGE else value}
+    if dimension == 'stress':
+        return {'stress_level': None if value == UNKNOWN_LEVEL else value}
+    if dimension == 'day':
+        return {'day': value.isoformat()}
+    lat, lon = geo_cell_center(value)
+    return {'geo_cell': value, 'latitude': round(lat, 2), 'longitude': round(lon, 2)}
+
+
+def _mean(total, count):
+    return round(total / count, 2) if count else None
+
+
+def report_stats(group_by=('crop',), filters=None):
+    """Report counts and mean confidence per group, plus the overall totals
+
+    Returns {'by': [...], 'groups': [{<dimension fields>, 'count',
+    'mean_confidence'}], 'total', 'mean_confidence'}, with groups in
+    dimension order. Raises ValueError for combinations no rollup covers.
+    """
+    filters = filters or {}
+    model = rollup_for(group_by, filters)
+    columns = [getattr(model, STATS_DIMENSIONS[d]) for d in group_by]
+    query = _apply_rollup_filters(
+        db.session.query(
+            *columns,
+            func.sum(model.report_count),
+            func.sum(model.confidence_sum),
+            func.sum(model.confidence_count)
+        ),
+        model,
+        filters
+    ).group_by(*columns).order_by(*columns)
+
+    groups = []
+    total = confidence_sum = confidence_count = 0
+    for row in query:
+        keys, (count, row_sum, row_count) = row[:len(columns)], row[len(columns):]
+        group = {}
+        for dimension, value in zip(group_by, keys):
+            group.update(_group_fields(dimension, value))
+        group['count'] = count
+        group['mean_confidence'] = _mean(row_sum, row_count)
+        groups.append(group)
+        total += count
+        confidence_sum += row_sum
+        confidence_count += row_count
+    return {
+        'by': list(group_by),
+        'groups': groups,
+        'total': total,
+        'mean_confidence': _mean(confidence_sum, confidence_count)
+    }
@@ -0,0 +1,175 @@
+"""What-if sweeps for POST /api/predict/scenario
+
+A scenario is one base input plus one or two swept numeric variables.
+Every grid point is scored in a single predict_proba_batch call on the
+model itself: not through the prediction cache, whose rounding would
+flatten fine steps into a staircase, and not through the stress lattice
+or the inference sidecar. The surface comes back as flat C-order arrays
+(first variable slowest), base64-encoded little-endian by default so
+that charts with thousands of points stay small:
+
+    stress_level   uint8
+    confidence     float32
+    probabilities  float32, one extra last axis per class (on request)
+
+One-variable sweeps also list the points where the predicted class
+changes, which answers "at what rainfall does this field leave severe
+stress?" without decoding anything.
+"""
+
+import base64
+import math
+import os
+
+import numpy as np
+
+SCENARIO_MAX_POINTS = int(os.getenv('SCENARIO_MAX_POINTS', '20000'))
+SCENARIO_ENCODINGS = ('base64', 'json')
+
+SWEEP_VARIABLES = ('temperature', 'humidity', 'rainfall', 'wind_speed')
+BASE_FIELDS = SWEEP_VARIABLES + ('crop_type', 'growth_stage')
+
+
+def _number(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite")
+    return number
+
+
+def _axis_values(axis):
+    """Values of one sweep: explicit 'values', or 'start'/'stop'/'steps' (inclusive)
+
+    Sizes are checked against SCENARIO_MAX_POINTS before any array is built.
+    """
+    if 'values' in axis:
+        if not isinstance(axis['values'], list) or not axis['values']:
+            raise ValueError("values must be a non-empty list")
+        if len(axis['values']) > SCENARIO_MAX_POINTS:
+            raise ValueError(f"A sweep has at most {SCENARIO_MAX_POINTS} values")
+        return np.array([_number(v, 'values') for v in axis['values']])
+    missing = [key for key in ('start', 'stop', 'steps') if key not in axis]
+    if missing:
+        raise ValueError(f"Each sweep needs values or start, stop and steps (missing {', '.join(missing)})")
+    steps = axis['steps']
+    if not isinstance(steps, int) or isinstance(steps, bool) or steps < 2:
+        raise ValueError("steps must be an integer of at least 2")
+    if steps > SCENARIO_MAX_POINTS:
+        raise ValueError(f"steps must be at most {SCENARIO_MAX_POINTS}")
+    return np.linspace(_number(axis['start'], 'start'), _number(axis['stop'], 'stop'), steps)
+
+
+def parse_scenario(payload):
+    """(base, [(variable, values), ...], encoding, include_probabilities); raises ValueError
+
+    {"base": {...six /api/predict fields...},
+     "sweep": [{"variable": "rainfall", "start": 0, "stop": 40, "steps": 81}, ...],
+     "encoding": "base64" | "json", "probabilities": false}
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be a JSON object")
+    base = payload.get('base')
+    if not isinstance(base, dict) or not all(field in base for field in BASE_FIELDS):
+        raise ValueError(f"base must contain {', '.join(BASE_FIELDS)}")
+    sweep = payload.get('sweep')
+    if not isinstance(sweep, list) or not 1 <= len(sweep) <= 2:
+        raise ValueError("sweep must be a list of one or two variables")
+
+    axes = []
+    for axis in sweep:
+        variable = axis.get('variable') if isinstance(axis, dict) else None
+        if variable not in SWEEP_VARIABLES:
+            raise ValueError(f"Sweep variable must be one of: {', '.join(SWEEP_VARIABLES)}")
+        if variable in (name for name, _ in axes):
+            raise ValueError(f"{variable} is swept twice")
+        axes.append((variable, _axis_values(axis)))
+
+    points = math.prod(len(values) for _, values in axes)
+    if points > SCENARIO_MAX_POINTS:
+        raise ValueError(f"Scenario has {points} points; the limit is {SCENARIO_MAX_POINTS}")
+
+    encoding = payload.get('encoding', 'base64')
+    if encoding not in SCENARIO_ENCODINGS:
+        raise ValueError(f"encoding must be one of: {', '.join(SCENARIO_ENCODINGS)}")
+
+    base = dict(base)
+    for name in SWEEP_VARIABLES:
+        base[name] = _number(base[name], name)
+    base['crop_type'] = str(base['crop_type']).lower()
+    base['growth_stage'] = str(base['growth_stage']).lower()
+    return base, axes, encoding, bool(payload.get('probabilities', False))
+
+
+def run_scenario(model, base, axes):
+    """Score every grid point in one call -> (classes, stress_levels, confidences, probabilities)
+
+    Arrays are shaped like the grid; probabilities has an extra last axis.
+    """
+    shape = tuple(len(values) for _, values in axes)
+    grids = dict(zip((name for name, _ in axes),
+                     np.meshgrid(*(values for _, values in axes), indexing='ij')))
+    n = math.prod(shape)
+    columns = {name: grids[name].ravel() if name in grids else np.full(n, base[name])
+               for name in SWEEP_VARIABLES}
+
+    classes, probabilities = model.predict_proba_batch(**columns, crop_type=[base['crop_type']] * n,
+                                                       growth_stage=[base['growth_stage']] * n)
+    best = probabilities.argmax(axis=1)
+    stress_levels = classes[best].astype(np.uint8)
+    confidences = probabilities[np.arange(n), best]
+    return (classes, stress_levels.reshape(shape), confidences.reshape(shape),
+            probabilities.reshape(*shape, len(classes)))
+
+
+def transitions(values, stress_levels):
+    """Where the class changes along a one-variable sweep"""
+    changes = np.flatnonzero(np.diff(stress_levels.astype(int)))
+    return [
+        {'between': [float(values[i]), float(values[i + 1])],
+         'from': int(stress_levels[i]), 'to': int(stress_levels[i + 1])}
+        for i in changes
+    ]
+
+
+def encode_array(array, dtype, encoding):
+    """Flat C-order array as base64 of little-endian bytes, or a plain JSON list"""
+    array = np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder('<'))
+    if encoding == 'base64':
+        return base64.b64encode(array.tobytes()).decode('ascii')
+    # Rounded so float32 values don't print as 0.5400000214576721
+    return (array.round(6) if array.dtype.kind == 'f' else array).ravel().tolist()
+
+
+def scenario_response(model, base, axes, encoding='base64', include_probabilities=False):
+    """JSON-ready surface for a parsed scenario"""
+    classes, stress_levels, confidences, probabilities = run_scenario(model, base, axes)
+    result = {
+        'base': base,
+        'variables': [name for name, _ in axes],
+        'axes': {name: values.tolist() for name, values in axes},
+        'shape': list(stress_levels.shape),
+        'count': int(stress_levels.size),
+        'classes': [int(c) for c in classes],
+        'encoding': encoding,
+        'dtypes': {'stress_level': 'uint8', 'confidence': 'float32'},
+        'stress_level': encode_array(stress_levels, np.uint8, encoding),
+        'confidence': encode_array(confidences, np.float32, encoding)
+    }
+    if include_probabilities:
+        result['dtypes']['probabilities'] = 'float32'
+        result['probabilities'] = encode_array(probabilities, np.float32, encoding)
+    if len(axes) == 1:
+        result['transitions'] = transitions(axes[0][1], stress_levels)
+    return result
+
+
+def decode_array(result, name):
+    """Inverse of encode_array for a scenario response, shaped like the grid"""
+    shape = list(result['shape']) + ([len(result['classes'])] if name == 'probabilities' else [])
+    dtype = np.dtype(result['dtypes'][name]).newbyteorder('<')
+    if result['encoding'] == 'base64':
+        return np.frombuffer(base64.b64decode(result[name]), dtype=dtype).reshape(shape)
+    return np.asarray(result[name], dtype=dtype).reshape(shape)
@@ -0,0 +1,48 @@
+"""Score every registered field against the weather forecast
+
+Fetches the multi-day forecast for each weather grid cell that has
+registered fields and stores the predicted stress per field and forecast
+step (see field_forecasts). Run it from cron a few times a day:
+
+    python score_forecasts.py
+
+or keep it running as a simple scheduler:
+
+    python score_forecasts.py --every 10800
+
+An interrupted run is resumed from its last committed chunk the next time;
+--restart starts over instead. --max-chunks bounds the work of a single
+invocation, and the rest is picked up by the next one.
+"""
+
+import argparse
+import time
+
+from app import app
+from field_forecasts import FORECAST_CHUNK_FIELDS, run_forecast_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--restart', action='store_true', help="abandon an unfinished run and start a new one")
+    parser.add_argument('--chunk-fields', type=int, default=FORECAST_CHUNK_FIELDS, help="fields per chunk")
+    parser.add_argument('--max-chunks', type=int, default=None, help="stop after this many chunks (resumable)")
+    parser.add_argument('--every', type=float, default=0, help="seconds between runs; 0 runs once")
+    args = parser.parse_args()
+
+    while True:
+        start = time.perf_counter()
+        with app.app_context():
+            run = run_forecast_job(restart=args.restart, chunk_fields=args.chunk_fields, max_chunks=args.max_chunks)
+            summary = run.to_dict()
+        args.restart = False
+        print(f"Forecast run {summary['id']} {summary['status']}: {summary['fields_done']}/{summary['fields_total']} "
+              f"fields, {summary['cells_fetched']} cells fetched, {summary['rows_written']} rows "
+              f"in {time.perf_counter() - start:.1f} s")
+        if not args.every:
+            break
+        time.sleep(max(0.0, args.every - (time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    main()
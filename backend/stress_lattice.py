@@ -0,0 +1,265 @@
+"""Precomputed stress lookup lattice
+
+The model has four continuous inputs plus crop and growth stage, which
+take only 13 x 7 values, so its answers can be computed ahead of time.
+`python stress_lattice.py` evaluates the model at every point of the
+LATTICE_AXES grid for every crop/stage pair and stores the class,
+confidence and class probabilities as an artifact directory (the
+model_artifact format, memory-mapped on load).
+
+With MODEL_LATTICE_PATH set, model_registry attaches the lattice to the
+loaded model and predictions become an indexed read of the nearest grid
+point. With LATTICE_INTERPOLATE=1 the class probabilities of the 16
+surrounding grid points are blended instead (multilinear interpolation).
+Inputs outside the grid bounds still go to the model.
+
+A lattice records a fingerprint of the model it was compiled from and is
+ignored when MODEL_PATH holds a different one, so recompile after
+retraining. Compiling prints how far the lattice is from the live model
+on random in-bounds inputs: it discretizes a tree ensemble, so inputs
+near a class boundary can get the neighbouring class.
+
+    python stress_lattice.py --model model.pkl --out model_lattice
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import time
+
+import numpy as np
+
+from model_artifact import MANIFEST_NAME, read_artifact, write_artifact
+from models import CropStressModel
+
+MODEL_LATTICE_PATH = os.getenv('MODEL_LATTICE_PATH', '')  # empty: always predict with the model
+LATTICE_INTERPOLATE = os.getenv('LATTICE_INTERPOLATE', '0') == '1'
+# start:stop:step of the grid per numeric input
+LATTICE_AXES = os.getenv('LATTICE_AXES',
+                         'temperature=0:50:2,humidity=0:100:5,rainfall=0:30:2,wind_speed=0:20:2')
+
+LATTICE_FORMAT = 'b2g-stress-lattice'
+AXES = ('temperature', 'humidity', 'rainfall', 'wind_speed')
+
+
+def parse_axes(spec):
+    """'temperature=0:50:2,...' -> {name: (start, step, count)} for all four inputs"""
+    axes = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, bounds = part.partition('=')
+        name = name.strip()
+        if name not in AXES:
+            raise ValueError(f"Unknown input in LATTICE_AXES: {name!r}")
+        start, stop, step = (float(v) for v in bounds.split(':'))
+        count = int(round((stop - start) / step)) + 1 if step > 0 else 0
+        if count < 2:
+            raise ValueError(f"Lattice axis {part!r} needs start < stop and 0 < step <= stop - start")
+        axes[name] = (start, step, count)
+    missing = [name for name in AXES if name not in axes]
+    if missing:
+        raise ValueError(f"LATTICE_AXES is missing {', '.join(missing)}")
+    return axes
+
+
+def model_fingerprint(path):
+    """sha256 of a model.pkl, or of an artifact directory's manifest"""
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StressLattice:
+    """Model answers read from the precomputed grid instead of evaluated"""
+
+    def __init__(self, arrays, metadata, interpolate=False):
+        # Indexed by (crop * n_stages + stage, temperature, humidity, rainfall, wind_speed)
+        self.stress_levels = arrays['stress_levels']
+        self.confidences = arrays['confidences']
+        self.probabilities = arrays['probabilities']  # extra last axis per class, in 1/255 units
+        self.classes = arrays['classes']
+        self.crop_classes = arrays['crop_classes'].astype(object)
+        self.stage_classes = arrays['stage_classes'].astype(object)
+        axes = metadata['axes']
+        self.starts = np.array([axes[name]['start'] for name in AXES])
+        self.steps = np.array([axes[name]['step'] for name in AXES])
+        self.counts = np.array([axes[name]['count'] for name in AXES])
+        self.model_fingerprint = metadata['model_fingerprint']
+        self.error = metadata.get('error')
+        self.interpolate = interpolate
+
+    @classmethod
+    def load(cls, path, interpolate=LATTICE_INTERPOLATE):
+        arrays, metadata = read_artifact(path, artifact_format=LATTICE_FORMAT)
+        return cls(arrays, metadata, interpolate)
+
+    def _pairs(self, crop_type, growth_stage):
+        crops, crop_known = CropStressModel._encode_column(self.crop_classes, crop_type)
+        stages, stage_known = CropStressModel._encode_column(self.stage_classes, growth_stage)
+        pairs = crops.astype(np.intp) * len(self.stage_classes) + stages.astype(np.intp)
+        # Same fallback as the model: an unknown crop or stage zeroes both
+        pairs[~(crop_known & stage_known)] = 0
+        return pairs
+
+    def lookup(self, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """(stress_levels, confidences, inside); rows with inside False hold no answer"""
+        values = np.column_stack([np.asarray(column, dtype=float)
+                                  for column in (temperature, humidity, rainfall, wind_speed)])
+        coords = (values - self.starts) / self.steps
+        # The tolerance keeps the upper bounds inside despite float rounding; NaN is outside
+        inside = ((coords >= -1e-9) & (coords <= self.counts - 1 + 1e-9)).all(axis=1)
+        coords[~inside] = 0
+        coords = np.clip(coords, 0, self.counts - 1)
+        pairs = self._pairs(crop_type, growth_stage)
+        if self.interpolate:
+            levels, confidences = self._interpolated(pairs, coords)
+        else:
+            index = (pairs, *np.rint(coords).astype(np.intp).T)
+            levels = self.stress_levels[index].astype(int)
+            confidences = self.confidences[index].astype(float)
+        return levels, confidences, inside
+
+    def _interpolated(self, pairs, coords):
+        low = np.minimum(np.floor(coords).astype(np.intp), self.counts - 2)
+        frac = coords - low
+        blended = np.zeros((len(pairs), len(self.classes)))
+        for corner in itertools.product((0, 1), repeat=len(AXES)):
+            corner = np.array(corner)
+            weight = np.prod(np.where(corner, frac, 1 - frac), axis=1)
+            blended += weight[:, None] * self.probabilities[(pairs, *(low + corner).T)]
+        best = blended.argmax(axis=1)
+        return self.classes[best].astype(int), blended[np.arange(len(best)), best] / 255
+
+    def predict_batch(self, fallback, temperature, humidity, rainfall, wind_speed, crop_type, growth_stage):
+        """Lattice answers for in-bounds rows; fallback (the model's predict_batch) for the rest"""
+        levels, confidences, inside = self.lookup(temperature, humidity, rainfall, wind_speed,
+                                                  crop_type, growth_stage)
+        if not inside.all():
+            rows = np.flatnonzero(~inside)
+            columns = [np.asarray(column)[rows]
+                       for column in (temperature, humidity, rainfall, wind_speed, crop_type, growth_stage)]
+            levels[rows], confidences[rows] = fallback(*columns)
+        return levels, confidences
+
+    def nbytes(self):
+        return self.stress_levels.nbytes + self.confidences.nbytes + self.probabilities.nbytes
+
+
+def compile_lattice(model, axes, fingerprint):
+    """Evaluate the model on the grid for every crop/stage pair -> (arrays, metadata)"""
+    grid_shape = tuple(axes[name][2] for name in AXES)
+    points = [grid.ravel() for grid in np.meshgrid(
+        *(start + step * np.arange(count) for start, step, count in (axes[name] for name in AXES)),
+        indexing='ij'
+    )]
+    n = len(points[0])
+    pairs = list(itertools.product(model.crop_classes, model.stage_classes))
+
+    stress_levels = np.empty((len(pairs), *grid_shape), dtype=np.uint8)
+    confidences = np.empty((len(pairs), *grid_shape), dtype=np.float16)
+    probabilities = None
+    for pair, (crop, stage) in enumerate(pairs):
+        classes, proba = model.predict_proba_batch(*points, [crop] * n, [stage] * n)
+        if probabilities is None:
+            probabilities = np.empty((len(pairs), *grid_shape, len(classes)), dtype=np.uint8)
+        best = proba.argmax(axis=1)
+        stress_levels[pair] = classes[best].reshape(grid_shape)
+        confidences[pair] = proba[np.arange(n), best].reshape(grid_shape)
+        probabilities[pair] = np.rint(proba * 255).reshape(*grid_shape, len(classes))
+
+    arrays = {
+        'stress_levels': stress_levels,
+        'confidences': confidences,
+        'probabilities': probabilities,
+        'classes': np.asarray(classes),
+        'crop_classes': model.crop_classes.astype(str),
+        'stage_classes': model.stage_classes.astype(str)
+    }
+    metadata = {
+        'axes': {name: dict(zip(('start', 'step', 'count'), axes[name])) for name in AXES},
+        'model_fingerprint': fingerprint
+    }
+    return arrays, metadata
+
+
+def measure_error(lattice, model, samples=20000, seed=0):
+    """Compare nearest and interpolated lookups with the model on random in-bounds inputs"""
+    rng = np.random.default_rng(seed)
+    columns = [rng.uniform(start, start + step * (count - 1), samples)
+               for start, step, count in zip(lattice.starts, lattice.steps, lattice.counts)]
+    columns += [rng.choice(lattice.crop_classes, samples), rng.choice(lattice.stage_classes, samples)]
+    levels, confidences = model.predict_batch(*columns)
+
+    interpolate = lattice.interpolate
+    report = {}
+    for mode in ('nearest', 'interpolated'):
+        lattice.interpolate = mode == 'interpolated'
+        got_levels, got_confidences, _ = lattice.lookup(*columns)
+        error = np.abs(got_confidences - confidences)
+        report[mode] = {
+            'class_agreement': float((got_levels == levels).mean()),
+            'max_confidence_error': float(error.max()),
+            'mean_confidence_error': float(error.mean())
+        }
+    lattice.interpolate = interpolate
+    return report
+
+
+def attach_lattice(model, model_path, lattice_path=MODEL_LATTICE_PATH):
+    """Set model.lattice from lattice_path if that lattice was compiled from model_path"""
+    if not lattice_path:
+        return None
+    try:
+        lattice = StressLattice.load(lattice_path)
+        if lattice.model_fingerprint != model_fingerprint(model_path):
+            print(f"Ignoring stress lattice {lattice_path}: it was compiled from a different model")
+            return None
+    except Exception as e:
+        # Without a usable lattice the model answers everything itself
+        print(f"Stress lattice not loaded from {lattice_path}: {e}")
+        return None
+    model.lattice = lattice
+    print(f"Stress lattice attached ({lattice.nbytes() / 1e6:.0f} MB, "
+          f"{'interpolated' if lattice.interpolate else 'nearest point'})")
+    return lattice
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'model.pkl'), help="default: MODEL_PATH")
+    parser.add_argument('--out', default=MODEL_LATTICE_PATH or 'model_lattice', help="default: MODEL_LATTICE_PATH")
+    parser.add_argument('--axes', default=LATTICE_AXES, help="start:stop:step per input, as LATTICE_AXES")
+    parser.add_argument('--samples', type=int, default=20000, help="random inputs for the error report")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"No model at {args.model}; train one first (train_model.py)")
+    # Fingerprint before loading: if the file is swapped meanwhile the lattice just won't attach
+    fingerprint = model_fingerprint(args.model)
+    model = CropStressModel(autoload=False)
+    model.load_model(args.model)
+    axes = parse_axes(args.axes)
+
+    start = time.perf_counter()
+    arrays, metadata = compile_lattice(model, axes, fingerprint)
+    elapsed = time.perf_counter() - start
+    lattice = StressLattice(arrays, metadata)
+    metadata['error'] = measure_error(lattice, model, args.samples)
+    write_artifact(args.out, arrays, metadata, artifact_format=LATTICE_FORMAT)
+
+    points = arrays['stress_levels'].size
+    print(f"Compiled {points:,} grid points ({len(arrays['stress_levels'])} crop/stage pairs x "
+          f"{' x '.join(str(axes[name][2]) for name in AXES)}) in {elapsed:.1f} s, "
+          f"{lattice.nbytes() / 1e6:.0f} MB -> {args.out}")
+    print(f"Error against the model on {args.samples:,} random in-bounds inputs:")
+    for mode, error in metadata['error'].items():
+        print(f"  {mode:<12} class agreement {error['class_agreement']:.2%}, confidence error "
+              f"max {error['max_confidence_error']:.3f} mean {error['mean_confidence_error']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
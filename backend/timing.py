@@ -0,0 +1,113 @@
+"""Request and stage timing, exported as Prometheus histograms
+
+Wrap a hot-path stage in `with span('weather'):` to add its wall time to
+b2g_stage_seconds{stage="weather"}. init_app() hooks Flask so every
+request is timed into b2g_request_seconds by endpoint, method and status.
+Spans also go to any extra sink registered with add_sink(fn), called as
+fn(stage, seconds), e.g. to forward them to StatsD or a log.
+
+With REQUEST_PROFILING=1, a request carrying ?profile=1 runs under
+cProfile. Its JSON response is wrapped as {"response": ..., "profile":
+{"spans_ms": ..., "stats": <pstats summary>}}. Leave it off in production:
+profiling is slow, and the stats show code paths to anyone who asks.
+
+Under gunicorn every worker has its own counters. To have /metrics add
+them up across workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory before starting gunicorn.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, jsonify, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', '0') == '1'
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '30'))  # functions listed in a profile
+
+# Seconds; stages range from sub-millisecond lookups to multi-second LLM calls
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram('b2g_stage_seconds', 'Wall time of instrumented request stages', ['stage'],
+                          buckets=STAGE_BUCKETS)
+REQUEST_SECONDS = Histogram('b2g_request_seconds', 'Wall time of HTTP requests until the response is returned',
+                            ['method', 'endpoint', 'status'], buckets=STAGE_BUCKETS)
+
+_sinks = []
+
+
+def add_sink(sink):
+    """Also send every span to sink(stage, seconds)"""
+    _sinks.append(sink)
+
+
+def record_span(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    # A profiled request also lists its spans, as [stage, ms] pairs
+    if has_request_context() and 'timing_spans' in g:
+        g.timing_spans.append([stage, round(seconds * 1000, 3)])
+    for sink in _sinks:
+        sink(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as one stage (recorded even if it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start)
+
+
+def metrics_response():
+    """(body, content type) of the Prometheus text exposition"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _profile_summary(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+def init_app(app):
+    """Register the timing (and optional profiling) hooks on a Flask app"""
+
+    @app.before_request
+    def _start_timing():
+        g.timing_start = time.perf_counter()
+        if REQUEST_PROFILING and request.args.get('profile') == '1':
+            g.timing_spans = []
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _stop_timing(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if response.is_json and not response.is_streamed:
+                response = jsonify({
+                    'response': response.get_json(),
+                    'profile': {'spans_ms': g.pop('timing_spans'), 'stats': _profile_summary(profiler)}
+                }), response.status_code
+                response = app.make_response(response)
+        start = g.pop('timing_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+        return response
@@ -0,0 +1,255 @@
+"""Retrain the crop stress model from a CSV file or from stored reports
+
+Unlike CropStressModel.train, which loads the whole CSV into pandas, this
+streams the training set in chunks with explicit dtypes and keeps only
+compact NumPy columns (float32 features, int8 labels): about 25 bytes per
+row. Crop and stage labels are encoded on the fly.
+
+    python train_model.py --csv training_data_expanded.csv --out model.pkl
+    python train_model.py --db --estimator hist --threads 8 --out model.pkl
+
+--db trains on Report rows that have their weather recorded, labelled
+with their stored stress_level. --estimator hist fits a
+HistGradientBoostingClassifier, which bins the features and uses every
+core; it is much faster on large sets but can't be saved as a pickle-free
+artifact or use MODEL_INFERENCE=compiled. Wall time and peak memory are
+printed per phase. The model is written to a temporary file and renamed,
+so a server with MODEL_RELOAD_INTERVAL set picks it up on its next check.
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+from models import GRADIENT_BOOSTING_PARAMS, CropStressModel
+
+FEATURE_COLUMNS = ['temperature', 'humidity', 'rainfall', 'wind_speed']
+LABEL_COLUMN = 'stress_level'
+TRAINING_DTYPES = {
+    'temperature': 'float32',
+    'humidity': 'float32',
+    'rainfall': 'float32',
+    'wind_speed': 'float32',
+    'crop_type': 'category',
+    'growth_stage': 'category',
+    'stress_level': 'Int8'
+}
+TRAIN_CHUNK_ROWS = int(os.getenv('TRAIN_CHUNK_ROWS', '200000'))
+
+HIST_GRADIENT_BOOSTING_PARAMS = {
+    'max_iter': 300,
+    'learning_rate': 0.1,
+    'max_leaf_nodes': 31,
+    'early_stopping': 'auto',
+    'random_state': 42
+}
+
+
+def _reset_peak_rss():
+    # Linux only: writing 5 to clear_refs resets the VmHWM high-water mark
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class PhaseLog:
+    """Wall time and peak RSS of each training phase"""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start, _peak_rss_mb()))
+
+    def report(self):
+        print(f"{'phase':<10} {'seconds':>9} {'peak RSS MB':>12}")
+        for name, seconds, peak in self.phases:
+            print(f"{name:<10} {seconds:>9.2f} {peak if peak is not None else float('nan'):>12.0f}")
+
+
+def iter_csv_chunks(path, chunk_rows=TRAIN_CHUNK_ROWS):
+    """DataFrames of up to chunk_rows training rows from a CSV file"""
+    yield from pd.read_csv(path, usecols=list(TRAINING_DTYPES), dtype=TRAINING_DTYPES, chunksize=chunk_rows)
+
+
+def iter_db_chunks(chunk_rows=TRAIN_CHUNK_ROWS):
+    """DataFrames of training rows from reports with recorded weather, in id order"""
+    from sqlalchemy import select
+
+    from app import app
+    from models_db import db, Report
+
+    columns = [getattr(Report, name) for name in TRAINING_DTYPES]
+    last_id = 0
+    with app.app_context():
+        while True:
+            rows = db.session.execute(
+                select(Report.id, *columns)
+                .where(Report.id > last_id, Report.temperature.isnot(None), Report.stress_level.isnot(None))
+                .order_by(Report.id)
+                .limit(chunk_rows)
+            ).all()
+            db.session.rollback()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield pd.DataFrame([row[1:] for row in rows], columns=list(TRAINING_DTYPES)).astype(TRAINING_DTYPES)
+
+
+class _LabelCodes:
+    """Codes for string labels in first-seen order, remapped to sorted order at the end"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([self.codes.setdefault(label, len(self.codes)) for label in uniques], dtype=np.float32)
+        return lookup[codes]
+
+    def sorted_classes(self):
+        """(classes in LabelEncoder order, array mapping first-seen codes to sorted ones)"""
+        classes = np.array(sorted(self.codes), dtype=object)
+        remap = np.empty(len(self.codes), dtype=np.float32)
+        for rank, label in enumerate(classes):
+            remap[self.codes[label]] = rank
+        return classes, remap
+
+
+def collect(chunks):
+    """Stack chunks into (X float32 (n, 6), y int8, crop classes, stage classes)"""
+    crops, stages = _LabelCodes(), _LabelCodes()
+    features, labels = [], []
+    for chunk in chunks:
+        chunk = chunk.dropna()
+        if chunk.empty:
+            continue
+        block = np.empty((len(chunk), 6), dtype=np.float32)
+        block[:, :4] = chunk[FEATURE_COLUMNS].to_numpy(np.float32)
+        block[:, 4] = crops.encode(chunk['crop_type'].astype(str))
+        block[:, 5] = stages.encode(chunk['growth_stage'].astype(str))
+        features.append(block)
+        labels.append(chunk[LABEL_COLUMN].to_numpy(np.int8))
+    if not features:
+        raise ValueError("No training rows")
+
+    X = np.concatenate(features)
+    del features
+    y = np.concatenate(labels)
+    crop_classes, crop_remap = crops.sorted_classes()
+    stage_classes, stage_remap = stages.sorted_classes()
+    X[:, 4] = crop_remap[X[:, 4].astype(np.intp)]
+    X[:, 5] = stage_remap[X[:, 5].astype(np.intp)]
+    return X, y, crop_classes, stage_classes
+
+
+def make_estimator(name):
+    if name == 'hist':
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(**HIST_GRADIENT_BOOSTING_PARAMS)
+    from sklearn.ensemble import GradientBoostingClassifier
+    return GradientBoostingClassifier(**GRADIENT_BOOSTING_PARAMS)
+
+
+def train(chunks, estimator='gb', test_size=0.2, threads=None, log=None):
+    """Fit a CropStressModel on streamed chunks; returns (model, holdout accuracy)"""
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from threadpoolctl import threadpool_limits
+
+    log = log or PhaseLog()
+    with log.phase('load'):
+        X, y, crop_classes, stage_classes = collect(chunks)
+
+    with log.phase('prepare'):
+        scaler = StandardScaler(copy=False)
+        X = scaler.fit_transform(X)
+        holdout = np.random.default_rng(42).random(len(y)) < test_size
+        X_test, y_test = X[holdout], y[holdout]
+        X, y = X[~holdout], y[~holdout]
+
+    with log.phase('fit'), threadpool_limits(limits=threads):
+        classifier = make_estimator(estimator)
+        classifier.fit(X, y)
+
+    with log.phase('evaluate'):
+        accuracy = classifier.score(X_test, y_test) if len(y_test) else float('nan')
+
+    model = CropStressModel(autoload=False)
+    model.model = classifier
+    model.crop_encoder, model.stage_encoder = LabelEncoder(), LabelEncoder()
+    model.crop_encoder.classes_ = crop_classes
+    model.stage_encoder.classes_ = stage_classes
+    model.scaler = scaler
+    model._extract_preprocessing_arrays()
+    print(f"Trained {estimator} on {len(y):,} rows ({len(crop_classes)} crops, {len(stage_classes)} stages); "
+          f"holdout accuracy {accuracy:.2%} on {len(y_test):,} rows")
+    return model, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help="training CSV with the TRAINING_DTYPES columns")
+    source.add_argument('--db', action='store_true', help="train on stored reports (DATABASE_URL)")
+    parser.add_argument('--out', default=os.getenv('MODEL_PATH', 'model.pkl'), help="model.pkl (default: MODEL_PATH)")
+    parser.add_argument('--artifact', action='store_true', help="write --out as a pickle-free artifact directory")
+    parser.add_argument('--estimator', default='gb', choices=['gb', 'hist'])
+    parser.add_argument('--chunk-rows', type=int, default=TRAIN_CHUNK_ROWS)
+    parser.add_argument('--threads', type=int, default=None, help="threads for fitting (default: all cores)")
+    parser.add_argument('--test-size', type=float, default=0.2, help="share of rows held out for accuracy")
+    args = parser.parse_args()
+    if args.artifact and args.estimator != 'gb':
+        parser.error("--artifact needs --estimator gb")
+    if args.db:
+        # Training doesn't serve predictions, so don't load the current model
+        os.environ.setdefault('MODEL_EAGER_LOAD', '0')
+
+    chunks = iter_db_chunks(args.chunk_rows) if args.db else iter_csv_chunks(args.csv, args.chunk_rows)
+    log = PhaseLog()
+    try:
+        model, _ = train(chunks, args.estimator, args.test_size, args.threads, log)
+    except ValueError as e:
+        sys.exit(str(e))
+    with log.phase('save'):
+        if args.artifact:
+            model.save_artifact(args.out)
+        else:
+            model.save_model(args.out)
+    log.report()
+    print(f"Wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,28 @@
-import requests
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 import json
+import math
+import re
 import subprocess
 
+import http_client
+from cache import make_cache
+from report_log import REPORT_LOG_PATH, ReportLog
+
 load_dotenv()
 
 OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
-OPENWEATHER_BASE_URL = 'https://api.openweathermap.org/data/2.5/weather'
+OPENWEATHER_BASE_URL = os.getenv('OPENWEATHER_URL', 'https://api.openweathermap.org/data/2.5/weather')
+# 5 day / 3 hour forecast, used by the field forecast scoring job
+OPENWEATHER_FORECAST_URL = os.getenv('OPENWEATHER_FORECAST_URL', 'https://api.openweathermap.org/data/2.5/forecast')
+
+# Weather cache: lookups within the same lat/lon grid cell share one API call
+WEATHER_CACHE_BACKEND = os.getenv('WEATHER_CACHE_BACKEND', 'memory')  # 'memory', 'sqlite' or 'off'
+WEATHER_CACHE_PATH = os.getenv('WEATHER_CACHE_PATH', 'weather_cache.db')
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', '600'))  # seconds
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', '4096'))
+WEATHER_CELL_DEG = float(os.getenv('WEATHER_CELL_DEG', '0.05'))
 
 # LLM Configuration (choose one)
 LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')  # 'openai', 'huggingface', or 'ollama'
@@ -19,7 +33,109 @@ OLLAMA_BASE_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434/api/generate')
 # Database
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///reports.db')
 
+# File mode (offline kiosks): one ReportLog per path
+_report_logs = {}
+
+# Symptom classes reported by analyze_observations
+SYMPTOM_TYPES = ('wilting', 'yellowing', 'spotting', 'pests', 'disease', 'dry', 'stunting')
+
+# Stress indicators
+STRESS_KEYWORDS = {
+    'wilting': ['wilting', 'drooping', 'droopy', 'slump'],
+    'yellowing': ['yellow', 'yellowing', 'pale', 'chlorotic'],
+    'spotting': ['spot', 'spots', 'lesion', 'necrotic', 'blight'],
+    'pests': ['insect', 'pest', 'bug', 'mite', 'aphid', 'caterpillar', 'webbing'],
+    'disease': ['disease', 'mold', 'fungal', 'powder', 'rust', 'blight', 'scab'],
+    'dry': ['drying', 'dry', 'crispy', 'brown edges', 'burnt'],
+    'stunting': ['stunted', 'slow growth', 'weak', 'small'],
+}
+
+# Keyword -> symptom classes it indicates ('blight' counts as spotting and disease)
+KEYWORD_SYMPTOMS = {}
+for _symptom, _keywords in STRESS_KEYWORDS.items():
+    for _keyword in _keywords:
+        KEYWORD_SYMPTOMS.setdefault(_keyword, []).append(_symptom)
+
+# Built once: one regex over every keyword, matched on whole words plus a plural
+# (s/es) or inflection (-ed/-ing/-ish/-y/-ness, doubling a final consonant as in
+# "spotted"), so "small" no longer fires on "smaller" nor "spot" on "spotless".
+# A negation directly before a keyword, or separated from it only by filler words
+# ("no yellowing", "no sign of pests", "without any rust"), swallows it, together
+# with keywords chained to it by or/nor/slashes or adjacent to it ("no yellowing or
+# wilting", "no yellow spots"), into the 'negated' group, which is ignored. Any
+# other word ends the negation: "no rain so wilting" still reports wilting.
+_KEYWORD_ALTERNATION = '|'.join(
+    r'\s+'.join(re.escape(word) for word in keyword.split())
+    for keyword in sorted(KEYWORD_SYMPTOMS, key=len, reverse=True)
+)
+_SUFFIX = r"(?:s|es|ness|[bdgklmnprt]?(?:ed|ing|ish|y))?\b"
+_KEYWORD = r"(?:" + _KEYWORD_ALTERNATION + r")" + _SUFFIX
+NEGATIONS = [
+    'no', 'not', 'without', 'never', 'zero', 'free of', 'free from', 'absence of',
+    "isn't", "aren't", "wasn't", "weren't", "don't", "doesn't", "didn't", "haven't", "hasn't", "can't",
+]
+NEGATION_FILLERS = [
+    'any', 'visible', 'obvious', 'more', 'further',
+    'sign of', 'signs of', 'trace of', 'traces of', 'evidence of',
+]
+OBSERVATION_RE = re.compile(
+    # Cheap first-character check before trying the alternations at each position
+    r"(?=[" + ''.join(sorted({phrase[0] for phrase in list(KEYWORD_SYMPTOMS) + NEGATIONS})) + r"])\b(?:"
+    r"(?:" + '|'.join(r'\s+'.join(re.escape(word) for word in phrase.split()) for phrase in NEGATIONS) + r")"
+    r"\s+(?:(?:" + '|'.join(r'\s+'.join(word for word in phrase.split()) for phrase in NEGATION_FILLERS) + r")\s+){0,2}"
+    r"(?P<negated>" + _KEYWORD + r"(?:(?:\s*,?\s+(?:or|nor)\s+|\s*/\s*|\s+)" + _KEYWORD + r")*)"
+    r"|(?P<keyword>" + _KEYWORD_ALTERNATION + r")" + _SUFFIX + r")"
+)
+
+weather_cache = None
+if WEATHER_CACHE_BACKEND != 'off':
+    weather_cache = make_cache(
+        WEATHER_CACHE_BACKEND,
+        table='weather_cache',
+        max_size=WEATHER_CACHE_SIZE,
+        ttl=WEATHER_CACHE_TTL,
+        path=WEATHER_CACHE_PATH
+    )
+
+def grid_cell(lat, lon, cell_deg=WEATHER_CELL_DEG):
+    """Integer (row, col) of the lat/lon grid cell containing a point"""
+    return math.floor(lat / cell_deg), math.floor(lon / cell_deg)
+
+def grid_cell_center(cell, cell_deg=WEATHER_CELL_DEG):
+    """(lat, lon) of the centre of a grid_cell cell"""
+    row, col = cell
+    return (row + 0.5) * cell_deg, (col + 0.5) * cell_deg
+
 def get_weather_data(lat, lon):
+    """Fetch weather data for a location, cached per grid cell"""
+    cache_key = None
+    if weather_cache is not None:
+        row, col = grid_cell(lat, lon)
+        cache_key = f"{WEATHER_CELL_DEG}:{row}:{col}"
+        cached = weather_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+    
+    weather = fetch_weather_data(lat, lon)
+    # Only real observations are cached; the offline fallback is retried next time
+    if cache_key is not None and weather['location'] != 'Offline Mode':
+        weather_cache.set(cache_key, weather)
+    return weather
+
+def recorded_weather(weather):
+    """Weather columns to store with a report; None for the offline fallback values"""
+    live = weather.get('location') != 'Offline Mode'
+    return {name: weather[name] if live else None for name in ('temperature', 'humidity', 'rainfall', 'wind_speed')}
+
+def get_weather_cache_stats():
+    """Hit/miss counters of the weather cache, or None when disabled"""
+    if weather_cache is None:
+        return None
+    stats = weather_cache.stats()
+    stats['cell_deg'] = WEATHER_CELL_DEG
+    return stats
+
+def fetch_weather_data(lat, lon):
     """Fetch weather data from OpenWeatherMap API"""
     try:
         params = {
@@ -28,7 +144,7 @@ def get_weather_data(lat, lon):
             'appid': OPENWEATHER_API_KEY,
             'units': 'metric'
         }
-        response = requests.get(OPENWEATHER_BASE_URL, params=params, timeout=5)
+        response = http_client.request('openweather', 'GET', OPENWEATHER_BASE_URL, params=params, timeout=5)
         response.raise_for_status()
         data = response.json()
         
@@ -56,6 +172,34 @@ def get_weather_data(lat, lon):
             'timestamp': datetime.now().isoformat()
         }
 
+def fetch_forecast(lat, lon):
+    """Forecast steps for a location from OpenWeatherMap, oldest first
+
+    Each step is a dict of forecast_at (naive UTC datetime), temperature,
+    humidity, rainfall and wind_speed. rainfall is the step's 3-hour total
+    spread over its hours, so it is in mm per hour like the rain.1h of
+    fetch_weather_data that every other prediction uses. Unlike
+    fetch_weather_data there is no offline fallback: errors are raised.
+    """
+    params = {
+        'lat': lat,
+        'lon': lon,
+        'appid': OPENWEATHER_API_KEY,
+        'units': 'metric'
+    }
+    response = http_client.request('openweather_forecast', 'GET', OPENWEATHER_FORECAST_URL, params=params, timeout=10)
+    response.raise_for_status()
+    return [
+        {
+            'forecast_at': datetime.utcfromtimestamp(step['dt']),
+            'temperature': step['main']['temp'],
+            'humidity': step['main']['humidity'],
+            'rainfall': step.get('rain', {}).get('3h', 0) / 3,
+            'wind_speed': step['wind']['speed']
+        }
+        for step in response.json()['list']
+    ]
+
 def get_ollama_analysis(crop_type, stress_level, temperature, humidity, rainfall, wind_speed, notes):
     """Get detailed crop analysis from Ollama Mistral with deep observation analysis"""
     try:
@@ -91,7 +235,9 @@ INSTRUCTIONS:
 Keep advice practical, specific to {crop_type}, and actionable for a farmer.
 IMPORTANT: Address each observed issue individually with concrete solutions."""
         
-        response = requests.post(
+        response = http_client.request(
+            'ollama',
+            'POST',
             OLLAMA_BASE_URL,
             json={
                 'model': 'mistral',
@@ -114,25 +260,23 @@ def analyze_observations(notes):
     if not notes:
         return []
     
-    notes_lower = notes.lower()
-    indicators = []
+    found = set()
+    for negated, keyword in OBSERVATION_RE.findall(notes.lower()):
+        if keyword:
+            # Multi-word keywords may have matched with extra whitespace
+            found.update(KEYWORD_SYMPTOMS.get(keyword) or KEYWORD_SYMPTOMS[' '.join(keyword.split())])
     
-    # Stress indicators
-    stress_keywords = {
-        'wilting': ['wilting', 'drooping', 'droopy', 'slump'],
-        'yellowing': ['yellow', 'yellowing', 'pale', 'chlorotic'],
-        'spotting': ['spot', 'spots', 'lesion', 'necrotic', 'blight'],
-        'pests': ['insect', 'pest', 'bug', 'mite', 'aphid', 'caterpillar', 'webbing'],
-        'disease': ['disease', 'mold', 'fungal', 'powder', 'rust', 'blight', 'scab'],
-        'dry': ['drying', 'dry', 'crispy', 'brown edges', 'burnt'],
-        'stunting': ['stunted', 'slow growth', 'weak', 'small'],
-    }
-    
-    for condition, keywords in stress_keywords.items():
-        if any(kw in notes_lower for kw in keywords):
-            indicators.append(condition)
-    
-    return list(set(indicators))  # Remove duplicates
+    return [symptom for symptom in SYMPTOM_TYPES if symptom in found]
+
+def analyze_observations_batch(notes_list):
+    """analyze_observations over a list of notes; repeated notes are matched once"""
+    seen = {}
+    results = []
+    for notes in notes_list:
+        if notes not in seen:
+            seen[notes] = analyze_observations(notes)
+        results.append(list(seen[notes]))
+    return results
 
 def estimate_soil_moisture(rainfall, humidity, temperature):
     """Estimate soil moisture based on weather conditions"""
@@ -163,44 +307,82 @@ def validate_report_data(data):
         lon = float(data['longitude'])
         if not (-90 <= lat <= 90 and -180 <= lon <= 180):
             errors.append("Invalid latitude/longitude coordinates")
-    except ValueError:
+    except (TypeError, ValueError):
         errors.append("Latitude and longitude must be numeric")
     
     return len(errors) == 0, errors
 
-def save_report_to_file(report_data, reports_file='reports.json'):
-    """Save report to JSON file"""
+def parse_batch_payload(body, content_type=''):
+    """Parse a batch request body into a list of record dicts
+
+    Accepts NDJSON (one JSON object per line), a JSON array of objects,
+    an object wrapping such an array under 'items', or an object of
+    equal-length columns.
+    """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    body = body.strip()
+    if not body:
+        return []
+
+    if 'ndjson' in (content_type or '') or 'jsonlines' in (content_type or ''):
+        records = []
+        for line_no, line in enumerate(body.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Invalid JSON on line {line_no}")
+        return records
+
+    data = json.loads(body)
+    if isinstance(data, dict) and 'items' in data:
+        data = data['items']
+    if isinstance(data, dict):
+        # Columnar form: {"temperature": [...], "humidity": [...], ...}
+        columns = list(data.values())
+        if not columns or not all(isinstance(v, list) for v in columns) or len({len(v) for v in columns}) != 1:
+            raise ValueError("Columnar payload must contain lists of equal length")
+        n = len(columns[0])
+        return [{k: v[i] for k, v in data.items()} for i in range(n)]
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array, an object of columns or NDJSON")
+    return data
+
+def format_sse(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _report_log(reports_file):
+    if reports_file not in _report_logs:
+        _report_logs[reports_file] = ReportLog(reports_file)
+    return _report_logs[reports_file]
+
+def save_report_to_file(report_data, reports_file=REPORT_LOG_PATH):
+    """Append a report to the NDJSON report log; returns (ok, stored report or error)"""
     try:
-        # Load existing reports
-        if os.path.exists(reports_file):
-            with open(reports_file, 'r') as f:
-                reports = json.load(f)
-        else:
-            reports = []
-        
-        # Add new report
-        report_data['id'] = len(reports) + 1
-        report_data['timestamp'] = datetime.now().isoformat()
-        reports.append(report_data)
-        
-        # Save back
-        with open(reports_file, 'w') as f:
-            json.dump(reports, f, indent=2)
-        
+        report = _report_log(reports_file).append(report_data)
+        report_data.update(id=report['id'], timestamp=report['timestamp'])
         return True, report_data
     except Exception as e:
         return False, str(e)
 
-def load_all_reports(reports_file='reports.json'):
-    """Load all reports from file"""
+def load_report(report_id, reports_file=REPORT_LOG_PATH):
+    """One report from the log by id (via the offset index), or None"""
     try:
-        if os.path.exists(reports_file):
-            with open(reports_file, 'r') as f:
-                return json.load(f)
-        return []
+        return _report_log(reports_file).get(report_id)
+    except Exception as e:
+        print(f"Error loading report {report_id}: {str(e)}")
+        return None
+
+def load_all_reports(reports_file=REPORT_LOG_PATH):
+    """Iterate over all reports in the log, oldest first, without loading the file"""
+    try:
+        yield from _report_log(reports_file).iter_reports()
     except Exception as e:
         print(f"Error loading reports: {str(e)}")
-        return []
 
 def get_crop_types():
     """Get list of supported crops - includes farm and home garden crops"""
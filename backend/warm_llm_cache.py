@@ -0,0 +1,110 @@
+"""Pre-fill the LLM answer cache with the most common report combinations
+
+Reads recent reports from the database, groups them by the same canonical
+key submit_report uses (crop, stage, stress, symptoms and the weather band
+currently observed at the report's location) and asks the configured LLM
+provider for the top combinations that are not cached yet. Run it offline,
+e.g. from cron before the morning peak:
+
+    python warm_llm_cache.py --top 200 --days 30
+
+Reports without recognised symptoms are skipped: their prompt was the raw
+observation text, which is not stored.
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# The warm-up never predicts, so don't pay for loading the model
+os.environ.setdefault('MODEL_EAGER_LOAD', '0')
+
+from app import app
+from cache import MemoryCache
+from models_db import Report
+from llm_service import generate_analysis, llm_cache, llm_cache_key
+from utils import SYMPTOM_TYPES, get_weather_data
+
+
+def common_combinations(days, provider):
+    """(count, symptom_text, crop_data) for each canonical key, most common first"""
+    counts = Counter()
+    examples = {}
+    since = datetime.utcnow() - timedelta(days=days)
+    query = (
+        Report.query
+        .with_entities(Report.crop_type, Report.growth_stage, Report.stress_level,
+                       Report.observations, Report.latitude, Report.longitude)
+        .filter(Report.created_at >= since)
+        .yield_per(1000)
+    )
+    for crop_type, growth_stage, stress_level, observations, lat, lon in query:
+        symptoms = sorted(set(s for s in (observations or []) if s in SYMPTOM_TYPES))
+        if not symptoms or lat is None or lon is None:
+            continue
+        weather = get_weather_data(lat, lon)  # cached per grid cell
+        crop_data = {
+            'crop_type': crop_type,
+            'growth_stage': growth_stage,
+            'temperature': weather['temperature'],
+            'humidity': weather['humidity'],
+            'rainfall': weather['rainfall'],
+            'wind_speed': weather['wind_speed'],
+            'stress_level': stress_level
+        }
+        symptom_text = ', '.join(symptoms)
+        key = llm_cache_key(provider, symptom_text, crop_data)
+        counts[key] += 1
+        examples.setdefault(key, (symptom_text, crop_data))
+    return [(count, *examples[key]) for key, count in counts.most_common()]
+
+
+def warm(top, days, provider):
+    """Generate and cache answers for the top combinations; returns a summary dict"""
+    summary = {'candidates': 0, 'cached': 0, 'generated': 0, 'failed': 0}
+    with app.app_context():
+        combinations = common_combinations(days, provider)[:top]
+    summary['candidates'] = len(combinations)
+
+    for count, symptom_text, crop_data in combinations:
+        if llm_cache.get(llm_cache_key(provider, symptom_text, crop_data)) is not None:
+            summary['cached'] += 1
+            continue
+        start = time.perf_counter()
+        try:
+            analysis = generate_analysis(symptom_text, crop_data, provider=provider)
+        except Exception as e:
+            print(f"  failed for {crop_data['crop_type']}/{crop_data['growth_stage']} ({symptom_text}): {str(e)}")
+            summary['failed'] += 1
+            continue
+        if not analysis:
+            summary['failed'] += 1
+            continue
+        summary['generated'] += 1
+        print(f"  {count:5d}x {crop_data['crop_type']}/{crop_data['growth_stage']} "
+              f"stress={crop_data['stress_level']} [{symptom_text}] "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=200, help="number of combinations to warm")
+    parser.add_argument('--days', type=int, default=30, help="look at reports from the last N days")
+    parser.add_argument('--provider', default=os.getenv('LLM_PROVIDER', 'openai'), choices=['openai', 'ollama'])
+    args = parser.parse_args()
+
+    if llm_cache is None:
+        parser.error("LLM cache is disabled (LLM_CACHE_BACKEND=off)")
+    if isinstance(llm_cache, MemoryCache):
+        print("Warning: LLM_CACHE_BACKEND=memory does not outlive this process; use sqlite to share the warm-up")
+
+    summary = warm(args.top, args.days, args.provider)
+    print(f"Warm-up done: {summary['candidates']} combinations, {summary['cached']} already cached, "
+          f"{summary['generated']} generated, {summary['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
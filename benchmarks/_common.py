@@ -0,0 +1,93 @@
+"""Shared helpers for the benchmark scripts
+
+Benchmarks import the backend modules directly, so they work from a
+checkout without a running server. When no trained model.pkl is present
+a model is trained on synthetic data in a temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+# The scaler is fitted on a DataFrame and warns on every NumPy call
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+CROPS = ['tomato', 'lettuce', 'cucumber', 'basil', 'mint', 'pepper', 'carrot',
+         'wheat', 'maize', 'rice', 'cotton', 'sugarcane', 'pulses']
+STAGES = ['vegetative', 'flowering', 'fruiting', 'grain_fill', 'mature', 'pod_fill', 'boll_formation']
+
+
+def synthetic_samples(n, seed=0):
+    """Random but plausible model inputs as a dict of columns"""
+    rng = np.random.default_rng(seed)
+    return {
+        'temperature': rng.uniform(10, 42, n).round(1),
+        'humidity': rng.uniform(20, 95, n).round(0),
+        'rainfall': rng.exponential(4, n).round(1),
+        'wind_speed': rng.uniform(0, 12, n).round(1),
+        'crop_type': rng.choice(CROPS, n),
+        'growth_stage': rng.choice(STAGES, n),
+    }
+
+
+def write_training_csv(path, n=3000, seed=42):
+    """Write a synthetic training set in the layout CropStressModel.train expects"""
+    import pandas as pd
+
+    cols = synthetic_samples(n, seed)
+    df = pd.DataFrame(cols)
+    heat = (df['temperature'] - 25).clip(lower=0) / 10 + (60 - df['humidity']).clip(lower=0) / 40
+    dry = (3 - df['rainfall']).clip(lower=0) / 3 + df['wind_speed'] / 20
+    score = heat + dry + np.random.default_rng(seed).normal(0, 0.3, n)
+    df['stress_level'] = np.digitize(score, [0.8, 1.6])
+    df.to_csv(path, index=False)
+    return path
+
+
+def model_artifact(model_path=None):
+    """Path of a trained model.pkl, training a synthetic one if needed"""
+    from models import CropStressModel
+
+    model_path = model_path or os.path.join(BACKEND_DIR, 'model.pkl')
+    if os.path.exists(model_path):
+        return os.path.abspath(model_path)
+
+    # CropStressModel() trains from training_data_expanded.csv when model.pkl is missing
+    workdir = tempfile.mkdtemp(prefix='b2g-bench-')
+    write_training_csv(os.path.join(workdir, 'training_data_expanded.csv'))
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        CropStressModel()
+    finally:
+        os.chdir(cwd)
+    return os.path.join(workdir, 'model.pkl')
+
+
+def load_model(model_path=None):
+    """Return a fitted CropStressModel, training a synthetic one if needed"""
+    from models import CropStressModel
+
+    cwd = os.getcwd()
+    try:
+        os.chdir(os.path.dirname(model_artifact(model_path)))
+        return CropStressModel()
+    finally:
+        os.chdir(cwd)
+
+
+def time_call(fn, repeat=5):
+    """Best wall time in seconds over several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
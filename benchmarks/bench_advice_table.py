@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Golden check and microbenchmark of the precomputed observation advice table
+
+Compares generate_observation_based_advice byte for byte (as serialized
+JSON) with the original implementation over every crop, stress level and
+symptom set, plus unusual inputs (unknown crops and symptoms, duplicates,
+odd order), then times both.
+
+Usage: python benchmarks/bench_advice_table.py [--calls 50000]
+"""
+
+import argparse
+import itertools
+import json
+import random
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from _common import STAGES, time_call
+from models import CROP_CARE, SYMPTOM_BITS, generate_observation_based_advice, get_crop_care, get_stress_label
+
+SYMPTOMS = list(SYMPTOM_BITS)
+CROPS = list(CROP_CARE) + ['Tomato', 'MAIZE', 'okra', 'unknown {crop}']
+
+
+def legacy_generate_observation_based_advice(crop_type, stress_level, observed_symptoms, temperature, humidity, growth_stage):
+    """generate_observation_based_advice as it was before the precomputed table (golden reference)"""
+    
+    # Symptom-specific remedies - universal treatments
+    symptom_remedies = {
+        'wilting': {
+            'cause': 'Inadequate soil moisture or root stress',
+            'immediate': '1. Water deeply (5-8cm) immediately to reach root zone. 2. Apply mulch (5cm) to reduce evaporation.',
+            'treatment': '3. Check soil moisture daily. 4. Prune affected leaves to reduce water demand.',
+            'urgent': stress_level == 2
+        },
+        'yellowing': {
+            'cause': 'Nitrogen deficiency, waterlogging, or nutrient lockout',
+            'immediate': '1. Apply nitrogen-rich fertilizer (urea or compost tea). 2. Check drainage - ensure no waterlogging.',
+            'treatment': '3. Apply foliar spray (Neem oil or compost extract). 4. Improve soil aeration by reducing compaction.',
+            'urgent': stress_level == 2
+        },
+        'spotting': {
+            'cause': 'Fungal or bacterial disease',
+            'immediate': '1. Remove and destroy affected leaves immediately. 2. Improve air circulation by pruning dense foliage.',
+            'treatment': '3. Apply sulfur or copper fungicide every 7 days. 4. Avoid overhead watering - water at soil level only.',
+            'urgent': stress_level == 2
+        },
+        'pests': {
+            'cause': 'Insect infestation',
+            'immediate': '1. Inspect both leaf surfaces for pest presence. 2. Spray with organic insecticide (neem oil, soap spray).',
+            'treatment': '3. Apply spinosad or pyrethrin if organic fails. 4. Release beneficial insects (ladybugs, parasitic wasps).',
+            'urgent': stress_level == 2
+        },
+        'disease': {
+            'cause': 'Fungal, bacterial, or viral infection',
+            'immediate': '1. Isolate affected plant if possible. 2. Remove all diseased parts (sanitize tools between cuts).',
+            'treatment': '3. Apply appropriate fungicide or bactericide. 4. Improve sanitation - clean leaves with 70% alcohol.',
+            'urgent': stress_level == 2
+        },
+        'dry': {
+            'cause': 'Severe dehydration or high transpiration',
+            'immediate': '1. Water deeply immediately (8-10cm). 2. Provide shade cloth (30-50%) to reduce heat stress.',
+            'treatment': '3. Mist leaves early morning to reduce heat. 4. Add organic matter to soil to improve water retention.',
+            'urgent': stress_level == 2
+        },
+        'stunting': {
+            'cause': 'Nutrient deficiency, disease, or environmental stress',
+            'immediate': '1. Apply balanced fertilizer (NPK 10-10-10). 2. Ensure proper lighting (6+ hours direct sun).',
+            'treatment': '3. Check for root diseases (musty smell = root rot). 4. Optimize temperature for growth stage.',
+            'urgent': stress_level == 2
+        }
+    }
+    
+    # Crop-specific adjustment factors
+    crop_specific_factors = {
+        'tomato': {'watering': 'drip irrigation', 'sensitivity': 'high to disease'},
+        'lettuce': {'watering': 'frequent, light', 'sensitivity': 'bolts if hot'},
+        'cucumber': {'watering': 'consistent moisture', 'sensitivity': 'powdery mildew'},
+        'basil': {'watering': 'let topsoil dry', 'sensitivity': 'spider mites'},
+        'mint': {'watering': 'moist not wet', 'sensitivity': 'root rot'},
+        'pepper': {'watering': 'consistent', 'sensitivity': 'blossom drop'},
+        'carrot': {'watering': 'moderate', 'sensitivity': 'root splitting'},
+    }
+    
+    # Build personalized response
+    advice_dict = {
+        'observed_symptoms': observed_symptoms,
+        'symptom_analysis': [],
+        'combined_assessment': '',
+        'action_priority': []
+    }
+    
+    if not observed_symptoms:
+        # No specific symptoms - use ML prediction only
+        advice_dict['combined_assessment'] = f"Your {crop_type} shows {get_stress_label(stress_level).lower()} based on current conditions (Temp: {temperature}°C, Humidity: {humidity}%). {get_crop_care(stress_level, crop_type)}"
+        return advice_dict
+    
+    # Process each observed symptom
+    for symptom in observed_symptoms:
+        remedy = symptom_remedies.get(symptom, {})
+        if remedy:
+            advice_dict['symptom_analysis'].append({
+                'symptom': symptom,
+                'cause': remedy.get('cause', 'Unknown cause'),
+                'immediate_actions': remedy.get('immediate', ''),
+                'follow_up': remedy.get('treatment', ''),
+                'is_urgent': remedy.get('urgent', False)
+            })
+            if remedy.get('urgent'):
+                advice_dict['action_priority'].append(symptom)
+    
+    # Combined assessment
+    urgency_text = "URGENT ACTION NEEDED!" if stress_level == 2 and observed_symptoms else "Monitoring recommended" if stress_level == 1 else "Preventive care suggested"
+    
+    crop_factor = crop_specific_factors.get(crop_type.lower(), {})
+    watering_method = crop_factor.get('watering', 'regular watering')
+    
+    advice_dict['combined_assessment'] = f"{urgency_text} - Your {crop_type} ({growth_stage}) has {len(observed_symptoms)} observed issue(s). Current conditions (Temp: {temperature}°C, Humidity: {humidity}%) combined with reported symptoms suggest {get_stress_label(stress_level).lower()}. Recommended approach: Use {watering_method} and closely monitor over next 48 hours."
+    
+    return advice_dict
+
+
+def golden_inputs():
+    """Every crop x stress level x symptom subset, plus odd inputs the table must fall back on"""
+    rng = random.Random(0)
+    for crop, level in itertools.product(CROPS, (0, 1, 2)):
+        for r in range(len(SYMPTOMS) + 1):
+            for symptoms in itertools.combinations(SYMPTOMS, r):
+                yield crop, level, list(symptoms), round(rng.uniform(5, 45), 1), rng.randint(10, 100), rng.choice(STAGES)
+    odd_symptom_lists = [
+        None, ['yellowing', 'wilting'], ['pests', 'pests'], ['wilting', 'mystery'], ['mystery'],
+        ['stunting', 'dry', 'disease', 'pests', 'spotting', 'yellowing', 'wilting'],
+    ]
+    for crop, level, symptoms in itertools.product(CROPS, (0, 1, 2, 3, -1), odd_symptom_lists):
+        yield crop, level, symptoms, 28, 65.5, '{stage}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=50000)
+    args = parser.parse_args()
+
+    checked = 0
+    for inputs in golden_inputs():
+        expected = json.dumps(legacy_generate_observation_based_advice(*inputs), ensure_ascii=False)
+        actual = json.dumps(generate_observation_based_advice(*inputs), ensure_ascii=False)
+        assert actual == expected, f"output differs for {inputs}:\n{actual}\n{expected}"
+        checked += 1
+    print(f"golden check:  {checked} inputs byte-identical to the original implementation")
+
+    rng = random.Random(1)
+    workload = []
+    for _ in range(args.calls):
+        symptoms = [s for s in SYMPTOMS if rng.random() < 0.25]
+        workload.append((rng.choice(CROPS), rng.randint(0, 2), symptoms, 28.4, 61, rng.choice(STAGES)))
+
+    legacy_time = time_call(lambda: [legacy_generate_observation_based_advice(*w) for w in workload], repeat=3)
+    table_time = time_call(lambda: [generate_observation_based_advice(*w) for w in workload], repeat=3)
+    print(f"original:      {legacy_time / args.calls * 1e6:8.2f} us/call")
+    print(f"advice table:  {table_time / args.calls * 1e6:8.2f} us/call  ({legacy_time / table_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Reports/sec through POST /api/reports/bulk vs one POST /api/reports per report
+
+Simulates a phone syncing its offline queue: --reports reports scattered
+around a few villages are submitted both ways against a stub weather server
+with a simulated network delay (LLM provider off, weather cache on but
+cleared before each run). The stored reports must be the same both ways.
+
+Usage: python benchmarks/bench_bulk_ingest.py [--reports 500] [--latency 0.02]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from _common import CROPS, STAGES, load_model
+from stubs import WeatherStub
+
+VILLAGES = [(28.7041, 77.1025), (12.9716, 77.5946), (19.0760, 72.8777), (22.5726, 88.3639)]
+NOTES = ["", "leaves turning yellow", "aphids under leaves, some wilting", "no pests seen", "soil very dry"]
+COMPARED = ('crop_type', 'growth_stage', 'stress_level', 'confidence', 'observations', 'symptom_analysis',
+            'recommendations', 'combined_assessment', 'action_priority', 'latitude', 'longitude')
+
+
+def synthetic_reports(n, seed=0):
+    rng = np.random.default_rng(seed)
+    reports = []
+    for i in range(n):
+        lat, lon = VILLAGES[rng.integers(0, len(VILLAGES))]
+        reports.append({
+            'latitude': round(lat + rng.normal(0, 0.05), 5),
+            'longitude': round(lon + rng.normal(0, 0.05), 5),
+            'crop_type': CROPS[rng.integers(0, len(CROPS))],
+            'growth_stage': STAGES[rng.integers(0, len(STAGES))],
+            'notes': NOTES[rng.integers(0, len(NOTES))],
+            'location': f"Village {i % 40}"
+        })
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help="stub weather server delay in seconds")
+    parser.add_argument('--model', default=None, help="path to model.pkl (default: backend/model.pkl or synthetic)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-bulk-')
+    with WeatherStub(latency=args.latency) as weather:
+        os.environ.update({
+            'OPENWEATHER_URL': weather.url,
+            'WEATHER_CACHE_BACKEND': 'memory',
+            'LLM_PROVIDER': 'none',
+            'MODEL_EAGER_LOAD': '0',
+            'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'reports.db'),
+            'JOBS_DB_PATH': os.path.join(workdir, 'jobs.db')
+        })
+        import model_registry
+        model_registry._model = load_model(args.model)
+        import utils
+        from app import app
+        from models_db import db, Report
+
+        client = app.test_client()
+        reports = synthetic_reports(args.reports)
+
+        utils.weather_cache.clear()
+        calls = weather.requests
+        start = time.perf_counter()
+        response = client.post('/api/reports/bulk', json=reports)
+        bulk_time = time.perf_counter() - start
+        bulk_calls = weather.requests - calls
+        assert response.status_code == 201, response.get_json()
+        bulk_ids = [r['id'] for r in response.get_json()['results']]
+
+        utils.weather_cache.clear()
+        calls = weather.requests
+        start = time.perf_counter()
+        single_ids = []
+        for report in reports:
+            response = client.post('/api/reports', json=report)
+            assert response.status_code == 201, response.get_json()
+            single_ids.append(response.get_json()['id'])
+        single_time = time.perf_counter() - start
+        single_calls = weather.requests - calls
+
+        # A malformed row is reported as invalid; the rest of the request still goes through
+        response = client.post('/api/reports/bulk', json=[dict(reports[0], latitude=[1]), reports[0]])
+        assert response.status_code == 207, response.get_json()
+        assert [r['status'] for r in response.get_json()['results']] == ['invalid', 'created']
+
+        with app.app_context():
+            for bulk_id, single_id in zip(bulk_ids, single_ids):
+                bulk, single = db.session.get(Report, bulk_id).to_dict(), db.session.get(Report, single_id).to_dict()
+                assert all(bulk[k] == single[k] for k in COMPARED), f"report {bulk_id} differs from {single_id}"
+
+    print(f"reports: {args.reports}  (stub weather latency {args.latency * 1000:.0f} ms)")
+    print(f"one POST per report  {args.reports / single_time:9.1f} reports/sec  {single_time:7.2f} s  "
+          f"weather calls: {single_calls}")
+    print(f"bulk POST            {args.reports / bulk_time:9.1f} reports/sec  {bulk_time:7.2f} s  "
+          f"weather calls: {bulk_calls}")
+    print(f"speedup: {single_time / bulk_time:.1f}x; stored reports identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Parity and latency of the compiled tree evaluator against sklearn
+
+Fails with a non-zero exit code if the compiled probabilities drift from
+GradientBoostingClassifier.predict_proba by more than --tolerance.
+
+Usage: python benchmarks/bench_compiled_model.py [--rows 10000] [--model backend/model.pkl]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from _common import load_model, synthetic_samples, time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    model.compiled = None
+    compiled = model.compile()
+
+    cols = synthetic_samples(args.rows, seed=7)
+    features = model._build_feature_matrix(**cols)
+    scaled = model.scaler.transform(features)
+
+    # Parity: probabilities and predicted classes
+    expected = model.model.predict_proba(scaled)
+    actual = compiled.predict_proba(scaled)
+    max_error = float(np.abs(expected - actual).max())
+    class_mismatches = int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+    print(f"parity over {args.rows} rows: max |dp| = {max_error:.3e}, class mismatches = {class_mismatches}")
+    if max_error > args.tolerance or class_mismatches:
+        print("FAIL: compiled model does not match sklearn")
+        sys.exit(1)
+
+    # Single-row latency through CropStressModel.predict
+    row = [cols[k][0] for k in cols]
+    n_calls = 300
+    model.compiled = None
+    sklearn_single = time_call(lambda: [model.predict(*row) for _ in range(n_calls)]) / n_calls
+    model.compiled = compiled
+    compiled_single = time_call(lambda: [model.predict(*row) for _ in range(n_calls)]) / n_calls
+
+    print(f"{'rows':>8}  {'sklearn':>12}  {'compiled':>12}  speedup")
+    print(f"{'1 (predict)':>8}  {sklearn_single * 1e3:9.3f} ms  {compiled_single * 1e3:9.3f} ms"
+          f"  {sklearn_single / compiled_single:6.1f}x")
+
+    # Batched latency on the raw estimators
+    for size in sorted({1, 32, 128, 1024, args.rows}):
+        batch = scaled[:size]
+        sklearn_batch = time_call(lambda: model.model.predict_proba(batch))
+        compiled_batch = time_call(lambda: compiled.predict_proba(batch))
+        print(f"{len(batch):>8}  {sklearn_batch * 1e3:9.3f} ms  {compiled_batch * 1e3:9.3f} ms"
+              f"  {sklearn_batch / compiled_batch:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Forecast scoring job for registered fields, offline against the weather stub
+
+Registers fields spread over a few hundred weather grid cells through
+POST /api/fields. It then runs the scoring job in two invocations: the
+first stops after --first-chunks chunks and the second resumes the
+unfinished run. Checks that:
+- each invocation fetched every cell it touched exactly once;
+- every field x forecast step was stored exactly once;
+- stored predictions equal predict_batch on the stub's forecast, with
+  its 3-hour rainfall totals stored per hour.
+A second full run must replace the rows rather than add to them.
+
+Usage: python benchmarks/bench_forecast_scoring.py [--fields 5000] [--cells 300] [--chunk-fields 500]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import CROPS, STAGES, model_artifact
+from stubs import WeatherStub
+
+
+def field_records(n, cells, cell_deg, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.integers([200, 1400], [600, 1800], (cells, 2))
+    picks = rng.integers(0, cells, n)
+    offsets = rng.uniform(0.1, 0.9, (n, 2))
+    return [{
+        'name': f"field-{i}",
+        'latitude': round(float((centers[c, 0] + offsets[i, 0]) * cell_deg), 6),
+        'longitude': round(float((centers[c, 1] + offsets[i, 1]) * cell_deg), 6),
+        'crop_type': str(rng.choice(CROPS)),
+        'growth_stage': str(rng.choice(STAGES))
+    } for i, c in enumerate(picks)]
+
+
+def cells_of(fields):
+    from utils import grid_cell
+
+    return {grid_cell(f.latitude, f.longitude) for f in fields}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fields', type=int, default=5000)
+    parser.add_argument('--cells', type=int, default=300)
+    parser.add_argument('--chunk-fields', type=int, default=500)
+    parser.add_argument('--first-chunks', type=int, default=3, help="chunks before the simulated interruption")
+    parser.add_argument('--steps', type=int, default=40, help="forecast steps per cell")
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-forecast-')
+    weather = WeatherStub(forecast_steps=args.steps).start()
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'reports.db'),
+        'MODEL_PATH': model_artifact(args.model),
+        'OPENWEATHER_FORECAST_URL': weather.url + '/data/2.5/forecast',
+        'OPENWEATHER_API_KEY': 'stub'
+    })
+    from app import app
+    from field_forecasts import run_forecast_job
+    from model_registry import get_model
+    from models_db import FieldForecast, RegisteredField, db
+    from utils import WEATHER_CELL_DEG, fetch_forecast, grid_cell, grid_cell_center
+
+    client = app.test_client()
+    records = field_records(args.fields, args.cells, WEATHER_CELL_DEG)
+    for start in range(0, len(records), 1000):
+        response = client.post('/api/fields', json=records[start:start + 1000])
+        assert response.status_code == 201, response.get_json()
+
+    quiet = lambda message: None
+    with app.app_context():
+        # Plain rows: the test client's requests end the session these would be bound to
+        fields = db.session.query(RegisteredField.id, RegisteredField.latitude, RegisteredField.longitude,
+                                  RegisteredField.crop_type, RegisteredField.growth_stage
+                                  ).order_by(RegisteredField.id).all()
+        first = fields[:args.first_chunks * args.chunk_fields]
+        rest = fields[len(first):]
+
+        start = time.perf_counter()
+        run = run_forecast_job(chunk_fields=args.chunk_fields, max_chunks=args.first_chunks, log=quiet)
+        assert run.status == 'running' and run.fields_done == len(first), "first invocation did not stop resumable"
+        assert weather.requests == len(cells_of(first)), "first invocation fetched a cell more than once"
+        calls = weather.requests
+        run = run_forecast_job(chunk_fields=args.chunk_fields, log=quiet)
+        elapsed = time.perf_counter() - start
+        assert run.status == 'done' and run.fields_done == len(fields) and run.fields_failed == 0
+        assert weather.requests - calls == len(cells_of(rest)), "resumed invocation fetched a cell more than once"
+        rows = db.session.query(FieldForecast).count()
+        assert rows == run.rows_written == len(fields) * args.steps, f"{rows} rows stored"
+        summary = run.to_dict()
+
+        # Stored rows match predict_batch on the forecast for the field's cell
+        sample = fields[::max(1, len(fields) // 50)]
+        for field in sample:
+            steps = fetch_forecast(*grid_cell_center(grid_cell(field.latitude, field.longitude)))
+            levels, confidences = get_model().predict_batch(
+                [s['temperature'] for s in steps], [s['humidity'] for s in steps], [s['rainfall'] for s in steps],
+                [s['wind_speed'] for s in steps], [field.crop_type] * len(steps), [field.growth_stage] * len(steps))
+            stored = client.get(f'/api/fields/{field.id}/forecast').get_json()['forecast']
+            # Rainfall is stored per hour, like the current weather the model sees elsewhere
+            raw = weather.forecast(*grid_cell_center(grid_cell(field.latitude, field.longitude)))
+            assert np.allclose([row['rainfall'] for row in stored], [step['rain']['3h'] / 3 for step in raw])
+            assert [row['stress_level'] for row in stored] == levels.tolist(), f"field {field.id} differs"
+            assert np.allclose([row['confidence'] for row in stored], np.round(confidences, 2))
+
+        rerun_start = time.perf_counter()
+        rerun = run_forecast_job(chunk_fields=args.chunk_fields, log=quiet)
+        rerun_s = time.perf_counter() - rerun_start
+        assert rerun.id != run.id and db.session.query(FieldForecast).count() == rows, "rerun duplicated rows"
+
+    status = client.get('/api/forecast/status').get_json()['run']
+    assert status['status'] == 'done' and status['progress'] == 1.0
+    weather.stop()
+
+    cells = len(cells_of(fields))
+    print(f"{len(fields):,} fields in {cells} weather cells, {args.steps} forecast steps, "
+          f"chunks of {args.chunk_fields}")
+    print(f"interrupted after {args.first_chunks} chunks and resumed: {elapsed:.2f} s, "
+          f"{summary['cells_fetched']} forecast calls (one per field would be {len(fields):,}), "
+          f"{rows:,} rows, {rows / elapsed:,.0f} rows/s")
+    print(f"full rerun: {rerun_s:.2f} s, {rerun.cells_fetched} forecast calls, rows replaced ({rows:,} stored)")
+
+
+if __name__ == '__main__':
+    main()
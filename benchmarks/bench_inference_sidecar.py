@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""/api/predict throughput and memory under gunicorn: per-worker models vs the inference sidecar
+
+Starts gunicorn (gunicorn.conf.py) with 1, 4 and 16 workers, once with
+each worker predicting in process and once with INFERENCE_SOCKET set so
+all predictions go through one micro-batching sidecar. Each setup gets the
+same concurrent /api/predict load (see bench_load). Memory is the summed
+PSS of the master, workers and sidecar: shared pages are split between
+the processes that map them, so copy-on-write sharing is not counted twice.
+Both setups must return the same predictions.
+
+Usage: python benchmarks/bench_inference_sidecar.py [--workers 1,4,16] [--concurrency 32] [--requests 2000]
+"""
+
+import argparse
+import os
+import tempfile
+
+from _common import model_artifact
+from bench_load import Workload, backend_env, gunicorn_clients, run_level, start_gunicorn, summarize
+from stubs import OllamaStub, WeatherStub
+
+
+def process_tree(root):
+    """pid and all descendant pids, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def total_pss_mb(root):
+    total = 0
+    for pid in process_tree(root):
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def probe(base_url, workload, n=50):
+    """Responses of the first n predict requests, for the parity check"""
+    import requests
+
+    session = requests.Session()
+    results = []
+    for i in range(n):
+        _, path, body = workload.request('predict', i)
+        reply = session.post(base_url + path, json=body, timeout=30).json()
+        results.append((reply['stress_level'], reply['confidence']))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,4,16', help="comma-separated gunicorn worker counts")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-sidecar-')
+    model_path = model_artifact(args.model)
+    workload = Workload()
+    rows, answers = [], {}
+    with WeatherStub() as weather, OllamaStub() as llm:
+        for workers in [int(w) for w in args.workers.split(',')]:
+            for mode in ('in-process', 'sidecar'):
+                name = f"{mode}-{workers}"
+                env = backend_env(workdir, model_path, weather, llm, name)
+                if mode == 'sidecar':
+                    env['INFERENCE_SOCKET'] = os.path.join(workdir, f'{name}.sock')
+                proc, base_url = start_gunicorn(env, workers, os.path.join(workdir, f'{name}.log'))
+                try:
+                    make_client = gunicorn_clients(base_url)
+                    answers.setdefault(mode, probe(base_url, workload))
+                    run_level(make_client, workload, 'predict', args.concurrency, 200)  # warm up
+                    result = summarize(mode, 'predict', args.concurrency,
+                                       *run_level(make_client, workload, 'predict', args.concurrency, args.requests))
+                    rows.append((workers, mode, result, total_pss_mb(proc.pid)))
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+
+    assert answers['in-process'] == answers['sidecar'], "sidecar predictions differ from in-process ones"
+    print(f"/api/predict, {args.concurrency} concurrent clients, {args.requests} requests, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'mode':<11} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} {'PSS MB':>8}")
+    for workers, mode, result, pss in rows:
+        print(f"{workers:>7} {mode:<11} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['errors']:>6} {pss:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Time to first token of the streaming analysis endpoint vs the blocking LLM call
+
+Runs against a local stub Ollama server that emits one NDJSON token every
+--token-delay seconds. Checks that the relayed tokens add up to the stub's
+reply and that the final text was saved to Report.ai_analysis.
+
+Usage: python benchmarks/bench_llm_stream.py [--token-delay 0.02] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from stubs import OllamaStub, WeatherStub
+
+REPLY = ("Likely nitrogen deficiency aggravated by heat. Irrigate early in the morning, "
+         "apply a split dose of urea, mulch the rows and scout for aphids every two days.")
+
+
+def parse_events(raw):
+    """(event, data) pairs from a text/event-stream body"""
+    events = []
+    for block in raw.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--token-delay', type=float, default=0.02, help="stub delay between tokens in seconds")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-stream-')
+    with OllamaStub(reply=REPLY, token_delay=args.token_delay) as ollama, WeatherStub() as weather:
+        os.environ.update({
+            'OLLAMA_URL': ollama.url + '/api/generate',
+            'OPENWEATHER_URL': weather.url,
+            'LLM_PROVIDER': 'ollama',
+            'LLM_CACHE_BACKEND': 'off',
+            'MODEL_EAGER_LOAD': '0',
+            'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'reports.db'),
+            'JOBS_DB_PATH': os.path.join(workdir, 'jobs.db')
+        })
+        from app import app
+        from models_db import db, Report
+        from llm_service import generate_analysis, stream_analysis
+
+        with app.app_context():
+            report = Report(crop_type='maize', growth_stage='flowering', stress_level=1,
+                            observations=['yellowing', 'pests'], latitude=12.97, longitude=77.59)
+            db.session.add(report)
+            db.session.commit()
+            report_id = report.id
+        crop_data = {'crop_type': 'maize', 'growth_stage': 'flowering'}
+
+        blocking, first_token, streamed = [], [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            assert generate_analysis('yellowing, pests', crop_data, use_cache=False) == REPLY
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            chunks = stream_analysis('yellowing, pests', crop_data, use_cache=False)
+            next(chunks)
+            first_token.append(time.perf_counter() - start)
+            for _ in chunks:
+                pass
+            streamed.append(time.perf_counter() - start)
+
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(f'/api/reports/{report_id}/analysis/stream?refresh=1', buffered=False)
+        body, endpoint_first = '', None
+        for piece in response.response:
+            body += piece.decode('utf-8')
+            if endpoint_first is None and 'event: token' in body:
+                endpoint_first = time.perf_counter() - start
+        endpoint_total = time.perf_counter() - start
+        response.close()
+
+        events = parse_events(body)
+        tokens = ''.join(data['text'] for event, data in events if event == 'token')
+        assert tokens == REPLY, "relayed tokens do not match the stub reply"
+        assert events[-1][0] == 'analysis' and events[-1][1]['ai_analysis'] == REPLY
+        with app.app_context():
+            assert db.session.get(Report, report_id).ai_analysis == REPLY, "analysis not persisted"
+
+        # Replaying the stored analysis builds no prompt, so fetches no weather
+        calls = weather.requests
+        replay = parse_events(client.get(f'/api/reports/{report_id}/analysis/stream').get_data(as_text=True))
+        assert replay == [('analysis', events[-1][1])] and weather.requests == calls, "replay fetched weather"
+        # A refresh uses the weather recorded on the report when it has it
+        with app.app_context():
+            report = db.session.get(Report, report_id)
+            report.temperature, report.humidity, report.rainfall, report.wind_speed = 31.5, 40.0, 0.0, 3.0
+            db.session.commit()
+        client.get(f'/api/reports/{report_id}/analysis/stream?refresh=1').get_data()
+        assert weather.requests == calls, "refresh fetched weather despite the recorded weather"
+
+    ms = lambda values: min(values) * 1000
+    print(f"blocking call          {ms(blocking):8.1f} ms until any text")
+    print(f"stream_analysis        {ms(first_token):8.1f} ms to first token, {ms(streamed):8.1f} ms total")
+    print(f"SSE endpoint           {endpoint_first * 1000:8.1f} ms to first token, {endpoint_total * 1000:8.1f} ms total "
+          f"({sum(1 for e, _ in events if e == 'token')} token events)")
+    print("parity OK: streamed text matches the reply and was saved to the report")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Latency percentiles and throughput of the HTTP API under concurrent load
+
+Drives /api/predict, /api/reports (POST and GET) and /api/weather at each
+concurrency level, either in-process through Flask's test client or over a
+real socket against gunicorn started with the repo's gunicorn.conf.py.
+OpenWeatherMap and Ollama are replaced by local stubs with a simulated
+delay, and every run gets a fresh database seeded through
+/api/reports/bulk, so results only depend on the code and the machine.
+
+Results are printed and written to a JSON file. Pass an earlier file with
+--compare to see the change per endpoint; with --max-regression the script
+exits non-zero when any p95 got worse by more than that many percent.
+
+Usage: python benchmarks/bench_load.py [--mode inprocess|gunicorn|both] [--concurrency 1,4,16]
+           [--requests 200] [--out results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import _common
+from _common import BACKEND_DIR, synthetic_samples
+from stubs import OllamaStub, WeatherStub
+
+REPO_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..'))
+
+# The five field reports of the old test_system.py smoke test
+FIELD_CASES = [
+    {'crop_type': 'rice', 'growth_stage': 'flowering', 'notes': 'Yellow leaves, reduced growth',
+     'latitude': 28.7041, 'longitude': 77.1025},
+    {'crop_type': 'tomato', 'growth_stage': 'fruiting', 'notes': 'Wilting leaves, dry soil, browning edges',
+     'latitude': 12.9716, 'longitude': 77.5946},
+    {'crop_type': 'wheat', 'growth_stage': 'grain_fill', 'notes': 'Normal growth, no visible symptoms',
+     'latitude': 31.5204, 'longitude': 74.3587},
+    {'crop_type': 'cotton', 'growth_stage': 'boll_formation', 'notes': 'Leaf spots, insect damage, pest infestation',
+     'latitude': 19.0760, 'longitude': 72.8777},
+    {'crop_type': 'sugarcane', 'growth_stage': 'vegetative', 'notes': 'Rust spots, leaf disease, yellowing',
+     'latitude': 22.5726, 'longitude': 88.3639},
+]
+
+ENDPOINTS = ['predict', 'reports_post', 'reports_get', 'weather']
+
+
+class Workload:
+    """Deterministic request i for each endpoint, as (method, path, json body)"""
+
+    def __init__(self, seed=0, spread=0.2):
+        rng = np.random.default_rng(seed)
+        self.samples = synthetic_samples(1000, seed)
+        # Points scattered around the field cases: a mix of weather cache hits and misses
+        self.offsets = rng.normal(0, spread, (1000, 2)).round(4)
+
+    def point(self, i):
+        case = FIELD_CASES[i % len(FIELD_CASES)]
+        dlat, dlon = self.offsets[i % len(self.offsets)]
+        return case, round(case['latitude'] + dlat, 4), round(case['longitude'] + dlon, 4)
+
+    def report(self, i):
+        case, lat, lon = self.point(i)
+        return dict(case, latitude=lat, longitude=lon)
+
+    def request(self, endpoint, i):
+        if endpoint == 'predict':
+            j = i % len(self.samples['crop_type'])
+            return 'POST', '/api/predict', {name: values[j].item() for name, values in self.samples.items()}
+        if endpoint == 'reports_post':
+            return 'POST', '/api/reports', self.report(i)
+        if endpoint == 'reports_get':
+            return 'GET', '/api/reports?per_page=50', None
+        _, lat, lon = self.point(i)
+        return 'GET', f'/api/weather?lat={lat}&lon={lon}', None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def backend_env(workdir, model_path, weather, llm, mode):
+    """Environment pointing the backend at the stubs and at files under workdir"""
+    path = lambda name: os.path.join(workdir, f"{mode}-{name}")
+    return {
+        'DATABASE_URL': 'sqlite:///' + path('reports.db'),
+        'MODEL_PATH': model_path,
+        'OPENWEATHER_URL': weather.url + '/data/2.5/weather',
+        'OPENWEATHER_FORECAST_URL': weather.url + '/data/2.5/forecast',
+        'OPENWEATHER_API_KEY': 'stub',
+        'WEATHER_CACHE_PATH': path('weather_cache.db'),
+        'LLM_PROVIDER': 'ollama',
+        'OLLAMA_URL': llm.url + '/api/generate',
+        'LLM_CACHE_PATH': path('llm_cache.db'),
+        'JOBS_DB_PATH': path('jobs.db'),
+        'REPORT_LOG_PATH': path('reports.ndjson'),
+    }
+
+
+def inprocess_clients(env):
+    """Factory of per-thread clients calling the app through Flask's test client"""
+    os.environ.update(env)
+    from app import app
+
+    def make_client():
+        client = app.test_client()
+
+        def call(method, path, body):
+            return client.open(path, method=method, json=body).status_code
+        return call
+    return make_client
+
+
+def gunicorn_clients(base_url):
+    """Factory of per-thread clients calling gunicorn over a keep-alive session"""
+    import requests
+
+    def make_client():
+        session = requests.Session()
+
+        def call(method, path, body):
+            return session.request(method, base_url + path, json=body, timeout=60).status_code
+        return call
+    return make_client
+
+
+def start_gunicorn(env, workers, log_path):
+    port = free_port()
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_DIR, 'gunicorn.conf.py'),
+           '-b', f'127.0.0.1:{port}', '--chdir', BACKEND_DIR, 'app:app']
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen(cmd, cwd=REPO_DIR, env=dict(os.environ, WEB_CONCURRENCY=str(workers), **env),
+                                stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+
+    import requests
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if requests.get(base_url + '/api/health', timeout=1).ok:
+                return proc, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    with open(log_path) as f:
+        sys.exit(f"gunicorn did not come up; last log lines:\n{''.join(f.readlines()[-20:])}")
+
+
+def seed_reports(make_client, workload, count):
+    """Fill the reports table through the bulk endpoint so GET pages are realistic"""
+    call = make_client()
+    for start in range(0, count, 500):
+        batch = [workload.report(i) for i in range(start, min(count, start + 500))]
+        status = call('POST', '/api/reports/bulk', batch)
+        assert status in (201, 207), f"seeding failed with HTTP {status}"
+
+
+def run_level(make_client, workload, endpoint, concurrency, total):
+    """Send `total` requests from `concurrency` threads; returns latencies (s), errors, wall time"""
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    clients = [make_client() for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(k):
+        call = clients[k]
+        barrier.wait()
+        for i in range(k, total, concurrency):
+            method, path, body = workload.request(endpoint, i)
+            start = time.perf_counter()
+            try:
+                status = call(method, path, body)
+            except Exception:
+                status = None
+            latencies[k].append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                errors[k] += 1
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return np.concatenate([np.asarray(l) for l in latencies]), sum(errors), time.perf_counter() - start
+
+
+def summarize(mode, endpoint, concurrency, latencies, errors, elapsed):
+    ms = latencies * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'mode': mode, 'endpoint': endpoint, 'concurrency': concurrency, 'requests': len(ms), 'errors': errors,
+        'rps': round(len(ms) / elapsed, 1), 'mean_ms': round(float(ms.mean()), 2),
+        'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2), 'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+
+
+def bench(mode, make_client, workload, args):
+    seed_reports(make_client, workload, args.seed_reports)
+    results = []
+    for endpoint in args.endpoints:
+        # Warm caches, connections and lazy imports outside the measurement
+        run_level(make_client, workload, endpoint, 1, args.warmup)
+        for concurrency in args.concurrency:
+            result = summarize(mode, endpoint, concurrency,
+                               *run_level(make_client, workload, endpoint, concurrency, args.requests))
+            print(f"{mode:<10} {endpoint:<13} c={concurrency:<3} {result['rps']:>8.1f} rps  "
+                  f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms"
+                  f"  errors {result['errors']}")
+            results.append(result)
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print the change against a previous run; returns False if a p95 regressed too far"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r['mode'], r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    print(f"\nvs {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    ok, matched = True, 0
+    for r in results:
+        old = before.get((r['mode'], r['endpoint'], r['concurrency']))
+        if old is None:
+            continue
+        matched += 1
+        p95_change = (r['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0.0
+        rps_change = (r['rps'] / old['rps'] - 1) * 100 if old['rps'] else 0.0
+        flag = ''
+        if max_regression is not None and p95_change > max_regression:
+            flag, ok = '  REGRESSION', False
+        print(f"{r['mode']:<10} {r['endpoint']:<13} c={r['concurrency']:<3} "
+              f"p95 {p95_change:>+7.1f}%  rps {rps_change:>+7.1f}%{flag}")
+    if not matched:
+        print("no mode/endpoint/concurrency in common")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', default='inprocess', choices=['inprocess', 'gunicorn', 'both'])
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint and level")
+    parser.add_argument('--warmup', type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="subset of " + ','.join(ENDPOINTS))
+    parser.add_argument('--seed-reports', type=int, default=2000, help="reports in the table before the run")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--latency', type=float, default=0.02, help="weather stub delay in seconds")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Ollama stub delay in seconds")
+    parser.add_argument('--model', default=None, help="model.pkl to serve (default: backend/ or synthetic)")
+    parser.add_argument('--out', default=None, help="results JSON (default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument('--compare', default=None, help="earlier results JSON to compare against")
+    parser.add_argument('--max-regression', type=float, default=None, help="fail if a p95 grows by more than this %%")
+    args = parser.parse_args()
+    try:
+        args.concurrency = [int(c) for c in args.concurrency.split(',')]
+        args.endpoints = [e.strip() for e in args.endpoints.split(',')]
+    except ValueError:
+        parser.error("--concurrency takes comma-separated integers")
+    if not set(args.endpoints) <= set(ENDPOINTS) or min(args.concurrency) < 1:
+        parser.error(f"--endpoints must be a subset of {','.join(ENDPOINTS)}, --concurrency levels >= 1")
+
+    workdir = tempfile.mkdtemp(prefix='b2g-load-')
+    model_path = _common.model_artifact(args.model)
+    workload = Workload()
+    results = []
+    with WeatherStub(latency=args.latency) as weather, OllamaStub(latency=args.llm_latency) as llm:
+        if args.mode in ('inprocess', 'both'):
+            env = backend_env(workdir, model_path, weather, llm, 'inprocess')
+            results += bench('inprocess', inprocess_clients(env), workload, args)
+        if args.mode in ('gunicorn', 'both'):
+            env = backend_env(workdir, model_path, weather, llm, 'gunicorn')
+            proc, base_url = start_gunicorn(env, args.workers, os.path.join(workdir, 'gunicorn.log'))
+            try:
+                results += bench('gunicorn', gunicorn_clients(base_url), workload, args)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+        upstream = {'weather': weather.requests, 'llm': llm.requests}
+
+    commit, dirty = git_revision()
+    meta = {
+        'commit': commit, 'dirty': dirty, 'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'upstream_requests': upstream,
+        'args': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'max_regression')},
+    }
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                   f"load-{commit or 'nogit'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Open time and prediction parity of the mmap artifact against model.pkl
+
+Converts the pickle into a temporary artifact, then times a cold open of
+each format and checks both produce the same predictions.
+
+Usage: python benchmarks/bench_model_artifact.py [--model backend/model.pkl]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from _common import BACKEND_DIR, load_model, synthetic_samples
+
+OPEN_SNIPPET = """
+import sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+from models import CropStressModel
+imported = time.perf_counter()
+model = CropStressModel(autoload=False)
+model.load_model({path!r})
+done = time.perf_counter()
+print(f"{{(imported - start) * 1000:.1f}} {{(done - imported) * 1000:.1f}} {{'sklearn' in sys.modules}}")
+"""
+
+
+def cold_open(path):
+    """Import + load time in a fresh interpreter, as a worker would see it"""
+    code = OPEN_SNIPPET.format(backend=os.path.abspath(BACKEND_DIR), path=path)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    import_ms, load_ms, sklearn_loaded = out.stdout.split()[-3:]
+    return float(import_ms), float(load_ms), sklearn_loaded == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    pickle_path = os.path.join(tempfile.mkdtemp(prefix='b2g-artifact-'), 'model.pkl')
+    model.save_model(pickle_path)
+    artifact_path = os.path.join(os.path.dirname(pickle_path), 'model_artifact')
+    model.save_artifact(artifact_path)
+
+    from models import CropStressModel
+    mapped = CropStressModel(autoload=False)
+    mapped.load_artifact(artifact_path)
+
+    cols = synthetic_samples(args.rows, seed=3)
+    model.compiled = None
+    expected_levels, expected_conf = model.predict_batch(**cols)
+    levels, conf = mapped.predict_batch(**cols)
+    max_error = float(np.abs(expected_conf - conf).max())
+    print(f"parity over {args.rows} rows: class mismatches = {int((expected_levels != levels).sum())}, "
+          f"max |d confidence| = {max_error:.3e}")
+    if (expected_levels != levels).any() or max_error > 1e-9:
+        print("FAIL: artifact predictions differ from the pickle")
+        sys.exit(1)
+
+    size = sum(os.path.getsize(os.path.join(artifact_path, f)) for f in os.listdir(artifact_path))
+    print(f"pickle size:   {os.path.getsize(pickle_path) / 1024:8.1f} KiB")
+    print(f"artifact size: {size / 1024:8.1f} KiB")
+    for label, path in (('model.pkl', pickle_path), ('artifact', artifact_path)):
+        import_ms, load_ms, sklearn_loaded = cold_open(path)
+        print(f"{label:>10}: import {import_ms:7.1f} ms, open {load_ms:7.1f} ms, sklearn imported: {sklearn_loaded}")
+
+
+if __name__ == '__main__':
+    main()
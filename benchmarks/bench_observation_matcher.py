@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Notes/sec of the compiled observation matcher against the old substring scan
+
+Generates SMS-style field notes mixing symptom keywords, negations ("no
+yellowing") and look-alike words ("spotless", "smaller"), then times the
+old per-keyword `kw in notes` scan, analyze_observations and
+analyze_observations_batch. The matching semantics are checked first.
+
+Usage: python benchmarks/bench_observation_matcher.py [--notes 20000] [--unique 2000]
+"""
+
+import argparse
+import random
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from _common import time_call
+from utils import analyze_observations, analyze_observations_batch
+
+PHRASES = [
+    "leaves turning yellow", "some wilting after noon", "aphids under leaves", "brown edges on older leaves",
+    "spots on lower leaves", "white powder on leaves", "plants look stunted", "slow growth this week",
+    "soil very dry", "webbing between stems", "rust on stalks", "leaves crispy", "pale new growth",
+]
+NEUTRAL = [
+    "crop looks fine", "watered yesterday", "field near canal", "spotless leaves", "fruit smaller than last year",
+    "sprayed neem oil", "farmer called at 9am", "rain expected", "new drip line installed",
+]
+NEGATED = ["no yellowing", "no sign of pests", "not wilting", "no spots or mold", "without any rust"]
+
+CASES = {
+    "yellow leaves and wilting": ['wilting', 'yellowing'],
+    "spotless leaves, smaller than usual": [],
+    "no yellowing or wilting, but aphids everywhere": ['pests'],
+    "no sign of pests, leaves drooping": ['wilting'],
+    "no pests, wilting": ['wilting'],
+    "no yellow spots": [],
+    "brown edges and slow growth": ['dry', 'stunting'],
+    "blight on stems": ['spotting', 'disease'],
+    "no rain so wilting": ['wilting'],
+    "zero rain leaves dry": ['dry'],
+    "Leaves yellowed and spotted": ['yellowing', 'spotting'],
+    "yellowish leaves": ['yellowing'],
+    "no visible signs of blight": [],
+}
+
+
+def legacy_analyze_observations(notes):
+    """The substring scan analyze_observations used before the compiled matcher"""
+    if not notes:
+        return []
+    notes_lower = notes.lower()
+    indicators = []
+    stress_keywords = {
+        'wilting': ['wilting', 'drooping', 'droopy', 'slump'],
+        'yellowing': ['yellow', 'yellowing', 'pale', 'chlorotic'],
+        'spotting': ['spot', 'spots', 'lesion', 'necrotic', 'blight'],
+        'pests': ['insect', 'pest', 'bug', 'mite', 'aphid', 'caterpillar', 'webbing'],
+        'disease': ['disease', 'mold', 'fungal', 'powder', 'rust', 'blight', 'scab'],
+        'dry': ['drying', 'dry', 'crispy', 'brown edges', 'burnt'],
+        'stunting': ['stunted', 'slow growth', 'weak', 'small'],
+    }
+    for condition, keywords in stress_keywords.items():
+        if any(kw in notes_lower for kw in keywords):
+            indicators.append(condition)
+    return list(set(indicators))
+
+
+def synthetic_notes(n, unique, seed=0):
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(unique):
+        parts = rng.sample(PHRASES, rng.randint(0, 3)) + rng.sample(NEUTRAL, rng.randint(1, 3))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(NEGATED))
+        rng.shuffle(parts)
+        pool.append(', '.join(parts).capitalize() + '.')
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--unique', type=int, default=2000, help="distinct notes in the workload")
+    args = parser.parse_args()
+
+    for notes, expected in CASES.items():
+        assert analyze_observations(notes) == expected, f"{notes!r}: {analyze_observations(notes)} != {expected}"
+
+    notes = synthetic_notes(args.notes, args.unique)
+    single = [analyze_observations(n) for n in notes]
+    assert analyze_observations_batch(notes) == single, "batch and single-note results differ"
+    changed = sum(sorted(legacy_analyze_observations(n)) != sorted(r) for n, r in zip(notes, single))
+
+    legacy_time = time_call(lambda: [legacy_analyze_observations(n) for n in notes], repeat=3)
+    single_time = time_call(lambda: [analyze_observations(n) for n in notes], repeat=3)
+    batch_time = time_call(lambda: analyze_observations_batch(notes), repeat=3)
+
+    print(f"notes:            {args.notes} ({args.unique} distinct)")
+    print(f"legacy scan:      {args.notes / legacy_time:12,.0f} notes/sec")
+    print(f"compiled matcher: {args.notes / single_time:12,.0f} notes/sec")
+    print(f"batch API:        {args.notes / batch_time:12,.0f} notes/sec")
+    print(f"results differing from the legacy scan: {changed / args.notes:.1%} "
+          f"(negations and look-alike words)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Rows/sec of CropStressModel.predict_batch against the per-row predict path
+
+Usage: python benchmarks/bench_predict_batch.py [--rows 5000] [--model backend/model.pkl]
+"""
+
+import argparse
+
+import numpy as np
+
+from _common import load_model, synthetic_samples, time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    cols = synthetic_samples(args.rows)
+    rows = list(zip(*cols.values()))
+
+    def per_row():
+        return [model.predict(*row) for row in rows]
+
+    def batched():
+        return model.predict_batch(**cols)
+
+    # Both paths must agree before we compare their speed
+    expected = per_row()
+    levels, confidences = batched()
+    assert [lvl for lvl, _ in expected] == levels.tolist(), "class mismatch between paths"
+    assert np.allclose([c for _, c in expected], confidences), "confidence mismatch between paths"
+
+    row_time = time_call(per_row, repeat=1)
+    batch_time = time_call(batched)
+
+    print(f"rows:          {args.rows}")
+    print(f"per-row path:  {args.rows / row_time:12,.0f} rows/sec  ({row_time * 1000:.1f} ms)")
+    print(f"batched path:  {args.rows / batch_time:12,.0f} rows/sec  ({batch_time * 1000:.1f} ms)")
+    print(f"speedup:       {row_time / batch_time:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Single-row predict latency with and without the quantized prediction cache
+
+Replays repeat traffic: a few hundred districts, each with its own
+weather and a handful of crops, with the weather jittered the way
+successive API readings are. Every cached answer must equal a direct
+predict on the rounded inputs, and a new model version must start cold.
+Also reports how often rounding changes the predicted class compared to
+the exact inputs.
+
+Usage: python benchmarks/bench_prediction_cache.py [--requests 20000] [--districts 300]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _common import CROPS, STAGES, load_model
+from cache import MemoryCache
+from prediction_cache import PREDICT_CACHE_PRECISION, PredictionMemo, parse_precision, quantize
+
+
+def traffic(n, districts, seed=0):
+    rng = np.random.default_rng(seed)
+    weather = np.column_stack([
+        rng.uniform(15, 40, districts), rng.uniform(30, 90, districts),
+        rng.exponential(3, districts), rng.uniform(0, 10, districts)
+    ])
+    crops = rng.choice(CROPS, (districts, 3))
+    stages = rng.choice(STAGES, (districts, 3))
+    # A few districts send most of the reports
+    picks = np.minimum(rng.zipf(1.3, n) - 1, districts - 1)
+    jitter = rng.normal(0, [0.15, 0.5, 0.02, 0.05], (n, 4))
+    choice = rng.integers(0, 3, n)
+    for i in range(n):
+        d = picks[i]
+        t, h, r, w = (weather[d] + jitter[i]).round(2)
+        yield float(t), float(h), max(float(r), 0.0), max(float(w), 0.0), crops[d, choice[i]], stages[d, choice[i]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--districts', type=int, default=300)
+    parser.add_argument('--precision', default=PREDICT_CACHE_PRECISION)
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    model.version = 'v1'
+    precision = parse_precision(args.precision)
+    memo = PredictionMemo(MemoryCache(max_size=65536, ttl=3600), precision)
+    requests = list(traffic(args.requests, args.districts))
+
+    start = time.perf_counter()
+    direct = [model.predict(*row) for row in requests]
+    direct_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = [memo.predict(model, *row) for row in requests]
+    cached_s = time.perf_counter() - start
+    stats = memo.stats()
+
+    steps = [precision[name] for name in ('temperature', 'humidity', 'rainfall', 'wind_speed')]
+    for row, answer in zip(requests[:2000], cached):
+        rounded = [quantize(v, step) for v, step in zip(row[:4], steps)]
+        assert answer == model.predict(*rounded, *row[4:]), "cached answer differs from predict on rounded inputs"
+    class_changes = sum(a[0] != b[0] for a, b in zip(direct, cached))
+
+    model.version = 'v2'
+    before = memo.cache.misses
+    memo.predict(model, *requests[0])
+    assert memo.cache.misses == before + 1, "new model version was served from the old entries"
+
+    print(f"requests: {args.requests:,} from {args.districts} districts, precision {args.precision}")
+    print(f"direct predict: {direct_s / args.requests * 1e6:8.1f} us/request")
+    print(f"memoized:       {cached_s / args.requests * 1e6:8.1f} us/request  "
+          f"(hit rate {stats['hit_rate']:.1%}, {stats['size']:,} entries)")
+    print(f"speedup: {direct_s / cached_s:.1f}x; rounding changed the class of "
+          f"{class_changes} requests ({class_changes / args.requests:.2%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Peak memory and rows/sec of the streaming export vs loading every Report through to_dict
+
+Exports a synthetic reports table (see bench_report_queries) as NDJSON both
+ways and compares the parsed output, then times the CSV and (with pyarrow)
+Parquet encoders. Peak Python memory is measured with tracemalloc, which
+slows everything down equally.
+
+Usage: python benchmarks/bench_report_export.py [--rows 200000] [--db /tmp/reports.db]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bench_report_queries import populate
+
+
+def measure(fn):
+    """(seconds, peak MB, result) of fn()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--db', default=None, help="reuse/keep the SQLite file here (default: temporary)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-export-')
+    path = args.db or os.path.join(workdir, 'reports.db')
+    os.environ.update({'DATABASE_URL': 'sqlite:///' + path, 'MODEL_EAGER_LOAD': '0'})
+    from app import app
+    from models_db import db, Report, REPORT_FIELDS, geo_cell_for
+    from report_export import export_reports, iter_batches, latest_update, pa
+
+    with app.app_context():
+        existing = db.session.query(db.func.count(Report.id)).scalar()
+        if existing < args.rows:
+            populate(db, Report, geo_cell_for, args.rows - existing)
+        total_rows = db.session.query(db.func.count(Report.id)).scalar()
+
+        def legacy(out_path):
+            # What a client could do before: every row through to_dict() at once
+            reports = [r.to_dict() for r in Report.query.order_by(Report.updated_at, Report.id).all()]
+            with open(out_path, 'w') as f:
+                for report in reports:
+                    f.write(json.dumps(report) + '\n')
+            db.session.expunge_all()
+
+        def streamed(fmt, out_path):
+            with open(out_path, 'wb') as f:
+                for chunk in export_reports(fmt, REPORT_FIELDS):
+                    f.write(chunk)
+
+        legacy_path, ndjson_path = os.path.join(workdir, 'legacy.ndjson'), os.path.join(workdir, 'export.ndjson')
+        results = [('to_dict, all rows', *measure(lambda: legacy(legacy_path))[:2])]
+        results.append(('export ndjson', *measure(lambda: streamed('ndjson', ndjson_path))[:2]))
+        results.append(('export csv', *measure(lambda: streamed('csv', os.path.join(workdir, 'export.csv')))[:2]))
+        if pa is not None:
+            results.append(('export parquet',
+                            *measure(lambda: streamed('parquet', os.path.join(workdir, 'export.parquet')))[:2]))
+
+        # A report stamped before a newer one but committed after the export has read past both:
+        # the lagged watermark leaves it to the next incremental export
+        stamped = datetime.utcnow() - timedelta(seconds=1)
+        db.session.add(Report(crop_type='maize', growth_stage='flowering', stress_level=1))
+        db.session.commit()
+        until = latest_update()
+        late = Report(crop_type='maize', growth_stage='flowering', stress_level=1, updated_at=stamped)
+        db.session.add(late)
+        db.session.commit()
+        exported = lambda since, until: {row['id'] for batch in iter_batches(('id',), since, until) for row in batch}
+        assert late.id not in exported(None, until) and late.id in exported(until, None), "late report skipped"
+
+    with open(legacy_path) as a, open(ndjson_path) as b:
+        for line_a, line_b in zip(a, b):
+            assert json.loads(line_a) == json.loads(line_b), "export differs from to_dict()"
+
+    print(f"rows: {total_rows:,}")
+    print(f"{'':<20} {'rows/sec':>10} {'peak MB':>9}")
+    for name, elapsed, peak in results:
+        print(f"{name:<20} {total_rows / elapsed:>10,.0f} {peak:>9.1f}")
+    if pa is None:
+        print("(pyarrow not installed: Parquet skipped)")
+
+
+if __name__ == '__main__':
+    main()
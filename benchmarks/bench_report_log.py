@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""File-mode report writes and reads: the old rewrite-everything reports.json vs the NDJSON log
+
+Appends --reports reports with both stores, timing the last writes (where
+the old store rewrites the whole file each time), then reads one report by
+id and iterates over all of them. Both stores must return the same reports.
+
+Usage: python benchmarks/bench_report_log.py [--reports 3000]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from _common import time_call
+from utils import load_all_reports, load_report, save_report_to_file
+
+
+def legacy_save_report_to_file(report_data, reports_file):
+    """The load-append-rewrite save_report_to_file used before the NDJSON log"""
+    if os.path.exists(reports_file):
+        with open(reports_file, 'r') as f:
+            reports = json.load(f)
+    else:
+        reports = []
+    report_data['id'] = len(reports) + 1
+    report_data['timestamp'] = datetime.now().isoformat()
+    reports.append(report_data)
+    with open(reports_file, 'w') as f:
+        json.dump(reports, f, indent=2)
+    return True, report_data
+
+
+def legacy_load_all_reports(reports_file):
+    with open(reports_file, 'r') as f:
+        return json.load(f)
+
+
+def sample_report(i):
+    return {
+        'crop_type': 'maize', 'growth_stage': 'flowering', 'stress_level': i % 3, 'confidence': 71.5,
+        'latitude': 12.97, 'longitude': 77.59, 'observations': ['yellowing', 'pests'],
+        'combined_assessment': "Moderate stress with nutrient deficiency signs. " * 4,
+    }
+
+
+def timed_writes(save, path, n, tail):
+    """Write n reports; returns seconds per write over the last `tail` writes"""
+    for i in range(n - tail):
+        save(sample_report(i), path)
+    start = time.perf_counter()
+    for i in range(n - tail, n):
+        save(sample_report(i), path)
+    return (time.perf_counter() - start) / tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=3000)
+    parser.add_argument('--tail', type=int, default=100, help="time this many writes at the end")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-log-')
+    legacy_path = os.path.join(workdir, 'reports.json')
+    log_path = os.path.join(workdir, 'reports.ndjson')
+
+    legacy_write = timed_writes(legacy_save_report_to_file, legacy_path, args.reports, args.tail)
+    log_write = timed_writes(save_report_to_file, log_path, args.reports, args.tail)
+
+    legacy_reports = legacy_load_all_reports(legacy_path)
+    log_reports = list(load_all_reports(log_path))
+    strip = lambda r: {k: v for k, v in r.items() if k != 'timestamp'}
+    assert [strip(r) for r in legacy_reports] == [strip(r) for r in log_reports], "stores disagree"
+    middle = args.reports // 2
+    assert strip(load_report(middle, log_path)) == strip(legacy_reports[middle - 1])
+
+    legacy_get = time_call(lambda: next(r for r in legacy_load_all_reports(legacy_path) if r['id'] == middle))
+    log_get = time_call(lambda: load_report(middle, log_path))
+    legacy_scan = time_call(lambda: sum(1 for _ in legacy_load_all_reports(legacy_path)), repeat=3)
+    log_scan = time_call(lambda: sum(1 for _ in load_all_reports(log_path)), repeat=3)
+
+    print(f"reports: {args.reports}  (writes timed over the last {args.tail})")
+    print(f"{'':<14} {'reports.json':>14} {'NDJSON log':>14}")
+    print(f"{'write':<14} {legacy_write * 1000:>12.2f}ms {log_write * 1000:>12.3f}ms")
+    print(f"{'get by id':<14} {legacy_get * 1000:>12.2f}ms {log_get * 1000:>12.3f}ms")
+    print(f"{'read all':<14} {legacy_scan * 1000:>12.1f}ms {log_scan * 1000:>12.1f}ms")
+    print(f"file size: {os.path.getsize(legacy_path) / 1e6:.1f} MB vs {os.path.getsize(log_path) / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Filtered /api/reports queries on a synthetic multi-million-row table, with and without the filter indexes
+
+Builds a SQLite reports table (reports cluster around a few hundred
+villages over a year), runs typical extension-officer queries through
+report_queries.list_reports, then drops the composite filter indexes and
+runs them again. Results must be identical both ways, and the bbox and
+radius queries at least twice as fast with the indexes.
+
+Usage: python benchmarks/bench_report_queries.py [--rows 2000000] [--db /tmp/reports.db]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from _common import CROPS, STAGES
+
+QUERIES = {
+    'severe cotton, last 7 days': {'crop': 'cotton', 'stress': '2', 'since': '2026-05-25'},
+    'mild/severe at flowering': {'stress': '1,2', 'stage': 'flowering'},
+    'bbox 0.5°, last 30 days': {'bbox': '77.3,12.7,77.8,13.2', 'since': '2026-05-01'},
+    'severe within 15 km': {'lat': '28.70', 'lon': '77.10', 'radius_km': '15', 'stress': '2'},
+    'maize in March': {'crop': 'maize', 'since': '2026-03-01', 'until': '2026-03-31'},
+}
+FILTER_INDEXES = ('ix_reports_crop_stress_created', 'ix_reports_cell_created')
+END = datetime(2026, 6, 1)  # synthetic reports cover the year before this
+
+
+def populate(db, Report, geo_cell_for, rows, chunk=100000):
+    rng = np.random.default_rng(0)
+    villages = np.column_stack([rng.uniform(8, 35, 400), rng.uniform(68, 97, 400)])
+    villages[:2] = [[28.70, 77.10], [12.97, 77.59]]  # make sure the sample queries hit something
+    table = Report.__table__
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        home = villages[rng.integers(0, len(villages), n)]
+        lat = home[:, 0] + rng.normal(0, 0.05, n)
+        lon = home[:, 1] + rng.normal(0, 0.05, n)
+        seconds = rng.uniform(0, 365 * 86400, n)
+        crops = rng.integers(0, len(CROPS), n)
+        stages = rng.integers(0, len(STAGES), n)
+        stress = rng.choice(3, n, p=[0.6, 0.3, 0.1])
+        db.session.execute(table.insert(), [
+            {
+                'crop_type': CROPS[crops[i]],
+                'growth_stage': STAGES[stages[i]],
+                'stress_level': int(stress[i]),
+                'confidence': 70.0,
+                'latitude': float(lat[i]),
+                'longitude': float(lon[i]),
+                'geo_cell': geo_cell_for(float(lat[i]), float(lon[i])),
+                'created_at': END - timedelta(seconds=float(seconds[i])),
+            }
+            for i in range(n)
+        ])
+        db.session.commit()
+        print(f"  inserted {start + n:,} rows", end='\r', flush=True)
+    print()
+
+
+def run_queries(app, list_reports, parse_filters, repeat=3):
+    """{name: (best seconds, ids on the first page, total)}"""
+    results = {}
+    with app.test_request_context():
+        for name, args in QUERIES.items():
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                page = list_reports(per_page=100, with_total=True, filters=parse_filters(args))
+                best = min(best, time.perf_counter() - start)
+            results[name] = (best, [r['id'] for r in page['reports']], page['total'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--db', default=None, help="reuse/keep the SQLite file here (default: temporary)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='b2g-queries-'), 'reports.db')
+    os.environ.update({'DATABASE_URL': 'sqlite:///' + path, 'MODEL_EAGER_LOAD': '0'})
+    from app import app
+    from models_db import db, Report, geo_cell_for
+    from report_queries import list_reports, parse_filters
+
+    with app.app_context():
+        existing = db.session.query(db.func.count(Report.id)).scalar()
+        if existing < args.rows:
+            start = time.perf_counter()
+            populate(db, Report, geo_cell_for, args.rows - existing)
+            print(f"populated {args.rows - existing:,} rows in {time.perf_counter() - start:.0f} s")
+            with db.engine.begin() as conn:
+                conn.execute(db.text('ANALYZE reports'))  # as a live table would have
+        total_rows = db.session.query(db.func.count(Report.id)).scalar()
+
+        indexed = run_queries(app, list_reports, parse_filters)
+
+        with db.engine.begin() as conn:
+            for name in FILTER_INDEXES:
+                conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+        try:
+            unindexed = run_queries(app, list_reports, parse_filters, repeat=1)
+        finally:
+            for index in Report.__table__.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+            with db.engine.begin() as conn:
+                conn.execute(db.text('ANALYZE reports'))
+
+    print(f"rows: {total_rows:,}  (page of 100 plus total count)")
+    print(f"{'query':<28} {'matches':>9} {'indexed':>10} {'no index':>10} {'speedup':>8}")
+    for name in QUERIES:
+        fast, ids, total = indexed[name]
+        slow, slow_ids, slow_total = unindexed[name]
+        assert (ids, total) == (slow_ids, slow_total), f"{name}: results differ without indexes"
+        print(f"{name:<28} {total:>9,} {fast * 1000:>8.1f}ms {slow * 1000:>8.1f}ms {slow / fast:>7.1f}x")
+    for name, args in QUERIES.items():
+        if 'bbox' in args or 'lat' in args:
+            # Spatial queries must be served by the geo_cell ranges, not a walk of the created_at index
+            assert indexed[name][0] * 2 < unindexed[name][0], f"{name}: not faster with ix_reports_cell_created"
+
+
+if __name__ == '__main__':
+    main()
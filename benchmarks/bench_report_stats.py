@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Dashboard stats from the rollup table vs GROUP BY over the full reports table
+
+Fills a SQLite reports table with synthetic reports (bulk SQL, then
+rebuild_rollups), submits a few more through the ORM so the incremental
+path is exercised, and times report_stats against the same GROUP BY run
+directly on reports. Counts and means must match.
+
+Usage: python benchmarks/bench_report_stats.py [--rows 1000000] [--db /tmp/reports.db]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from _common import time_call
+from bench_report_queries import populate
+
+GROUPINGS = [('crop',), ('stress',), ('day',), ('crop', 'stress'), ('cell',)]
+
+
+def direct_stats(db, Report, group_by):
+    """{group key: (count, mean confidence)} from reports itself"""
+    columns = {
+        'crop': Report.crop_type, 'stress': Report.stress_level, 'stage': Report.growth_stage,
+        'day': db.func.date(Report.created_at), 'cell': Report.geo_cell,
+    }
+    keys = [columns[d] for d in group_by]
+    rows = db.session.query(*keys, db.func.count(), db.func.avg(Report.confidence)).group_by(*keys).all()
+    return {tuple(str(k) for k in row[:-2]): (row[-2], round(row[-1], 2)) for row in rows}
+
+
+def rollup_stats(report_stats, group_by):
+    names = {'crop': 'crop_type', 'stress': 'stress_level', 'stage': 'growth_stage', 'day': 'day', 'cell': 'geo_cell'}
+    result = report_stats(group_by)
+    return {
+        tuple(str(g[names[d]]) for d in group_by): (g['count'], g['mean_confidence'])
+        for g in result['groups']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', default=None, help="reuse/keep the SQLite file here (default: temporary)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='b2g-stats-'), 'reports.db')
+    os.environ.update({'DATABASE_URL': 'sqlite:///' + path, 'MODEL_EAGER_LOAD': '0'})
+    from app import app
+    from models_db import db, Report, GEO_CELL_COLS, geo_cell_for, rebuild_rollups
+    from report_stats import report_stats
+
+    with app.app_context():
+        existing = db.session.query(db.func.count(Report.id)).scalar()
+        if existing < args.rows:
+            populate(db, Report, geo_cell_for, args.rows - existing)
+            start = time.perf_counter()
+            sizes = rebuild_rollups()
+            print(f"rebuilt rollups in {time.perf_counter() - start:.1f} s: "
+                  + ', '.join(f"{name} {rows:,} rows" for name, rows in sizes.items()))
+        for i in range(50):
+            db.session.add(Report(crop_type='cotton', growth_stage='flowering', stress_level=i % 3,
+                                  confidence=60.0 + i, latitude=28.7, longitude=77.1))
+        db.session.commit()
+        total_rows = db.session.query(db.func.count(Report.id)).scalar()
+
+        print(f"rows: {total_rows:,}")
+        print(f"{'group by':<14} {'groups':>7} {'reports':>10} {'rollups':>10} {'speedup':>8}")
+        for group_by in GROUPINGS:
+            expected = direct_stats(db, Report, group_by)
+            assert rollup_stats(report_stats, group_by) == expected, f"{group_by}: rollups differ from reports"
+            slow = time_call(lambda: direct_stats(db, Report, group_by), repeat=3)
+            fast = time_call(lambda: report_stats(group_by), repeat=3)
+            print(f"{','.join(group_by):<14} {len(expected):>7,} {slow * 1000:>8.1f}ms {fast * 1000:>8.1f}ms "
+                  f"{slow / fast:>7.1f}x")
+
+        # Boxes spanning more grid rows than fit in an OR of ranges, whole world included
+        by_cell = direct_stats(db, Report, ('cell',))
+        for bbox in [(-180.0, -90.0, 180.0, 90.0), (60.5, 0.25, 77.0, 40.0)]:
+            (first_row, first_col), (last_row, last_col) = (
+                divmod(geo_cell_for(bbox[1], bbox[0]), GEO_CELL_COLS), divmod(geo_cell_for(bbox[3], bbox[2]), GEO_CELL_COLS))
+            expected = {key: value for key, value in by_cell.items()
+                        if first_row <= int(key[0]) // GEO_CELL_COLS <= last_row
+                        and first_col <= int(key[0]) % GEO_CELL_COLS <= last_col}
+            assert expected, f"bbox {bbox} holds no reports"
+            found = report_stats(('cell',), {'bbox': bbox})['groups']
+            assert {(str(g['geo_cell']),): (g['count'], g['mean_confidence']) for g in found} == expected, \
+                f"bbox {bbox}: rollups differ from reports"
+
+
+if __name__ == '__main__':
+    main()
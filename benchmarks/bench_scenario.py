@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""What-if sweep: one /api/predict/scenario request vs one /api/predict per point
+
+Sweeps rainfall for a maize field through the Flask test client, once as
+separate /api/predict calls (the way clients did it before) and once as a
+single scenario request, then times a 2-D temperature x rainfall surface
+and compares base64 and JSON response sizes. Both ways must give the same
+classes and confidences, and the decoded surface must equal
+predict_batch on the same grid.
+
+Usage: python benchmarks/bench_scenario.py [--points 200] [--grid 100]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import model_artifact
+
+BASE = {'temperature': 34.0, 'humidity': 35.0, 'rainfall': 0.0, 'wind_speed': 6.0,
+        'crop_type': 'maize', 'growth_stage': 'flowering'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=200, help="points in the 1-D rainfall sweep")
+    parser.add_argument('--grid', type=int, default=100, help="points per axis of the 2-D surface")
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-scenario-')
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'reports.db'),
+        'MODEL_PATH': model_artifact(args.model),
+        # Exact inputs on both sides, so the answers can be compared
+        'PREDICT_CACHE_BACKEND': 'off',
+        'MODEL_LATTICE_PATH': ''
+    })
+    from app import app
+    from model_registry import get_model
+    from scenario import SCENARIO_MAX_POINTS, decode_array
+
+    client = app.test_client()
+    rainfall = np.linspace(0, 40, args.points)
+
+    start = time.perf_counter()
+    single = []
+    for value in rainfall:
+        reply = client.post('/api/predict', json=dict(BASE, rainfall=float(value))).get_json()
+        single.append((reply['stress_level'], reply['confidence']))
+    single_s = time.perf_counter() - start
+
+    sweep = {'base': BASE, 'sweep': [{'variable': 'rainfall', 'start': 0, 'stop': 40, 'steps': args.points}]}
+    start = time.perf_counter()
+    response = client.post('/api/predict/scenario', json=sweep)
+    scenario_s = time.perf_counter() - start
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    levels, confidences = decode_array(result, 'stress_level'), decode_array(result, 'confidence')
+    assert [level for level, _ in single] == levels.tolist(), "scenario classes differ from /api/predict"
+    assert np.allclose([c for _, c in single], np.round(confidences.astype(float), 2), atol=0.0101), \
+        "scenario confidences differ from /api/predict"
+
+    # Oversized sweeps are rejected before any array is allocated
+    for axis in ({'start': 0, 'stop': 40, 'steps': 10 ** 12}, {'values': [1.0] * (SCENARIO_MAX_POINTS + 1)}):
+        start = time.perf_counter()
+        response = client.post('/api/predict/scenario', json={'base': BASE, 'sweep': [dict(axis, variable='rainfall')]})
+        assert response.status_code == 400 and time.perf_counter() - start < 1, response.get_json()
+
+    surface = {'base': BASE, 'probabilities': True, 'sweep': [
+        {'variable': 'temperature', 'start': 10, 'stop': 45, 'steps': args.grid},
+        {'variable': 'rainfall', 'start': 0, 'stop': 40, 'steps': args.grid}]}
+    sizes, timings = {}, {}
+    for encoding in ('base64', 'json'):
+        start = time.perf_counter()
+        response = client.post('/api/predict/scenario', json=dict(surface, encoding=encoding))
+        timings[encoding] = time.perf_counter() - start
+        sizes[encoding] = len(response.data)
+        result = response.get_json()
+        grid_t, grid_r = np.meshgrid(result['axes']['temperature'], result['axes']['rainfall'], indexing='ij')
+        n = grid_t.size
+        expected, expected_conf = get_model().predict_batch(
+            grid_t.ravel(), [BASE['humidity']] * n, grid_r.ravel(), [BASE['wind_speed']] * n,
+            [BASE['crop_type']] * n, [BASE['growth_stage']] * n)
+        assert (decode_array(result, 'stress_level').ravel() == expected).all(), f"{encoding} surface differs"
+        assert np.allclose(decode_array(result, 'confidence').ravel(), expected_conf, atol=1e-6)
+        probabilities = decode_array(result, 'probabilities')
+        assert probabilities.shape == (args.grid, args.grid, len(result['classes']))
+
+    print(f"1-D rainfall sweep, {args.points} points")
+    print(f"  /api/predict per point: {single_s * 1000:8.1f} ms")
+    print(f"  one scenario request:   {scenario_s * 1000:8.1f} ms  ({single_s / scenario_s:.0f}x)")
+    print(f"  class changes: {sweep_transitions(client, sweep)}")
+    print(f"2-D temperature x rainfall surface, {args.grid}x{args.grid} points with probabilities")
+    for encoding in ('base64', 'json'):
+        print(f"  {encoding:<6} {timings[encoding] * 1000:8.1f} ms  {sizes[encoding] / 1024:8.1f} KiB")
+
+
+def sweep_transitions(client, sweep):
+    reply = client.post('/api/predict/scenario', json=sweep).get_json()
+    return ', '.join(f"{t['from']}->{t['to']} between {t['between'][0]:.1f} and {t['between'][1]:.1f} mm"
+                     for t in reply['transitions']) or 'none'
+
+
+if __name__ == '__main__':
+    main()
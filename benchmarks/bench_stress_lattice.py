@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Predict latency with the precomputed stress lattice vs the model
+
+Compiles a lattice for the model (or opens --lattice), then times
+single-row predict and 10k-row predict_batch with the model alone, with
+nearest-point lookup and with interpolated lookup. Checks that grid
+points read back the model's class, that inputs outside the grid and
+unknown crops get the model's own answer, and prints the error against
+the model on random in-bounds inputs.
+
+Usage: python benchmarks/bench_stress_lattice.py [--axes ...] [--lattice DIR] [--rows 10000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import load_model, model_artifact, synthetic_samples
+from model_artifact import write_artifact
+from stress_lattice import (AXES, LATTICE_AXES, LATTICE_FORMAT, StressLattice, attach_lattice, compile_lattice,
+                            measure_error, model_fingerprint, parse_axes)
+
+
+def per_call_us(fn, rows, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            fn(*row)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+
+def batch_ms(fn, columns, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(**columns)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--axes', default=LATTICE_AXES)
+    parser.add_argument('--lattice', default=None, help="existing lattice directory (default: compile one)")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    model_path = model_artifact(args.model)
+    model = load_model(model_path)
+    lattice_path = args.lattice
+    if lattice_path is None:
+        lattice_path = os.path.join(tempfile.mkdtemp(prefix='b2g-lattice-'), 'lattice')
+        start = time.perf_counter()
+        arrays, metadata = compile_lattice(model, parse_axes(args.axes), model_fingerprint(model_path))
+        metadata['error'] = measure_error(StressLattice(arrays, metadata), model)
+        write_artifact(lattice_path, arrays, metadata, artifact_format=LATTICE_FORMAT)
+        print(f"compiled {arrays['stress_levels'].size:,} grid points in {time.perf_counter() - start:.1f} s")
+
+    columns = synthetic_samples(args.rows)
+    rows = list(zip(*columns.values()))[:2000]
+    exact_levels, _ = model.predict_batch(**columns)
+    timings = {'model': (per_call_us(model.predict, rows), batch_ms(model.predict_batch, columns))}
+
+    lattice = attach_lattice(model, model_path, lattice_path)
+    assert lattice is not None, "lattice did not attach to the model it was compiled from"
+
+    # Grid points read back the model's answer (confidence stored as float16)
+    rng = np.random.default_rng(1)
+    nodes = [lattice.starts[i] + lattice.steps[i] * rng.integers(0, lattice.counts[i], 2000) for i in range(len(AXES))]
+    nodes += [rng.choice(lattice.crop_classes, 2000), rng.choice(lattice.stage_classes, 2000)]
+    lattice.interpolate = False
+    levels, confidences = model.predict_batch(*nodes)
+    node_levels, node_confidences = model._predict_batch_model(*nodes)
+    assert (levels == node_levels).all(), "lattice class differs from the model at a grid point"
+    assert np.abs(confidences - node_confidences).max() < 1e-3, "lattice confidence differs at a grid point"
+
+    # Out of bounds inputs and unknown crops fall back to the model
+    outside = {name: np.asarray(column[:200]).copy() for name, column in columns.items()}
+    outside['temperature'][:100] = lattice.starts[0] + lattice.steps[0] * lattice.counts[0] + 5
+    outside['wind_speed'][100:] = -1
+    outside['crop_type'][::2] = 'dragonfruit'
+    for interpolate in (False, True):
+        lattice.interpolate = interpolate
+        fallback = model.predict_batch(**outside)
+        expected = model._predict_batch_model(**outside)
+        assert (fallback[0] == expected[0]).all() and np.allclose(fallback[1], expected[1]), \
+            "out-of-bounds rows did not get the model's answer"
+
+    for interpolate in (False, True):
+        lattice.interpolate = interpolate
+        timings['interpolated' if interpolate else 'nearest'] = (
+            per_call_us(model.predict, rows), batch_ms(model.predict_batch, columns))
+
+    inside = lattice.lookup(**columns)[2]
+    print(f"lattice: {lattice.nbytes() / 1e6:.0f} MB, {inside.mean():.1%} of the {args.rows:,} sample rows in bounds")
+    print(f"{'path':<13} {'predict us':>11} {'batch ms':>9}")
+    for name, (single, batch) in timings.items():
+        print(f"{name:<13} {single:>11.1f} {batch:>9.2f}")
+    for mode, error in lattice.error.items():
+        print(f"{mode:<13} class agreement {error['class_agreement']:.2%}, confidence error "
+              f"max {error['max_confidence_error']:.3f} mean {error['mean_confidence_error']:.4f}")
+    lattice.interpolate = False
+    agree = (model.predict_batch(**columns)[0] == exact_levels).mean()
+    print(f"nearest lookup agrees with the model on {agree:.2%} of the sample rows")
+
+
+if __name__ == '__main__':
+    main()
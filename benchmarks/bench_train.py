@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Training wall time and peak memory: CropStressModel.train vs the chunked train_model pipeline
+
+Writes a synthetic training CSV, then trains in a fresh interpreter each
+(so peak RSS is per run): the in-memory pandas CropStressModel.train, the
+pipeline with the same GradientBoostingClassifier, and the pipeline with
+HistGradientBoostingClassifier. All models are scored on the same
+separate sample; the pipeline's gb model must be as accurate as train()'s.
+
+Usage: python benchmarks/bench_train.py [--rows 200000] [--threads N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from _common import BACKEND_DIR, write_training_csv
+
+LEGACY_SNIPPET = """
+import sys, time
+sys.path.insert(0, {backend!r})
+from models import CropStressModel
+start = time.perf_counter()
+CropStressModel(autoload=False).train(data_path={csv!r}, save_path={out!r})
+seconds = time.perf_counter() - start
+"""
+
+PIPELINE_SNIPPET = """
+import sys, time
+sys.path.insert(0, {backend!r})
+from train_model import iter_csv_chunks, train
+start = time.perf_counter()
+model, _ = train(iter_csv_chunks({csv!r}), estimator={estimator!r}, threads={threads!r})
+model.save_model({out!r})
+seconds = time.perf_counter() - start
+"""
+
+REPORT_SNIPPET = """
+import json
+with open('/proc/self/status') as f:
+    peak = next(int(line.split()[1]) / 1024 for line in f if line.startswith('VmHWM:'))
+print(json.dumps({'seconds': seconds, 'peak_mb': peak}))
+"""
+
+
+def run(snippet, **params):
+    """(seconds, peak RSS MB) of a training run in a fresh interpreter"""
+    code = snippet.format(backend=os.path.abspath(BACKEND_DIR), **params) + REPORT_SNIPPET
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return result['seconds'], result['peak_mb']
+
+
+def accuracy(path, eval_csv):
+    import pandas as pd
+    from models import CropStressModel
+
+    model = CropStressModel(autoload=False)
+    model.load_model(path)
+    df = pd.read_csv(eval_csv)
+    levels, _ = model.predict_batch(df['temperature'], df['humidity'], df['rainfall'], df['wind_speed'],
+                                    df['crop_type'], df['growth_stage'])
+    return float(np.mean(levels == df['stress_level'].to_numpy())), model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=None, help="threads for the hist fit (default: all cores)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='b2g-train-')
+    csv = write_training_csv(os.path.join(workdir, 'train.csv'), n=args.rows, seed=42)
+    eval_csv = write_training_csv(os.path.join(workdir, 'eval.csv'), n=20000, seed=7)
+    print(f"rows: {args.rows:,}  ({os.path.getsize(csv) / 1e6:.1f} MB CSV)")
+
+    runs = [
+        ('train()', LEGACY_SNIPPET, {}),
+        ('pipeline gb', PIPELINE_SNIPPET, {'estimator': 'gb', 'threads': None}),
+        ('pipeline hist', PIPELINE_SNIPPET, {'estimator': 'hist', 'threads': args.threads}),
+    ]
+    results = {}
+    for name, snippet, params in runs:
+        out = os.path.join(workdir, name.replace(' ', '_').strip('()') + '.pkl')
+        seconds, peak = run(snippet, csv=csv, out=out, **params)
+        results[name] = (seconds, peak, *accuracy(out, eval_csv))
+
+    legacy_model, pipeline_model = results['train()'][3], results['pipeline gb'][3]
+    for attr in ('crop_classes', 'stage_classes'):
+        assert list(getattr(legacy_model, attr)) == list(getattr(pipeline_model, attr)), f"{attr} differ"
+    assert results['pipeline gb'][2] >= results['train()'][2] - 0.02, "pipeline gb model is less accurate"
+
+    print(f"{'':<14} {'seconds':>9} {'peak RSS MB':>12} {'accuracy':>9}")
+    for name, (seconds, peak, acc, _) in results.items():
+        print(f"{name:<14} {seconds:>9.1f} {peak:>12.0f} {acc:>9.2%}")
+
+
+if __name__ == '__main__':
+    main()
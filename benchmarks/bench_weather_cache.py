@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Weather lookup latency and upstream calls with and without the grid-cell cache
+
+Runs get_weather_data against a local stub OpenWeatherMap server with a
+simulated network delay. Lookups are scattered around a few villages, so
+most of them fall into an already-fetched grid cell.
+
+Usage: python benchmarks/bench_weather_cache.py [--lookups 500] [--backend memory|sqlite]
+"""
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (puts backend/ on sys.path)
+from stubs import WeatherStub
+
+VILLAGES = [(28.7041, 77.1025), (12.9716, 77.5946), (19.0760, 72.8777), (22.5726, 88.3639)]
+
+
+def run(backend, lookups, latency):
+    with WeatherStub(latency=latency) as stub:
+        os.environ['OPENWEATHER_URL'] = stub.url
+        os.environ['WEATHER_CACHE_BACKEND'] = backend
+        os.environ['WEATHER_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='b2g-weather-'), 'cache.db')
+        import utils
+        utils = importlib.reload(utils)
+
+        rng = np.random.default_rng(1)
+        points = [
+            (lat + rng.normal(0, 0.01), lon + rng.normal(0, 0.01))
+            for lat, lon in (VILLAGES[i] for i in rng.integers(0, len(VILLAGES), lookups))
+        ]
+
+        start = time.perf_counter()
+        for lat, lon in points:
+            weather = utils.get_weather_data(lat, lon)
+            assert weather['location'] != 'Offline Mode', "stub server not reached"
+        elapsed = time.perf_counter() - start
+
+        stats = utils.get_weather_cache_stats() or {}
+        return elapsed, stub.requests, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help="stub server delay in seconds")
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    args = parser.parse_args()
+
+    for backend in ('off', args.backend):
+        elapsed, upstream, stats = run(backend, args.lookups, args.latency)
+        print(f"cache={backend:<7} {args.lookups / elapsed:9.1f} lookups/sec  "
+              f"{elapsed / args.lookups * 1000:7.2f} ms/lookup  upstream calls: {upstream:4d}  "
+              f"hit rate: {stats.get('hit_rate', 0):.2%}")
+
+
+if __name__ == '__main__':
+    main()
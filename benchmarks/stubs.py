@@ -0,0 +1,158 @@
+"""Local stand-ins for the external HTTP services the backend calls
+
+Each stub runs a ThreadingHTTPServer on 127.0.0.1 in a background thread
+and counts requests, so benchmarks can run offline and check how many
+upstream calls a code path made. Point the backend at a stub through the
+usual environment variables (OPENWEATHER_URL, OLLAMA_URL, ...) before
+importing the backend modules.
+"""
+
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubServer:
+    """Base class: subclasses implement handle(method, path, query, body)"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _dispatch(self, method):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                stub.handle(self, method, url.path, parse_qs(url.query), body)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, handler, method, path, query, body):
+        raise NotImplementedError
+
+    @staticmethod
+    def send_json(handler, payload, status=200):
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+class WeatherStub(StubServer):
+    """Mimics OpenWeatherMap's /data/2.5/weather and 5 day / 3 hour /data/2.5/forecast responses"""
+
+    FORECAST_START = 1767225600  # 2026-01-01T00:00:00Z, so forecasts are reproducible
+
+    def __init__(self, latency=0.0, forecast_steps=40):
+        super().__init__(latency=latency)
+        self.forecast_steps = forecast_steps
+
+    def handle(self, handler, method, path, query, body):
+        lat = float(query.get('lat', ['0'])[0])
+        lon = float(query.get('lon', ['0'])[0])
+        if path.endswith('/forecast'):
+            self.send_json(handler, {'list': self.forecast(lat, lon), 'city': {'name': f"Stub {lat:.2f},{lon:.2f}"}})
+            return
+        self.send_json(handler, {
+            'main': {'temp': round(20 + lat % 15, 1), 'humidity': int(40 + lon % 50)},
+            'rain': {'1h': round(lat % 3, 1)},
+            'wind': {'speed': round(lon % 8, 1)},
+            'weather': [{'description': 'stub sky'}],
+            'name': f"Stub {lat:.2f},{lon:.2f}"
+        })
+
+
+    def forecast(self, lat, lon):
+        """Forecast steps for a point: the current-weather values plus a daily cycle"""
+        return [
+            {
+                'dt': self.FORECAST_START + 3 * 3600 * step,
+                'main': {'temp': round(20 + lat % 15 + 6 * math.sin(step * math.pi / 4), 1),
+                         'humidity': int(40 + (lon + 7 * step) % 50)},
+                'rain': {'3h': round((lat + step) % 5 * 0.8, 1)},
+                'wind': {'speed': round((lon + step) % 8, 1)}
+            }
+            for step in range(self.forecast_steps)
+        ]
+
+
+class OllamaStub(StubServer):
+    """Mimics Ollama's /api/generate, both single-shot and NDJSON streaming"""
+
+    def __init__(self, latency=0.0, reply="Stub advisory: irrigate early and scout for pests.", token_delay=0.0):
+        super().__init__(latency=latency)
+        self.reply = reply
+        self.token_delay = token_delay
+
+    def handle(self, handler, method, path, query, body):
+        request = json.loads(body or b'{}')
+        if not request.get('stream', True):
+            # Single-shot replies take as long as generating every token would
+            if self.token_delay:
+                time.sleep(self.token_delay * len(self.reply.split(' ')))
+            self.send_json(handler, {'model': request.get('model'), 'response': self.reply, 'done': True})
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/x-ndjson')
+        handler.send_header('Transfer-Encoding', 'chunked')
+        handler.end_headers()
+        tokens = [word + ' ' for word in self.reply.split(' ')]
+        tokens[-1] = tokens[-1].rstrip()
+        for token in tokens:
+            self._write_chunk(handler, {'model': request.get('model'), 'response': token, 'done': False})
+            if self.token_delay:
+                time.sleep(self.token_delay)
+        self._write_chunk(handler, {'model': request.get('model'), 'response': '', 'done': True})
+        handler.wfile.write(b'0\r\n\r\n')
+
+    @staticmethod
+    def _write_chunk(handler, payload):
+        line = (json.dumps(payload) + '\n').encode('utf-8')
+        handler.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b'\r\n')
+        handler.wfile.flush()
@@ -0,0 +1,48 @@
+import gc
+import os
+import subprocess
+import sys
+import time
+
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Import the app (and load the ML model) once in the master process; the
+# forked workers then share those pages copy-on-write.
+preload_app = True
+
+# With INFERENCE_SOCKET set, workers send predictions to one sidecar process
+# (backend/inference_service.py), which gunicorn starts and stops here
+INFERENCE_SOCKET = os.getenv('INFERENCE_SOCKET', '')
+SIDECAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'inference_service.py')
+_sidecar = None
+
+
+def on_starting(server):
+    global _sidecar
+    if not INFERENCE_SOCKET:
+        return
+    sys.path.insert(0, os.path.dirname(SIDECAR))
+    from inference_service import is_serving
+
+    if is_serving(INFERENCE_SOCKET):
+        server.log.info("Using the inference sidecar already on %s", INFERENCE_SOCKET)
+        return
+    _sidecar = subprocess.Popen([sys.executable, SIDECAR, '--socket', INFERENCE_SOCKET])
+    # Wait for the model to load, so the first requests don't all fall back
+    deadline = time.time() + 120
+    while time.time() < deadline and _sidecar.poll() is None and not is_serving(INFERENCE_SOCKET):
+        time.sleep(0.1)
+    if not is_serving(INFERENCE_SOCKET):
+        server.log.warning("Inference sidecar did not start; workers will predict in process")
+
+
+def pre_fork(server, worker):
+    # Move preloaded objects out of the collector's view so gc passes in the
+    # workers don't write to (and un-share) their pages
+    gc.freeze()
+
+
+def on_exit(server):
+    if _sidecar is not None and _sidecar.poll() is None:
+        _sidecar.terminate()
+        _sidecar.wait(timeout=10)